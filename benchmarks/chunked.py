@@ -0,0 +1,101 @@
+"""
+Benchmarks a pipeline on a long single symbol minute history run at once against chunked.run_chunked by month
+chunked.run_chunked reads the months from the Parquet file and from a price store of the same bars
+limit_entries and the exit engine carry their state from month to month
+Each run is in its own process so the peak memory is for that run alone
+
+python benchmarks/chunked.py [years]
+"""
+
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import chunked, exits, store
+from polars_indicators.pipeline import Pipeline
+
+
+PIPELINE = Pipeline() \
+    .add(pi.simple_moving_average, days=390) \
+    .add(pi.trailing_stop, bars=30) \
+    .add(pi.targeted_value, targets='SMA390') \
+    .add(pi.end_of_data_stop) \
+    .add(pi.create_trade_ids, enter_column='SMA390_targets', exit_column='30_bar_trailing_stop') \
+    .add(pi.limit_entries, bars=30, entries='SMA390_targets') \
+    .add(exits.trade_exits, enter_column='30_minimum_bars_between', percentage=-1, trailing_bars=30)
+
+
+def minute_bars(years: float, seed: int=0) -> pl.DataFrame:
+    """random walk bars for every minute of years"""
+    dates = pl.date_range(datetime(2000, 1, 1), datetime(2000, 1, 1) + (datetime(2001, 1, 1) - datetime(2000, 1, 1)) * years, "1m", eager=True)
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, len(dates))))
+    return pl.DataFrame({
+        pi.DATE_COLUMN: dates,
+        pi.OPEN_COLUMN: close,
+        pi.HIGH_COLUMN: close * 1.0005,
+        pi.LOW_COLUMN: close * 0.9995,
+        pi.CLOSE_COLUMN: close,
+    })
+
+
+def at_once(directory: Path) -> int:
+    df = PIPELINE.run(pl.read_parquet(directory / "minutes.parquet")).df
+    df.write_parquet(directory / "at_once.parquet")
+    return len(df)
+
+
+def by_month(directory: Path) -> int:
+    return write_chunks(pl.scan_parquet(directory / "minutes.parquet"), directory)
+
+
+def by_month_store(directory: Path) -> int:
+    return write_chunks(directory / "store", directory)
+
+
+def write_chunks(source: pl.LazyFrame | Path, directory: Path) -> int:
+    rows = 0
+    for i, chunk in enumerate(chunked.run_chunked(source, PIPELINE, "1mo")):
+        chunk.df.write_parquet(directory / f"chunk-{i:05d}.parquet")
+        rows += len(chunk.df)
+    return rows
+
+
+def write(directory: Path, years: float):
+    df = minute_bars(years)
+    df.write_parquet(directory / "minutes.parquet")
+    store.write_prices(df.with_columns(pl.lit("S").alias(pi.SYMBOL_COLUMN)), directory / "store")
+    print(f"{len(df)} minute bars")
+
+
+def run(mode: str, directory: Path):
+    start = time.perf_counter()
+    rows = {"at_once": at_once, "by_month": by_month, "by_month_store": by_month_store}[mode](directory)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>14} {seconds:>10.3f} {peak:>10.0f} {rows:>10}")
+
+
+def main():
+    years = sys.argv[1] if len(sys.argv) > 1 else "10"
+    #every step runs in a new process. The peak memory of a process carries over to the processes it starts
+    with tempfile.TemporaryDirectory() as directory:
+        subprocess.run([sys.executable, __file__, "write", directory, years], check=True)
+        print(f"{'':>14} {'seconds':>10} {'peak MB':>10} {'rows':>10}")
+        for mode in ["at_once", "by_month", "by_month_store"]:
+            subprocess.run([sys.executable, __file__, mode, directory], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "write":
+        write(Path(sys.argv[2]), float(sys.argv[3]))
+    elif len(sys.argv) == 3 and sys.argv[1] in ("at_once", "by_month", "by_month_store"):
+        run(sys.argv[1], Path(sys.argv[2]))
+    else:
+        main()
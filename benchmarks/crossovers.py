@@ -0,0 +1,49 @@
+"""
+Benchmarks the crossovers of every pair of a set of moving averages added one indicator at a time against crossovers
+
+python benchmarks/crossovers.py [symbols] [years]
+"""
+
+import itertools
+import sys
+import time
+import polars as pl
+from polars import testing
+import polars_indicators as pi
+from data import ohlcv
+
+WINDOWS = [5, 10, 20, 50, 100, 200]
+
+
+def timed(function) -> tuple[float, pl.DataFrame]:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    years = float(sys.argv[2]) if len(sys.argv) > 2 else 4
+    df = pi.moving_average_sweep(ohlcv(symbols, years), WINDOWS).df
+    pairs = [(f"SMA{fast}", f"SMA{slow}") for fast, slow in itertools.combinations(WINDOWS, 2)]
+    print(f"{len(df)} rows, {len(pairs)} pairs, {len(pairs) * 3} columns")
+
+    def separate(df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+        for column1, column2 in pairs:
+            df = pi.crossover_up(df, column1, column2).df
+            df = pi.crossover_down(df, column1, column2).df
+            df = pi.crossover(df, column1, column2).df
+        return df
+
+    eager_time, expected = timed(lambda: separate(df))
+    lazy_time, _ = timed(lambda: separate(df.lazy()).collect())
+    crossovers_time, result = timed(lambda: pi.crossovers(df, pairs).df)
+    testing.assert_frame_equal(result.select(expected.columns), expected)
+
+    print(f"one indicator at a time:       {eager_time:8.3f}s")
+    print(f"one indicator at a time lazy:  {lazy_time:8.3f}s")
+    print(f"crossovers:                    {crossovers_time:8.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Seeded generator of daily OHLCV bars for benchmarks
+Every symbol gets its own drift and volatility and a listing date so histories are ragged like real data
+Opens gap from the previous close, highs and lows contain the open and close and volume is lognormal
+Rows are sorted by symbol and date
+
+python benchmarks/data.py symbols years path.parquet
+"""
+
+import sys
+from datetime import date, timedelta
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+
+TRADING_DAYS = 252
+
+
+def ohlcv(symbols: int, years: float, seed: int=0, end: date=date(2023, 12, 29)) -> pl.DataFrame:
+    """daily bars for symbols over years of weekdays ending on end
+    about a third of the symbols list part way through so they have fewer bars"""
+    rng = np.random.default_rng(seed)
+    bars = int(years * TRADING_DAYS)
+    days = []
+    day = end
+    while len(days) < bars:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    days.reverse()
+
+    listed = np.where(rng.random(symbols) < 1 / 3, rng.integers(0, max(bars - 20, 1), symbols), 0)
+    counts = bars - listed
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rows = int(counts.sum())
+
+    drift = np.repeat(rng.normal(0.0003, 0.0005, symbols), counts)
+    volatility = np.repeat(rng.uniform(0.01, 0.04, symbols), counts)
+    returns = rng.normal(drift, volatility)
+    returns[starts] = 0
+    #cumulative returns restart at every symbol so each one starts from its own price
+    log_price = np.cumsum(returns)
+    log_price -= np.repeat(log_price[starts], counts)
+    close = np.repeat(rng.uniform(5, 500, symbols), counts) * np.exp(log_price)
+
+    previous = np.roll(close, 1)
+    previous[starts] = close[starts]
+    open = previous * np.exp(rng.normal(0, volatility / 3))
+    high = np.maximum(open, close) * np.exp(np.abs(rng.normal(0, volatility / 2)))
+    low = np.minimum(open, close) * np.exp(-np.abs(rng.normal(0, volatility / 2)))
+    volume = rng.lognormal(13, 1, rows).astype(np.int64)
+
+    day_index = np.concatenate([np.arange(start, bars) for start in listed])
+    return pl.DataFrame({
+        pi.SYMBOL_COLUMN: np.repeat([f"S{i:06d}" for i in range(symbols)], counts),
+        pi.DATE_COLUMN: pl.Series(days).take(day_index),
+        pi.OPEN_COLUMN: open,
+        pi.HIGH_COLUMN: high,
+        pi.LOW_COLUMN: low,
+        pi.CLOSE_COLUMN: close,
+        pi.VOLUMNE_COLUMN: volume,
+    })
+
+
+if __name__ == "__main__":
+    df = ohlcv(int(sys.argv[1]), float(sys.argv[2]))
+    df.write_parquet(sys.argv[3])
+    print(f"{len(df)} rows written to {sys.argv[3]}")
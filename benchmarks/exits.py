@@ -0,0 +1,63 @@
+"""
+Benchmarks the exit engine against the chain of stop indicators it replaced in buy_x_week_low
+The chain evaluates every stop on every bar and can't anchor them to the entry of the open trade
+so the engine has to be about as fast to be worth using
+
+python benchmarks/exits.py
+"""
+
+import time
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import exits
+
+SYMBOLS = 1000
+BARS = 2500
+REPEATS = 3
+
+
+def random_bars(symbols: int, bars: int, probability: float=0.2, seed: int=0) -> pl.DataFrame:
+    """random walk bars for symbols with bars rows each and entries at the close on a random probability of bars"""
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (symbols, bars)), axis=1)).ravel()
+    return pl.DataFrame({
+        pi.SYMBOL_COLUMN: np.repeat([f"S{i}" for i in range(symbols)], bars),
+        pi.OPEN_COLUMN: closes,
+        pi.HIGH_COLUMN: closes * 1.01,
+        pi.LOW_COLUMN: closes * 0.99,
+        pi.CLOSE_COLUMN: closes,
+        'enter': np.where(rng.random(len(closes)) < probability, closes, np.nan),
+    }).with_columns(pl.col('enter').fill_nan(None))
+
+
+def stop_chain(df: pl.DataFrame) -> pi.IndicatorResult:
+    """percentage, trailing and end of data stops coalesced into trades the way buy_x_week_low did before the engine"""
+    percentage_stop = pi.entry_percentage_stop(df, -5, 'enter')
+    trail = pi.trailing_stop(percentage_stop.df, bars=2)
+    eod = pi.end_of_data_stop(trail.df)
+    df = eod.df.with_columns(pl.when(pl.col('enter').is_not_null()).then(pl.lit(None)).otherwise(pl.col(trail.column)).alias(trail.column))
+    df = df.with_columns(pl.coalesce(pl.col(percentage_stop.column), pl.col(trail.column), pl.col(eod.column)).alias('exit_column'))
+    return pi.create_trade_ids(df, 'enter', 'exit_column')
+
+
+def engine(df: pl.DataFrame) -> pi.IndicatorsResult:
+    return exits.trade_exits(df, 'enter', percentage=-5, trailing_bars=2)
+
+
+def main():
+    df = random_bars(SYMBOLS, BARS)
+    ret = engine(df)
+    print(f"{len(df)} rows, {ret.df[ret.columns[2]].max()} trades")
+    print(f"{'':>8} {'seconds':>10}")
+    for name, function in [("chain", stop_chain), ("engine", engine)]:
+        times = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            function(df)
+            times.append(time.perf_counter() - start)
+        print(f"{name:>8} {min(times):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
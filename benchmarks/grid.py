@@ -0,0 +1,67 @@
+"""
+Benchmarks a 500 combination parameter grid of buy_x_week_low run one strategy call at a time against buy_x_week_low.grid
+5 lookbacks x 10 stop percentages x 10 trailing stops
+Each run is in its own process so the peak memory is for that run alone
+
+python benchmarks/grid.py [symbols] [years]
+"""
+
+import itertools
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+import polars as pl
+import polars_indicators as pi
+from polars_indicators.strategies import buy_x_week_low
+from data import ohlcv
+
+LOOKBACKS = [timedelta(weeks=weeks) for weeks in (4, 13, 26, 39, 52)]
+PERCENTAGES = [-float(percent) for percent in range(1, 11)]
+TRAILING_BARS = list(range(1, 11))
+
+
+def serial(df: pl.DataFrame) -> int:
+    """the strategy and summarize_trades for every combination"""
+    rows = 0
+    for lookback, percentage, bars in itertools.product(LOOKBACKS, PERCENTAGES, TRAILING_BARS):
+        ret = buy_x_week_low.strategy(df, lookback, percentage, bars)
+        pi.summarize_trades(ret.df, ret.column, f"{lookback}_week_min_targets", "exit_column")
+        rows += 1
+    return rows
+
+
+def run(mode: str, path: Path):
+    df = pl.read_parquet(path)
+    start = time.perf_counter()
+    if mode == "serial":
+        rows = serial(df)
+    else:
+        workers, executor = {"grid": (1, "thread"), "grid_threads": (None, "thread"), "grid_processes": (None, "process")}[mode]
+        rows = len(buy_x_week_low.grid(df, LOOKBACKS, PERCENTAGES, TRAILING_BARS, workers=workers, executor=executor))
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>14} {seconds:>10.3f} {peak:>10.0f} {rows:>10}")
+
+
+def main():
+    symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    years = float(sys.argv[2]) if len(sys.argv) > 2 else 4
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "prices.parquet"
+        df = ohlcv(symbols, years).with_columns(pl.col(pi.DATE_COLUMN).cast(pl.Datetime))
+        df.write_parquet(path)
+        print(f"{len(df)} rows, {symbols} symbols, {len(LOOKBACKS) * len(PERCENTAGES) * len(TRAILING_BARS)} combinations")
+        print(f"{'':>14} {'seconds':>10} {'peak MB':>10} {'rows':>10}")
+        for mode in ["serial", "grid", "grid_threads", "grid_processes"]:
+            subprocess.run([sys.executable, __file__, mode, str(path)], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] in ("serial", "grid", "grid_threads", "grid_processes"):
+        run(sys.argv[1], Path(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,42 @@
+"""
+Benchmarks limit_entries across bar counts. The time should stay flat as bars grows
+
+python benchmarks/limit_entries.py
+"""
+
+import time
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+
+SYMBOLS = 1000
+BARS_PER_SYMBOL = 5000
+BAR_COUNTS = [1, 5, 10, 20, 40, 60]
+REPEATS = 3
+
+
+def random_entries(symbols: int, bars: int, probability: float=0.2, seed: int=0) -> pl.DataFrame:
+    """entry prices on a random probability of bars and nulls elsewhere"""
+    rng = np.random.default_rng(seed)
+    entries = rng.random(symbols * bars)
+    return pl.DataFrame({
+        pi.SYMBOL_COLUMN: np.repeat([f"S{i}" for i in range(symbols)], bars),
+        'entries': pl.Series(entries).set_at_idx(np.flatnonzero(entries > probability), None),
+    })
+
+
+def main():
+    df = random_entries(SYMBOLS, BARS_PER_SYMBOL)
+    print(f"{len(df)} rows")
+    print(f"{'bars':>6} {'seconds':>10}")
+    for bars in BAR_COUNTS:
+        times = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            pi.limit_entries(df, bars, 'entries')
+            times.append(time.perf_counter() - start)
+        print(f"{bars:>6} {min(times):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmarks a sweep of simple moving averages computed one window at a time against moving_average_sweep
+
+python benchmarks/moving_average_sweep.py
+"""
+
+import time
+from datetime import date, timedelta
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+
+SYMBOLS = 200
+BARS = 2500
+WINDOWS = list(range(5, 251))
+
+
+def random_closes(symbols: int, bars: int, seed: int=0) -> pl.DataFrame:
+    """random walk closes for symbols with bars rows each"""
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (symbols, bars)), axis=1))
+    dates = [date(2000, 1, 3) + timedelta(days=i) for i in range(bars)]
+    return pl.DataFrame({
+        pi.SYMBOL_COLUMN: np.repeat([f"S{i}" for i in range(symbols)], bars),
+        pi.DATE_COLUMN: dates * symbols,
+        pi.CLOSE_COLUMN: closes.ravel(),
+    })
+
+
+def timed(function) -> tuple[float, pl.DataFrame]:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    df = random_closes(SYMBOLS, BARS)
+    print(f"{len(df)} rows, {len(WINDOWS)} windows")
+
+    def separate():
+        lf = df.lazy()
+        for days in WINDOWS:
+            lf = pi.simple_moving_average(lf, days).df
+        return lf.collect()
+
+    single_time, _ = timed(lambda: pi.simple_moving_average(df, WINDOWS[-1]).df)
+    separate_time, expected = timed(separate)
+    sweep_time, result = timed(lambda: pi.moving_average_sweep(df, WINDOWS).df)
+    sweep32_time, result32 = timed(lambda: pi.moving_average_sweep(df, WINDOWS, float32=True).df)
+
+    columns = ['SMA' + str(days) for days in WINDOWS]
+    error = max((result[column] - expected[column]).abs().max() for column in columns)
+    error32 = max((result32[column] - expected[column]).abs().max() for column in columns)
+
+    print(f"one rolling_mean:            {single_time:8.3f}s")
+    print(f"rolling_mean per window:     {separate_time:8.3f}s")
+    print(f"moving_average_sweep:        {sweep_time:8.3f}s  max abs error {error:.2e}")
+    print(f"moving_average_sweep f32:    {sweep32_time:8.3f}s  max abs error {error32:.2e}")
+
+
+if __name__ == '__main__':
+    main()
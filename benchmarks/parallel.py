@@ -0,0 +1,58 @@
+"""
+Benchmarks buy_x_week_low.strategy run on batches of symbols with 1 to N workers
+
+python benchmarks/parallel.py [max workers]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from functools import partial
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import parallel
+from polars_indicators.strategies import buy_x_week_low
+
+SYMBOLS = 1000
+BARS = 2000
+REPEATS = 3
+
+
+def random_bars(symbols: int, bars: int, seed: int=0) -> pl.DataFrame:
+    """random walk daily bars for symbols with bars rows each"""
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (symbols, bars)), axis=1)).ravel()
+    dates = [datetime(2000, 1, 3) + timedelta(days=i) for i in range(bars)]
+    return pl.DataFrame({
+        pi.SYMBOL_COLUMN: np.repeat([f"S{i}" for i in range(symbols)], bars),
+        pi.DATE_COLUMN: dates * symbols,
+        pi.OPEN_COLUMN: closes,
+        pi.HIGH_COLUMN: closes * 1.01,
+        pi.LOW_COLUMN: closes * 0.99,
+        pi.CLOSE_COLUMN: closes,
+    })
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    df = random_bars(SYMBOLS, BARS)
+    strategy = partial(buy_x_week_low.strategy, lookback=timedelta(weeks=52))
+    print(f"{len(df)} rows, {os.cpu_count()} cpus")
+
+    print(f"{'workers':>8} {'thread s':>10} {'process s':>10}")
+    for workers in range(1, max_workers + 1):
+        times = {}
+        for executor in ["thread", "process"]:
+            runs = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                parallel.run_partitioned(df, strategy, workers=workers, executor=executor)
+                runs.append(time.perf_counter() - start)
+            times[executor] = min(runs)
+        print(f"{workers:>8} {times['thread']:>10.3f} {times['process']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmarks how long it takes to build (not collect) a chain of indicators as the chain gets longer
+Compares passing a LazyFrame from indicator to indicator with building the same chain through a Pipeline
+Resolving the schema for the column checks is cheap since every plan node caches its schema
+The growth per step comes from each with_columns node copying the schema of a frame that gets wider with every indicator
+    so what keeps a chain close to linear is adding fewer nodes. Every indicator adds one and the Pipeline merges independent ones
+
+python benchmarks/plan_construction.py
+"""
+
+import time
+import polars as pl
+import polars_indicators as pi
+from polars_indicators.pipeline import Pipeline
+
+CHAIN_LENGTHS = [10, 25, 50, 100, 200]
+REPEATS = 5
+
+
+def chain_pipeline(length: int) -> Pipeline:
+    """length indicators cycling through the indicator types"""
+    pipeline = Pipeline()
+    for i in range(length):
+        step = i % 5
+        days = i + 2
+        if step == 0:
+            pipeline.add(pi.simple_moving_average, days=days)
+        elif step == 1:
+            pipeline.add(pi.crossover, column1=pi.CLOSE_COLUMN, column2=f"SMA{days - 1}")
+        elif step == 2:
+            pipeline.add(pi.trailing_stop, bars=days)
+        elif step == 3:
+            pipeline.add(pi.targeted_value, targets=f"SMA{days - 3}")
+        else:
+            pipeline.add(pi.limit_entries, bars=2, entries=f"SMA{days - 4}_targets")
+    return pipeline
+
+
+def build_chain(lf: pl.LazyFrame, pipeline: Pipeline) -> pl.LazyFrame:
+    """calls the indicators of the pipeline one after another on lf"""
+    for spec in pipeline.specs:
+        lf = spec.function(lf, **spec.kwargs).df
+    return lf
+
+
+def time_build(build) -> float:
+    """best of REPEATS build times in seconds"""
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        build()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def nodes(lf: pl.LazyFrame) -> int:
+    """number of with_columns nodes in the plan"""
+    return lf.explain(optimized=False).count("WITH_COLUMNS")
+
+
+def main():
+    lf = pl.DataFrame({
+        pi.SYMBOL_COLUMN: ['A'] * 10,
+        pi.OPEN_COLUMN: [1.0] * 10,
+        pi.HIGH_COLUMN: [1.0] * 10,
+        pi.LOW_COLUMN: [1.0] * 10,
+        pi.CLOSE_COLUMN: [1.0] * 10,
+    }).lazy()
+
+    print(f"{'length':>8} {'chain ms':>10} {'per step us':>12} {'nodes':>6} {'pipeline ms':>12} {'per step us':>12} {'nodes':>6}")
+    for length in CHAIN_LENGTHS:
+        pipeline = chain_pipeline(length)
+        chain = time_build(lambda: build_chain(lf, pipeline))
+        planned = time_build(lambda: pipeline.plan(lf))
+        chain_nodes = nodes(build_chain(lf, pipeline))
+        planned_nodes = nodes(pipeline.plan(lf).df)
+        print(f"{length:>8} {chain * 1e3:>10.2f} {chain / length * 1e6:>12.1f} {chain_nodes:>6} {planned * 1e3:>12.2f} {planned / length * 1e6:>12.1f} {planned_nodes:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmarks portfolio.simulate on a trade table of symbols x years and portfolio.backtest on bars with trades from buy_x_week_low
+The trade table has about 10 trades per symbol per year of 1 to 20 bars drawn with numpy so it scales past what the bars would fit in memory
+Each run is in its own process so the peak memory is for that run alone
+
+python benchmarks/portfolio.py [symbols] [years] [backtest symbols] [backtest years]
+"""
+
+import resource
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import portfolio
+from polars_indicators.strategies import buy_x_week_low
+from data import ohlcv, TRADING_DAYS
+
+TRADES_PER_YEAR = 10
+
+
+def trade_table(symbols: int, years: float, seed: int=0) -> pl.DataFrame:
+    """trades of every symbol at random start dates in symbol and start order"""
+    rng = np.random.default_rng(seed)
+    days = int(years * TRADING_DAYS)
+    count = int(symbols * years * TRADES_PER_YEAR)
+    symbol = np.sort(rng.integers(0, symbols, count))
+    start = rng.integers(0, days, count)
+    end = np.minimum(start + rng.integers(0, 20, count), days - 1)
+    entry = rng.uniform(5, 500, count)
+    first = date(2023, 12, 29) - timedelta(days=days)
+    trades = pl.DataFrame({
+        pi.SYMBOL_COLUMN: symbol.astype(str),
+        portfolio.START: start,
+        portfolio.END: end,
+        portfolio.ENTRY_PRICE: entry,
+        portfolio.EXIT_PRICE: entry * rng.normal(1.002, 0.05, count),
+    })
+    return trades.with_columns(
+        (pl.lit(first) + pl.duration(days=pl.col(portfolio.START))).alias(portfolio.START),
+        (pl.lit(first) + pl.duration(days=pl.col(portfolio.END))).alias(portfolio.END),
+    ).sort([pi.SYMBOL_COLUMN, portfolio.START])
+
+
+def run(mode: str, symbols: int, years: float):
+    if mode == "simulate":
+        df = trade_table(symbols, years)
+        start = time.perf_counter()
+        result = portfolio.simulate(df, capital=1_000_000, position_size=0.01, max_positions=100)
+    else:
+        df = ohlcv(symbols, years).with_columns(pl.col(pi.DATE_COLUMN).cast(pl.Datetime))
+        ret = buy_x_week_low.strategy(df, timedelta(weeks=4))
+        start = time.perf_counter()
+        result = portfolio.backtest(ret.df, ret.column, f"{timedelta(weeks=4)}_week_min_targets", "exit_column",
+                                    capital=1_000_000, position_size=0.01, max_positions=100)
+        result.year_stats()
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>10} {len(df):>10} {len(result.trades):>10} {seconds:>10.3f} {peak:>10.0f}")
+
+
+def main():
+    symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    years = float(sys.argv[2]) if len(sys.argv) > 2 else 25
+    backtest_symbols = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    backtest_years = float(sys.argv[4]) if len(sys.argv) > 4 else 10
+    print(f"{'':>10} {'rows':>10} {'taken':>10} {'seconds':>10} {'peak MB':>10}")
+    subprocess.run([sys.executable, __file__, "simulate", str(symbols), str(years)], check=True)
+    subprocess.run([sys.executable, __file__, "backtest", str(backtest_symbols), str(backtest_years)], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] in ("simulate", "backtest"):
+        run(sys.argv[1], int(sys.argv[2]), float(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,60 @@
+"""
+Benchmarks robustness.resample against one resample at a time in a Python loop
+The trades come from a numpy draw of returns like a strategy with a small edge
+Throughput is in resamples per second
+
+python benchmarks/robustness.py [trades] [resamples]
+"""
+
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+import polars as pl
+from polars_indicators import robustness
+
+
+def trade_table(trades: int, seed: int=0) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    entry = rng.uniform(5, 500, trades)
+    return pl.DataFrame({"Entry_Price": entry, "Exit_Price": entry * rng.normal(1.002, 0.05, trades)})
+
+
+def loop(trades: pl.DataFrame, resamples: int) -> int:
+    """a bootstrap resample and its statistics at a time"""
+    returns = (trades["Exit_Price"] / trades["Entry_Price"] - 1).to_numpy()
+    rng = np.random.default_rng(0)
+    for _ in range(resamples):
+        sample = returns[rng.integers(0, len(returns), len(returns))]
+        equity = np.cumprod(1 + 0.1 * sample)
+        (sample > 0).mean(), sample.mean(), (equity / np.maximum(np.maximum.accumulate(equity), 1) - 1).min(), equity[-1]
+    return resamples
+
+
+def run(mode: str, trades: int, resamples: int):
+    df = trade_table(trades)
+    start = time.perf_counter()
+    if mode == "loop":
+        done = loop(df, resamples)
+    else:
+        done = len(robustness.resample(df, resamples, method=mode, seed=0, position_size=0.1).samples)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>10} {done:>10} {seconds:>10.3f} {done / seconds:>14.0f} {peak:>10.0f}")
+
+
+def main():
+    trades = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    resamples = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    print(f"{trades} trades")
+    print(f"{'':>10} {'resamples':>10} {'seconds':>10} {'resamples/s':>14} {'peak MB':>10}")
+    for mode in ["loop", "bootstrap", "shuffle"]:
+        subprocess.run([sys.executable, __file__, mode, str(trades), str(resamples)], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] in ("loop", "bootstrap", "shuffle"):
+        run(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
+    else:
+        main()
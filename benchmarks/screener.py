@@ -0,0 +1,58 @@
+"""
+Benchmarks screener.top against sorting the whole frame by date and value and taking the head of every date
+The ranked column is the spread of the Close over its 20 day average
+scan_latest screens the last bars of a prepared parquet file with scan_parquet so Bars_Left == 0 is selected in the scan
+Each run is in its own process so the peak memory is for that run alone
+
+python benchmarks/screener.py [symbols] [years] [n]
+"""
+
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import screener
+from data import ohlcv
+
+
+def run(mode: str, path: Path, n: int):
+    df = pl.read_parquet(path) if mode != "scan_latest" else None
+    start = time.perf_counter()
+    if mode == "scan_latest":
+        rows = len(screener.top(pl.scan_parquet(path), "Spread", n, latest=True).collect())
+    elif mode == "sort":
+        rows = len(df.filter(pl.col("Spread").is_not_null()).sort([pi.DATE_COLUMN, "Spread"], descending=[False, True]).groupby(
+            pi.DATE_COLUMN, maintain_order=True).head(n))
+    elif mode == "sort_latest":
+        last = df.filter(pl.col(pi.BARS_LEFT_COLUMN) == 0).drop_nulls("Spread").sort("Spread", descending=True)
+        rows = len(last.head(n))
+    else:
+        rows = len(screener.top(df, "Spread", n, latest=mode == "top_latest"))
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>12} {seconds:>10.3f} {peak:>10.0f} {rows:>10}")
+
+
+def main():
+    symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    years = float(sys.argv[2]) if len(sys.argv) > 2 else 4
+    n = sys.argv[3] if len(sys.argv) > 3 else "50"
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "prices.parquet"
+        df = pi.simple_moving_average(pi.prepare(ohlcv(symbols, years)), 20).df
+        df.with_columns((pl.col(pi.CLOSE_COLUMN) / pl.col("SMA20") - 1).alias("Spread")).write_parquet(path)
+        print(f"{len(df)} rows, {symbols} symbols, top {n}")
+        print(f"{'':>12} {'seconds':>10} {'peak MB':>10} {'rows':>10}")
+        for mode in ["sort", "top", "sort_latest", "top_latest", "scan_latest"]:
+            subprocess.run([sys.executable, __file__, mode, str(path), n], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] in ("sort", "top", "sort_latest", "top_latest", "scan_latest"):
+        run(sys.argv[1], Path(sys.argv[2]), int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,87 @@
+"""
+Benchmarks reading a few symbols and years from the Parquet store against loading the whole history from CSV
+Each loader runs in its own process so the peak memory is for that loader alone
+
+python benchmarks/store.py
+"""
+
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import store
+
+SYMBOLS = 500
+YEARS = 25
+SELECTED = [f"S{i}" for i in range(0, SYMBOLS, SYMBOLS // 20)]
+START = date(2022, 1, 1)
+END = date(2023, 12, 31)
+
+
+def random_bars(symbols: int, years: int, seed: int=0) -> pl.DataFrame:
+    """random walk weekday bars for symbols over years ending in 2023"""
+    rng = np.random.default_rng(seed)
+    days = [date(2024 - years, 1, 1) + timedelta(days=i) for i in range(365 * years)]
+    days = [day for day in days if day.weekday() < 5]
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (symbols, len(days))), axis=1)).ravel()
+    return pl.DataFrame({
+        pi.SYMBOL_COLUMN: np.repeat([f"S{i}" for i in range(symbols)], len(days)),
+        pi.DATE_COLUMN: days * symbols,
+        pi.OPEN_COLUMN: closes,
+        pi.HIGH_COLUMN: closes * 1.01,
+        pi.LOW_COLUMN: closes * 0.99,
+        pi.CLOSE_COLUMN: closes,
+        pi.VOLUMNE_COLUMN: rng.integers(0, 1_000_000, len(closes)),
+    })
+
+
+def load_csv(directory: Path) -> pl.DataFrame:
+    df = pl.read_csv(directory / "prices.csv", try_parse_dates=True)
+    df = df.filter(pl.col(pi.SYMBOL_COLUMN).is_in(SELECTED) & pl.col(pi.DATE_COLUMN).is_between(START, END))
+    return pi.simple_moving_average(df, 20).df
+
+
+def load_store(directory: Path) -> pl.DataFrame:
+    lf = store.scan_prices(directory / "store", symbols=SELECTED, start=START, end=END)
+    return pi.simple_moving_average(lf, 20).df.collect()
+
+
+def write(directory: Path):
+    """writes the same bars as CSV and to the store"""
+    df = random_bars(SYMBOLS, YEARS)
+    df.write_csv(directory / "prices.csv")
+    store.write_prices(df, directory / "store")
+    print(f"{len(df)} rows, {len(SELECTED)} symbols from {START} to {END}")
+
+
+def run(loader: str, directory: Path):
+    """runs one loader and prints its time and peak memory"""
+    start = time.perf_counter()
+    df = {"csv": load_csv, "store": load_store}[loader](directory)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{loader:>8} {seconds:>10.3f} {peak:>10.0f} {len(df):>10}")
+
+
+def main():
+    #every step runs in a new process. The peak memory of a process carries over to the processes it starts
+    with tempfile.TemporaryDirectory() as directory:
+        subprocess.run([sys.executable, __file__, "write", directory], check=True)
+        print(f"{'':>8} {'seconds':>10} {'peak MB':>10} {'rows':>10}")
+        for loader in ["csv", "store"]:
+            subprocess.run([sys.executable, __file__, loader, directory], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "write":
+        write(Path(sys.argv[2]))
+    elif len(sys.argv) == 3:
+        run(sys.argv[1], Path(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,77 @@
+"""
+Benchmarks running the indicators on a Parquet file in memory against streaming.sink in batches of symbols
+sink reads its batches from the Parquet file and from a price store of the same bars
+Each run is in its own process so the peak memory is for that run alone
+
+python benchmarks/streaming.py [symbols] [years]
+"""
+
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import exits, store, streaming
+from data import ohlcv
+
+SYMBOLS_PER_BATCH = 250
+
+
+def add_indicators(df: pl.DataFrame | pl.LazyFrame) -> pi.IndicatorsResult:
+    df = pi.simple_moving_average(df, 20).df
+    df = pi.targeted_value(df, 'SMA20').df
+    return exits.trade_exits(df, 'SMA20_targets', percentage=-5, trailing_bars=2)
+
+
+def in_memory(directory: Path) -> int:
+    df = add_indicators(pl.read_parquet(directory / "prices.parquet")).df
+    df.write_parquet(directory / "memory.parquet")
+    return len(df)
+
+
+def sink(directory: Path) -> int:
+    lf = streaming.sink(pl.scan_parquet(directory / "prices.parquet"), add_indicators, directory / "sink", SYMBOLS_PER_BATCH)
+    return lf.select(pl.count()).collect(streaming=True).item()
+
+
+def sink_store(directory: Path) -> int:
+    lf = streaming.sink(directory / "store", add_indicators, directory / "sink_store", SYMBOLS_PER_BATCH)
+    return lf.select(pl.count()).collect(streaming=True).item()
+
+
+def write(directory: Path, symbols: int, years: float):
+    df = ohlcv(symbols, years)
+    df.write_parquet(directory / "prices.parquet", row_group_size=50_000)
+    store.write_prices(df, directory / "store")
+    print(f"{len(df)} rows, {symbols} symbols, {SYMBOLS_PER_BATCH} symbols per batch")
+
+
+def run(mode: str, directory: Path):
+    start = time.perf_counter()
+    rows = {"memory": in_memory, "sink": sink, "sink_store": sink_store}[mode](directory)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>10} {seconds:>10.3f} {peak:>10.0f} {rows:>10}")
+
+
+def main():
+    symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    years = sys.argv[2] if len(sys.argv) > 2 else "4"
+    #every step runs in a new process. The peak memory of a process carries over to the processes it starts
+    with tempfile.TemporaryDirectory() as directory:
+        subprocess.run([sys.executable, __file__, "write", directory, str(symbols), years], check=True)
+        print(f"{'':>10} {'seconds':>10} {'peak MB':>10} {'rows':>10}")
+        for mode in ["memory", "sink", "sink_store"]:
+            subprocess.run([sys.executable, __file__, mode, directory], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "write":
+        write(Path(sys.argv[2]), int(sys.argv[3]), float(sys.argv[4]))
+    elif len(sys.argv) == 3 and sys.argv[1] in ("memory", "sink", "sink_store"):
+        run(sys.argv[1], Path(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,201 @@
+"""
+Benchmark suite of every public indicator and the buy_x_week_low strategy in eager and lazy mode
+Bars come from the seeded generator in data.py so runs on the same machine are comparable. Nothing is downloaded
+Each case runs in its own process so its peak memory isn't hidden by the cases before it
+    peak MB is the most memory the process held while running the case less what it held with the bars loaded
+    on linux the peak is reset after the bars are prepared. Elsewhere it only shows what went above the peak of preparing them
+Results are saved as JSON and compare flags the cases that got slower or used more memory than a stored baseline
+
+python benchmarks/suite.py run [--symbols 1000] [--years 2] [--output results.json] [--cases simple_moving_average,buy_x_week_low]
+python benchmarks/suite.py compare baseline.json results.json [--threshold 1.5]
+    exits with 1 if any case regressed
+Sizes of 1000, 10000 and 100000 symbols are the ones tracked
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import exits
+from polars_indicators.strategies import buy_x_week_low
+from data import ohlcv
+
+REPEATS = 3
+MODES = ["eager", "lazy"]
+
+
+def with_signals(df: pl.DataFrame) -> pl.DataFrame:
+    """bars with the columns the dependent indicators read"""
+    df = pi.simple_moving_average(df, 20).df
+    df = pi.targeted_value(df, 'SMA20').df
+    return pi.trailing_stop(df, 2).df
+
+
+#name -> (prepares the bars, runs the case on the bars or their LazyFrame, modes it supports)
+CASES: dict[str, tuple[Callable[[pl.DataFrame], pl.DataFrame], Callable, list[str]]] = {
+    "simple_moving_average": (lambda df: df, lambda df: pi.simple_moving_average(df, 20).df, MODES),
+    "moving_average_sweep": (lambda df: df, lambda df: pi.moving_average_sweep(df, list(range(5, 55, 5))).df, MODES),
+    "exponential_moving_average": (lambda df: df, lambda df: pi.exponential_moving_average(df, 20).df, MODES),
+    "average_true_range": (lambda df: df, lambda df: pi.average_true_range(df, 14).df, MODES),
+    "relative_strength_index": (lambda df: df, lambda df: pi.relative_strength_index(df, 14).df, MODES),
+    "bollinger_bands": (lambda df: df, lambda df: pi.bollinger_bands(df, 20).df, MODES),
+    "keltner_channels": (lambda df: df, lambda df: pi.keltner_channels(df, 20).df, MODES),
+    "crossover_up": (with_signals, lambda df: pi.crossover_up(df, pi.CLOSE_COLUMN, 'SMA20').df, MODES),
+    "crossover_down": (with_signals, lambda df: pi.crossover_down(df, pi.CLOSE_COLUMN, 'SMA20').df, MODES),
+    "crossover": (with_signals, lambda df: pi.crossover(df, pi.CLOSE_COLUMN, 'SMA20').df, MODES),
+    "crossovers": (with_signals, lambda df: pi.crossovers(df, [(pi.CLOSE_COLUMN, 'SMA20'), (pi.CLOSE_COLUMN, 'SMA20', 0.95)]).df, MODES),
+    "trailing_stop": (lambda df: df, lambda df: pi.trailing_stop(df, 2).df, MODES),
+    "end_of_data_stop": (lambda df: df, lambda df: pi.end_of_data_stop(df).df, MODES),
+    "entry_percentage_stop": (with_signals, lambda df: pi.entry_percentage_stop(df, -5, 'SMA20_targets').df, MODES),
+    "targeted_value": (lambda df: pi.simple_moving_average(df, 20).df, lambda df: pi.targeted_value(df, 'SMA20').df, MODES),
+    "limit_entries": (with_signals, lambda df: pi.limit_entries(df, 5, 'SMA20_targets').df, MODES),
+    "create_trade_ids": (with_signals, lambda df: pi.create_trade_ids(df, 'SMA20_targets', '2_bar_trailing_stop').df, MODES),
+    "trade_indices": (lambda df: pi.create_trade_ids(with_signals(df), 'SMA20_targets', '2_bar_trailing_stop').df,
+                      lambda df: pi.trade_indices(df, 'SMA20_targets/2_bar_trailing_stop', '2_bar_trailing_stop'), MODES),
+    "trade_exits": (with_signals, lambda df: exits.trade_exits(df, 'SMA20_targets', percentage=-5, trailing_bars=2).df, MODES),
+    #the strategy filters on the first date of the frame so it only takes DataFrames
+    "buy_x_week_low": (lambda df: df.with_columns(pl.col(pi.DATE_COLUMN).cast(pl.Datetime)),
+                       lambda df: buy_x_week_low.strategy(df, timedelta(weeks=52)).df, ["eager"]),
+    #the same cases on compact dtypes to track what compact saves
+    "simple_moving_average_compact": (lambda df: pi.compact(df, float32=True), lambda df: pi.simple_moving_average(df, 20, float32=True).df, MODES),
+    "buy_x_week_low_compact": (lambda df: pi.compact(df, float32=True),
+                               lambda df: buy_x_week_low.strategy(df, timedelta(weeks=52)).df, ["eager"]),
+}
+
+
+def memory_mb(field: str) -> float | None:
+    """VmRSS or VmHWM of this process from /proc or None where there isn't one"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak() -> float:
+    """resets the peak memory of this process where linux allows it and returns the memory in use
+    elsewhere the peak so far stays and the case only shows if it goes above it"""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+        return memory_mb("VmRSS")
+    except OSError:
+        return peak_mb()
+
+
+def peak_mb() -> float:
+    return memory_mb("VmHWM") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(path: str, name: str, mode: str) -> dict:
+    """times one case on the bars at path. Runs in a new process"""
+    prepare, function, _ = CASES[name]
+    df = prepare(pl.read_parquet(path))
+    loaded = reset_peak()
+
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function(df.lazy() if mode == "lazy" else df)
+        if isinstance(result, pl.LazyFrame):
+            result = result.collect()
+        times.append(time.perf_counter() - start)
+    return {"seconds": min(times), "peak_mb": round(peak_mb() - loaded, 1), "rows_out": len(result)}
+
+
+def run(args: argparse.Namespace):
+    names = args.cases.split(",") if args.cases else list(CASES)
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        sys.exit(f"unknown cases {unknown}. Cases are {list(CASES)}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bars.parquet")
+        df = ohlcv(args.symbols, args.years, seed=args.seed)
+        df.write_parquet(path)
+        meta = {"symbols": args.symbols, "years": args.years, "seed": args.seed, "rows": len(df), "polars": pl.__version__,
+                "python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(), "time": datetime.now().isoformat(timespec="seconds")}
+        del df
+        print(f"{meta['rows']} rows, {args.symbols} symbols, {args.years} years")
+
+        results = {}
+        print(f"{'case':<36} {'seconds':>10} {'peak MB':>10}")
+        #a new process per case so the peak memory of one case doesn't carry into the next
+        context = multiprocessing.get_context("spawn")
+        for name in names:
+            for mode in CASES[name][2]:
+                with context.Pool(1) as pool:
+                    result = pool.apply(run_case, (path, name, mode))
+                key = f"{name}/{mode}"
+                results[key] = result
+                print(f"{key:<36} {result['seconds']:>10.3f} {result['peak_mb']:>10.1f}")
+
+    Path(args.output).write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+    print(f"saved to {args.output}")
+
+
+def compare(args: argparse.Namespace):
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    if (baseline["meta"]["symbols"], baseline["meta"]["years"]) != (current["meta"]["symbols"], current["meta"]["years"]):
+        print("warning: the runs used different sizes so the ratios aren't comparable")
+
+    regressions = 0
+    print(f"{'case':<36} {'baseline s':>10} {'current s':>10} {'ratio':>7} {'base MB':>9} {'cur MB':>9}")
+    for key, result in current["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            print(f"{key:<36} {'':>10} {result['seconds']:>10.3f} {'new':>7}")
+            continue
+        ratio = result["seconds"] / base["seconds"] if base["seconds"] > 0 else float("inf")
+        #a few milliseconds either way is noise for the fastest cases
+        time_regressed = ratio > args.threshold and result["seconds"] - base["seconds"] > 0.005
+        #memory only counts as a regression once it's more than a few MB since small peaks are noise
+        memory_regressed = result["peak_mb"] > max(base["peak_mb"] * args.threshold, base["peak_mb"] + 16)
+        flag = ""
+        if time_regressed or memory_regressed:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{key:<36} {base['seconds']:>10.3f} {result['seconds']:>10.3f} {ratio:>7.2f} {base['peak_mb']:>9.1f} {result['peak_mb']:>9.1f}{flag}")
+
+    print(f"{regressions} regressions at threshold {args.threshold}")
+    sys.exit(1 if regressions else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="runs the cases and saves the results")
+    run_parser.add_argument("--symbols", type=int, default=1000)
+    run_parser.add_argument("--years", type=float, default=2)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", default="results.json")
+    run_parser.add_argument("--cases", help="comma separated cases. Defaults to every case")
+    run_parser.set_defaults(function=run)
+
+    compare_parser = commands.add_parser("compare", help="flags cases slower than the baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=1.5, help="ratio of current to baseline that counts as a regression")
+    compare_parser.set_defaults(function=compare)
+
+    args = parser.parse_args()
+    args.function(args)
+
+
+if __name__ == "__main__":
+    main()
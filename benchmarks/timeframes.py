@@ -0,0 +1,62 @@
+"""
+Benchmarks weekly and monthly indicators from timeframes.higher_timeframe against approximating them on the daily bars
+higher runs 10 and 40 week averages, their crossovers, a 14 week RSI and ATR and a 3 month trailing stop on the resampled bars and joins them back
+daily runs the same indicators over 5 times as many daily bars and a 63 bar trailing stop like buy_x_week_low's rolling low does
+Each run is in its own process so the peak memory is for that run alone
+
+python benchmarks/timeframes.py [symbols] [years]
+"""
+
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import timeframes
+from data import ohlcv
+
+
+def weekly_indicators(df: pl.DataFrame, days: int=1) -> pi.IndicatorsResult:
+    """the weekly indicators with every length scaled by days"""
+    df = pi.simple_moving_average(df, 10 * days).df
+    df = pi.simple_moving_average(df, 40 * days).df
+    crossovers = pi.crossovers(df, [(f"SMA{10 * days}", f"SMA{40 * days}")])
+    rsi = pi.relative_strength_index(crossovers.df, 14 * days)
+    atr = pi.average_true_range(rsi.df, 14 * days)
+    return pi.IndicatorsResult(atr.df, [f"SMA{10 * days}", f"SMA{40 * days}"] + crossovers.columns + [rsi.column, atr.column])
+
+
+def run(mode: str, path: Path):
+    df = pl.read_parquet(path)
+    start = time.perf_counter()
+    if mode == "daily":
+        df = pi.trailing_stop(weekly_indicators(df, 5).df, 63).df
+    else:
+        df = timeframes.higher_timeframe(df, weekly_indicators, "1w").df
+        df = timeframes.higher_timeframe(df, lambda bars: pi.trailing_stop(bars, 3), "1mo").df
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>10} {seconds:>10.3f} {peak:>10.0f} {len(df):>10}")
+
+
+def main():
+    symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    years = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "prices.parquet"
+        df = ohlcv(symbols, years)
+        df.write_parquet(path)
+        print(f"{len(df)} rows, {symbols} symbols, {len(timeframes.resample(df, '1w'))} weekly and {len(timeframes.resample(df, '1mo'))} monthly bars")
+        print(f"{'':>10} {'seconds':>10} {'peak MB':>10} {'rows':>10}")
+        for mode in ["daily", "higher"]:
+            subprocess.run([sys.executable, __file__, mode, str(path)], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] in ("daily", "higher"):
+        run(sys.argv[1], Path(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,70 @@
+"""
+Benchmarks SMA20, bollinger_bands(20), keltner_channels(20) and average_true_range(14) on the same bars
+computed on their own like separate libraries would against the indicators sharing their intermediate columns
+
+python benchmarks/volatility.py [symbols] [years]
+"""
+
+import math
+import sys
+import time
+import polars as pl
+import polars_indicators as pi
+from data import ohlcv
+
+
+def timed(function) -> tuple[float, pl.DataFrame]:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def separate(df: pl.DataFrame) -> pl.DataFrame:
+    """every indicator computes its own mean, deviation, true range and averages"""
+    close = pl.col(pi.CLOSE_COLUMN)
+    #every expression below runs over the symbol so the shift stays inside it
+    previous = close.shift(1).fill_null(close)
+    true_range = pl.max([pl.col(pi.HIGH_COLUMN), previous]) - pl.min([pl.col(pi.LOW_COLUMN), previous])
+    mean = close.rolling_mean(20).over(pi.SYMBOL_COLUMN)
+    deviation = close.rolling_std(20).over(pi.SYMBOL_COLUMN) * math.sqrt(19 / 20)
+    ema = close.ewm_mean(span=20, adjust=False, min_periods=20).over(pi.SYMBOL_COLUMN)
+
+    def atr(days: int) -> pl.Expr:
+        return true_range.ewm_mean(alpha=1 / days, adjust=False, min_periods=days).over(pi.SYMBOL_COLUMN)
+
+    return df.with_columns(
+        mean.alias('SMA20'),
+        (mean + 2 * deviation).alias('BB20_2_Upper'),
+        (mean - 2 * deviation).alias('BB20_2_Lower'),
+        (ema + 2 * atr(10)).alias('KC20_10_2_Upper'),
+        (ema - 2 * atr(10)).alias('KC20_10_2_Lower'),
+        atr(14).alias('ATR14'),
+    )
+
+
+def shared(df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    df = pi.simple_moving_average(df, 20).df
+    df = pi.bollinger_bands(df, 20).df
+    df = pi.keltner_channels(df, 20).df
+    return pi.average_true_range(df, 14).df
+
+
+def main():
+    symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    years = float(sys.argv[2]) if len(sys.argv) > 2 else 4
+    df = ohlcv(symbols, years)
+    print(f"{len(df)} rows, {symbols} symbols")
+
+    separate_time, expected = timed(lambda: separate(df))
+    shared_time, result = timed(lambda: shared(df))
+    lazy_time, _ = timed(lambda: shared(df.lazy()).collect())
+    columns = ['BB20_2_Upper', 'KC20_10_2_Upper', 'ATR14']
+    error = max((result[column] - expected[column]).abs().max() for column in columns)
+
+    print(f"each indicator on its own:  {separate_time:8.3f}s")
+    print(f"shared intermediates:       {shared_time:8.3f}s  max abs error {error:.2e}")
+    print(f"shared intermediates lazy:  {lazy_time:8.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmarks buy_x_week_low.walk_forward against rerunning the whole strategy on every window
+1 year in-sample and 3 months out-of-sample windows over 2 lookbacks x 3 stop percentages x 3 trailing stops
+The rerun slices each window with its lookback before it and calls strategy for every combination on both samples
+Each run is in its own process so the peak memory is for that run alone
+
+python benchmarks/walk_forward.py [symbols] [years]
+"""
+
+import itertools
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+import polars as pl
+import polars_indicators as pi
+from polars_indicators.strategies import buy_x_week_low
+from data import ohlcv
+
+LOOKBACKS = [timedelta(weeks=26), timedelta(weeks=52)]
+PERCENTAGES = [-3.0, -5.0, -10.0]
+TRAILING_BARS = [2, 5, 10]
+IN_SAMPLE = timedelta(days=365)
+OUT_OF_SAMPLE = timedelta(days=91)
+
+
+def rerun(df: pl.DataFrame) -> int:
+    """the strategy on every sample of every window for every combination with its lookback of warmup"""
+    start = df[pi.DATE_COLUMN].min() + max(LOOKBACKS)
+    windows = 0
+    while start + IN_SAMPLE <= df[pi.DATE_COLUMN].max():
+        for first, after in ((start, start + IN_SAMPLE), (start + IN_SAMPLE, start + IN_SAMPLE + OUT_OF_SAMPLE)):
+            for lookback, percentage, bars in itertools.product(LOOKBACKS, PERCENTAGES, TRAILING_BARS):
+                part = df.filter((pl.col(pi.DATE_COLUMN) >= first - lookback) & (pl.col(pi.DATE_COLUMN) < after))
+                ret = buy_x_week_low.strategy(part, lookback, percentage, bars)
+                pi.summarize_trades(ret.df, ret.column, f"{lookback}_week_min_targets", "exit_column")
+        windows += 1
+        start += OUT_OF_SAMPLE
+    return windows
+
+
+def run(mode: str, path: Path):
+    df = pl.read_parquet(path)
+    start = time.perf_counter()
+    if mode == "rerun":
+        windows = rerun(df)
+    else:
+        windows = len(buy_x_week_low.walk_forward(df, LOOKBACKS, PERCENTAGES, TRAILING_BARS, IN_SAMPLE, OUT_OF_SAMPLE))
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>14} {seconds:>10.3f} {peak:>10.0f} {windows:>10}")
+
+
+def main():
+    symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    years = float(sys.argv[2]) if len(sys.argv) > 2 else 6
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "prices.parquet"
+        df = ohlcv(symbols, years).with_columns(pl.col(pi.DATE_COLUMN).cast(pl.Datetime))
+        df.write_parquet(path)
+        print(f"{len(df)} rows, {symbols} symbols, {len(LOOKBACKS) * len(PERCENTAGES) * len(TRAILING_BARS)} combinations")
+        print(f"{'':>14} {'seconds':>10} {'peak MB':>10} {'windows':>10}")
+        for mode in ["rerun", "walk_forward"]:
+            subprocess.run([sys.executable, __file__, mode, str(path)], check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] in ("rerun", "walk_forward"):
+        run(sys.argv[1], Path(sys.argv[2]))
+    else:
+        main()
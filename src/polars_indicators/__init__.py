@@ -7,6 +7,7 @@ Each indicator will also only be added if the column doesn't already exist in th
 """
 
 from dataclasses import dataclass
+import math
 import polars as pl
 
 
@@ -25,17 +26,336 @@ class IndicatorResult:
     df: pl.DataFrame | pl.LazyFrame
     column: str
 
-def simple_moving_average(df: pl.DataFrame | pl.LazyFrame, days: int, column: str='Close') -> IndicatorResult:
-    """returns dataframe with simple moving average added as a column"""
-    column_name = 'SMA' + str(days)
-    if column_name in df.columns:
-        pass
+@dataclass
+class IndicatorsResult:
+    """Holds the dataframe with the added columns and the names of those columns
+    Returned by functions that add more than one indicator at a time"""
+    df: pl.DataFrame | pl.LazyFrame
+    columns: list[str]
+
+def _finish(df: pl.DataFrame | pl.LazyFrame, lf: pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    """returns lf as the type of the input df for indicators that build their own LazyFrame"""
+    if isinstance(df, pl.LazyFrame):
+        return lf
+    return lf.collect()
+
+def _symbol_by(columns: list[str]) -> str | None:
+    """returns the column to partition windows by or None for single symbol data"""
+    return SYMBOL_COLUMN if SYMBOL_COLUMN in columns else None
+
+BAR_COLUMN = "Bar"
+BARS_LEFT_COLUMN = "Bars_Left"
+
+def _prepared(columns: list[str]) -> bool:
+    """True if the frame has the symbol boundary index added by prepare"""
+    return BAR_COLUMN in columns and BARS_LEFT_COLUMN in columns
+
+def prepare(df: pl.DataFrame | pl.LazyFrame, sort: bool=True) -> pl.DataFrame | pl.LazyFrame:
+    """returns df in (Symbol, Date) order with a symbol boundary index the indicators use instead of windows over Symbol
+    Bar is the index of each row within its symbol and Bars_Left is how many rows of its symbol come after it
+        so the first bar of a symbol is Bar == 0 and the last is Bars_Left == 0
+        windowed indicators run over the whole frame and null the rows whose window starts in the symbol before
+    DataFrames out of order are sorted or raise ValueError if sort is False
+    LazyFrames can't be checked without collecting them so they're sorted whenever sort is True
+    The index is only right for the rows it was made on. Call prepare again after filtering rows
+        the filters inside the library like buy_x_week_low's lookback and chunked windows renumber it themselves"""
+    df = df.drop([column for column in (BAR_COLUMN, BARS_LEFT_COLUMN) if column in df.columns])
+    by = _symbol_by(df.columns)
+    order = [column for column in (SYMBOL_COLUMN, DATE_COLUMN) if column in df.columns]
+
+    if isinstance(df, pl.DataFrame) and order and not _in_order(df, by):
+        if not sort:
+            raise ValueError(f"rows must be sorted by {order}")
+        df = df.sort(order)
+    elif isinstance(df, pl.LazyFrame) and order and sort:
+        df = df.sort(order)
+
+    if isinstance(df, pl.DataFrame) and order:
+        #polars can skip sorting and use faster groupbys on columns flagged as sorted
+        flags = []
+        #contiguous symbols aren't always ascending and a wrong flag gives wrong mins and searches
+        if by is not None and df.schema[by] == pl.Utf8 and df.select((pl.col(by) >= pl.col(by).shift(1)).fill_null(True).all()).row(0)[0]:
+            flags.append(pl.col(by).set_sorted())
+        if by is None and DATE_COLUMN in df.columns:
+            flags.append(pl.col(DATE_COLUMN).set_sorted())
+        if flags:
+            df = df.with_columns(flags)
+
+    #the symbols are only compared once here instead of in every indicator
+    row = pl.first().cumcount()
+    if by is not None:
+        first = (pl.col(by) != pl.col(by).shift(1)).fill_null(True)
+        last = (pl.col(by) != pl.col(by).shift(-1)).fill_null(True)
+        bar = row - pl.when(first).then(row).forward_fill()
+        bars_left = pl.when(last).then(row).backward_fill() - row
+    else:
+        bar = row
+        bars_left = row.max() - row
+    return df.with_columns(bar.cast(pl.UInt32).alias(BAR_COLUMN), bars_left.cast(pl.UInt32).alias(BARS_LEFT_COLUMN))
+
+def _reindex(df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    """renumbers the index of prepare after rows were filtered or concatenated. Frames without one are returned as they are
+    the rows have to still be in (Symbol, Date) order. The columns keep their places"""
+    if not _prepared(df.columns):
+        return df
+    return prepare(df, sort=False).select(df.columns)
+
+def _in_order(df: pl.DataFrame, by: str | None) -> bool:
+    """True if the rows of each symbol are contiguous and their dates increase"""
+    checks = []
+    if by is not None:
+        first = (pl.col(by) != pl.col(by).shift(1)).fill_null(True)
+        checks.append((first.sum() == pl.col(by).n_unique()).alias("contiguous"))
+    else:
+        first = pl.lit(False)
+    if DATE_COLUMN in df.columns:
+        checks.append((first | (pl.col(DATE_COLUMN) > pl.col(DATE_COLUMN).shift(1)).fill_null(True)).all().alias("dates"))
+    return all(df.select(checks).row(0))
+
+def symbol_bounds(df: pl.DataFrame) -> pl.DataFrame:
+    """the Start and End row offsets of each symbol of df. End is exclusive
+    uses the index from prepare if df has one. Rows of each symbol must be contiguous"""
+    if _prepared(df.columns):
+        first = pl.col(BAR_COLUMN) == 0
     elif SYMBOL_COLUMN in df.columns:
-        df =  df.with_columns(pl.col(column).rolling_mean(days).over(SYMBOL_COLUMN).alias(column_name))
+        first = (pl.col(SYMBOL_COLUMN) != pl.col(SYMBOL_COLUMN).shift(1)).fill_null(True)
     else:
-        df = df.with_columns(pl.col(column).rolling_mean(days).alias(column_name))
+        return pl.DataFrame({"Start": [0], "End": [len(df)]}, schema={"Start": pl.UInt32, "End": pl.UInt32})
+    symbol = [pl.col(SYMBOL_COLUMN)] if SYMBOL_COLUMN in df.columns else []
+    starts = df.with_row_count("Start").filter(first).select(*symbol, pl.col("Start"))
+    return starts.with_columns(pl.col("Start").shift(-1).fill_null(len(df)).alias("End"))
+
+PRICE_COLUMNS = [OPEN_COLUMN, HIGH_COLUMN, LOW_COLUMN, CLOSE_COLUMN]
+#signed so differences of ids and counts can't wrap around
+_INTEGER_BITS = {pl.Int8: 8, pl.Int16: 16, pl.Int32: 32, pl.Int64: 64}
+
+def compact(df: pl.DataFrame | pl.LazyFrame, float32: bool=False, daily: bool=True) -> pl.DataFrame | pl.LazyFrame:
+    """returns df with smaller dtypes so windows over symbols are faster and frames take less memory
+    Symbol becomes Categorical so partitioning hashes integers instead of strings
+        this turns on the global string cache so compact frames can be joined and concatenated on Symbol
+        polars 0.17 can also crash in later queries after a window over a Categorical made without it
+    a Datetime Date column becomes Date when daily. DataFrames raise ValueError if a date has a time of day
+    float32 stores the prices as Float32. Indicators on Float32 prices match Float64 to about 7 digits
+    integer columns like Volume and trade ids get the smallest integer type that holds them. Only DataFrames since it needs their values"""
+    schema = df.schema
+    casts = []
+    if schema.get(SYMBOL_COLUMN) == pl.Utf8:
+        pl.enable_string_cache(True)
+        casts.append(pl.col(SYMBOL_COLUMN).cast(pl.Categorical))
+    if daily and isinstance(schema.get(DATE_COLUMN), pl.Datetime):
+        if isinstance(df, pl.DataFrame) and not (df[DATE_COLUMN].dt.truncate("1d") == df[DATE_COLUMN]).all():
+            raise ValueError(f"{DATE_COLUMN} has times of day. Pass daily=False to keep them")
+        casts.append(pl.col(DATE_COLUMN).cast(pl.Date))
+    if float32:
+        casts.extend(pl.col(column).cast(pl.Float32) for column in PRICE_COLUMNS if schema.get(column) == pl.Float64)
+    if isinstance(df, pl.DataFrame):
+        for column, dtype in schema.items():
+            if dtype in _INTEGER_BITS:
+                smallest = _smallest_integer(df[column])
+                if smallest != dtype:
+                    casts.append(pl.col(column).cast(smallest))
+    return df.with_columns(casts) if casts else df
+
+def _smallest_integer(series: pl.Series) -> pl.PolarsDataType:
+    """smallest signed integer type that holds every value of series"""
+    low, high = series.min(), series.max()
+    if low is None:
+        return pl.Int8
+    for dtype, bits in _INTEGER_BITS.items():
+        if -2**(bits - 1) <= low and high < 2**(bits - 1):
+            return dtype
+    return pl.Int64
+
+def simple_moving_average(df: pl.DataFrame | pl.LazyFrame, days: int, column: str='Close', float32: bool=False) -> IndicatorResult:
+    """returns dataframe with simple moving average added as a column
+    float32 stores the average as Float32"""
+    column_name = 'SMA' + str(days)
+    if column_name not in df.columns:
+        df = df.with_columns(_simple_moving_average_expr(days, column, _symbol_by(df.columns), float32, _prepared(df.columns)))
     return IndicatorResult(df, column_name)
 
+def _simple_moving_average_expr(days: int, column: str='Close', by: str | None=None, float32: bool=False, prepared: bool=False) -> pl.Expr:
+    """expression behind simple_moving_average
+    prepared frames take the mean over the whole frame and drop windows that start in the symbol before"""
+    expr = pl.col(column).rolling_mean(days)
+    if float32:
+        expr = expr.cast(pl.Float32)
+    if prepared:
+        expr = pl.when(pl.col(BAR_COLUMN) >= days - 1).then(expr).otherwise(None)
+    elif by is not None:
+        expr = expr.over(by)
+    return expr.alias('SMA' + str(days))
+
+def moving_average_sweep(df: pl.DataFrame | pl.LazyFrame, windows: list[int], column: str='Close', float32: bool=False) -> IndicatorsResult:
+    """adds a simple moving average column for every window. Columns are named like simple_moving_average
+    A cumulative sum of column is computed once per symbol and every window is the difference of two of its values
+    so the symbols are only partitioned once no matter how many windows there are
+    Rows of each symbol must be contiguous. float32 stores the averages as Float32. The sums are always Float64"""
+    column_names = ['SMA' + str(days) for days in windows]
+    missing = [days for days in dict.fromkeys(windows) if 'SMA' + str(days) not in df.columns]
+    if not missing:
+        return IndicatorsResult(df, column_names)
+
+    by = _symbol_by(df.columns)
+    total = "sweep_sum"
+    total_before = "sweep_sum_before"
+    index = "sweep_index"
+    run = "sweep_run"
+
+    def per_symbol(expr: pl.Expr) -> pl.Expr:
+        return expr.over(by) if by is not None else expr
+
+    #running sums through each row and before each row so the first row of a symbol has 0 behind it
+    #run is how many non-null values end at each row. A window is only averaged if it has no nulls
+    value = pl.col(column).cast(pl.Float64).fill_null(0)
+    lf = df.lazy().with_columns(
+        per_symbol(value.cumsum()).alias(total),
+        per_symbol(pl.col(column).cumcount()).alias(index),
+    ).with_columns(
+        (pl.col(total) - value).alias(total_before),
+        (pl.col(index) + 1 - per_symbol(((pl.col(index) + 1) * pl.col(column).is_null()).cummax())).alias(run),
+    )
+
+    #a row with a run of at least days can shift back days-1 rows without leaving the symbol
+    averages = []
+    for days in missing:
+        average = pl.when(pl.col(run) >= days).then((pl.col(total) - pl.col(total_before).shift(days - 1)) / days)
+        if float32:
+            average = average.cast(pl.Float32)
+        averages.append(average.alias('SMA' + str(days)))
+
+    #dropping the temporary columns is cheaper than selecting every column of a wide frame
+    lf = lf.with_columns(averages).drop([total, total_before, index, run])
+    return IndicatorsResult(_finish(df, lf), column_names)
+
+def _with_layers(df: pl.DataFrame | pl.LazyFrame, layers: list[list[pl.Expr]]) -> pl.DataFrame | pl.LazyFrame:
+    """adds the expressions of each layer in one with_columns after the layers before it
+    expressions whose column already exists are skipped so indicators that share an intermediate column only compute it once"""
+    known = set(df.columns)
+    lf = df.lazy()
+    for layer in layers:
+        missing = [expr for expr in layer if expr.meta.output_name() not in known]
+        if missing:
+            lf = lf.with_columns(missing)
+            known.update(expr.meta.output_name() for expr in missing)
+    if known == set(df.columns):
+        return df
+    return _finish(df, lf)
+
+TRUE_RANGE_COLUMN = "True_Range"
+
+def exponential_moving_average(df: pl.DataFrame | pl.LazyFrame, days: int) -> IndicatorResult:
+    """adds the exponential moving average of Close with a span of days named 'EMA' + days
+    It starts from the first close of each symbol and is null for the first days-1 bars"""
+    column_name = 'EMA' + str(days)
+    if column_name not in df.columns:
+        df = df.with_columns(_exponential_moving_average_expr(days, _symbol_by(df.columns)))
+    return IndicatorResult(df, column_name)
+
+def _exponential_moving_average_expr(days: int, by: str | None=None) -> pl.Expr:
+    """expression behind exponential_moving_average
+    every bar depends on all the bars before it so it always runs over the symbol"""
+    expr = pl.col(CLOSE_COLUMN).ewm_mean(span=days, adjust=False, min_periods=days)
+    if by is not None:
+        expr = expr.over(by)
+    return expr.alias('EMA' + str(days))
+
+def true_range(df: pl.DataFrame | pl.LazyFrame) -> IndicatorResult:
+    """adds the true range. The largest of High - Low and how far High and Low are from the close before
+    the first bar of a symbol has no close before so it is High - Low"""
+    column_name = TRUE_RANGE_COLUMN
+    if column_name not in df.columns:
+        df = df.with_columns(_true_range_expr(_symbol_by(df.columns), _prepared(df.columns)))
+    return IndicatorResult(df, column_name)
+
+def _true_range_expr(by: str | None=None, prepared: bool=False) -> pl.Expr:
+    """expression behind true_range"""
+    previous = pl.col(CLOSE_COLUMN).shift(1)
+    if prepared:
+        previous = pl.when(pl.col(BAR_COLUMN) > 0).then(previous).otherwise(None)
+    elif by is not None:
+        previous = previous.over(by)
+    #the close is between Low and High so without a close before the range is High - Low
+    previous = previous.fill_null(pl.col(CLOSE_COLUMN))
+    return (pl.max([pl.col(HIGH_COLUMN), previous]) - pl.min([pl.col(LOW_COLUMN), previous])).alias(TRUE_RANGE_COLUMN)
+
+def average_true_range(df: pl.DataFrame | pl.LazyFrame, days: int=14) -> IndicatorResult:
+    """adds Wilder's average of true_range over days named 'ATR' + days and the True_Range column it is built on
+    The average starts from the first true range of each symbol instead of a simple average of the first days
+    so the first values differ from some charting packages until the start is smoothed away"""
+    column_name = 'ATR' + str(days)
+    by = _symbol_by(df.columns)
+    df = _with_layers(df, [[_true_range_expr(by, _prepared(df.columns))], [_average_true_range_expr(days, by)]])
+    return IndicatorResult(df, column_name)
+
+def _average_true_range_expr(days: int, by: str | None=None) -> pl.Expr:
+    """expression behind average_true_range. Reads the True_Range column"""
+    expr = pl.col(TRUE_RANGE_COLUMN).ewm_mean(alpha=1 / days, adjust=False, min_periods=days)
+    if by is not None:
+        expr = expr.over(by)
+    return expr.alias('ATR' + str(days))
+
+def relative_strength_index(df: pl.DataFrame | pl.LazyFrame, days: int=14) -> IndicatorResult:
+    """adds Wilder's relative strength index of Close over days named 'RSI' + days
+    100 * average gain / (average gain + average loss) with the averages smoothed like average_true_range
+    it's 50 when both averages are 0 like after days of unchanged closes and 100 when only the loss is"""
+    column_name = 'RSI' + str(days)
+    if column_name not in df.columns:
+        df = df.with_columns(_relative_strength_index_expr(days, _symbol_by(df.columns)))
+    return IndicatorResult(df, column_name)
+
+def _relative_strength_index_expr(days: int, by: str | None=None) -> pl.Expr:
+    """expression behind relative_strength_index"""
+    change = pl.col(CLOSE_COLUMN).diff()
+    gain = change.clip_min(0).ewm_mean(alpha=1 / days, adjust=False, min_periods=days)
+    loss = (-change).clip_min(0).ewm_mean(alpha=1 / days, adjust=False, min_periods=days)
+    #both averages are at least 0 so the only NaN is 0/0. polars 0.17 can't put a when/then inside over
+    expr = (100 * gain / (gain + loss)).fill_nan(50.0)
+    if by is not None:
+        expr = expr.over(by)
+    return expr.alias('RSI' + str(days))
+
+def bollinger_bands(df: pl.DataFrame | pl.LazyFrame, days: int=20, deviations: float=2) -> IndicatorsResult:
+    """adds bands deviations standard deviations of Close above and below its simple moving average over days
+    Returns the SMA, its standard deviation named 'STD' + days and the bands named like BB20_2_Upper and BB20_2_Lower
+    SMA and STD columns that already exist are reused. The standard deviation is the population one Bollinger uses"""
+    middle = 'SMA' + str(days)
+    deviation = 'STD' + str(days)
+    upper = f"BB{days}_{deviations}_Upper"
+    lower = f"BB{days}_{deviations}_Lower"
+    by = _symbol_by(df.columns)
+    df = _with_layers(df, [
+        [_simple_moving_average_expr(days, CLOSE_COLUMN, by, prepared=_prepared(df.columns)), _standard_deviation_expr(days, by, _prepared(df.columns))],
+        [(pl.col(middle) + deviations * pl.col(deviation)).alias(upper), (pl.col(middle) - deviations * pl.col(deviation)).alias(lower)],
+    ])
+    return IndicatorsResult(df, [middle, deviation, upper, lower])
+
+def _standard_deviation_expr(days: int, by: str | None=None, prepared: bool=False) -> pl.Expr:
+    """population standard deviation of Close over days named 'STD' + days. polars rolling_std is the sample one
+    the mean of squares less the squared SMA would reuse the SMA but it loses digits once a symbol's prices fall far below where they were"""
+    expr = pl.col(CLOSE_COLUMN).rolling_std(days) * math.sqrt((days - 1) / days)
+    if prepared:
+        expr = pl.when(pl.col(BAR_COLUMN) >= days - 1).then(expr).otherwise(None)
+    elif by is not None:
+        expr = expr.over(by)
+    return expr.alias('STD' + str(days))
+
+def keltner_channels(df: pl.DataFrame | pl.LazyFrame, days: int=20, multiplier: float=2, atr_days: int=10) -> IndicatorsResult:
+    """adds channels multiplier average true ranges over atr_days above and below the exponential moving average of Close over days
+    Returns the EMA, True_Range, ATR and the channels named like KC20_10_2_Upper and KC20_10_2_Lower
+    EMA, True_Range and ATR columns that already exist are reused"""
+    middle = 'EMA' + str(days)
+    average_range = 'ATR' + str(atr_days)
+    upper = f"KC{days}_{atr_days}_{multiplier}_Upper"
+    lower = f"KC{days}_{atr_days}_{multiplier}_Lower"
+    by = _symbol_by(df.columns)
+    df = _with_layers(df, [
+        [_exponential_moving_average_expr(days, by), _true_range_expr(by, _prepared(df.columns))],
+        [_average_true_range_expr(atr_days, by)],
+        [(pl.col(middle) + multiplier * pl.col(average_range)).alias(upper), (pl.col(middle) - multiplier * pl.col(average_range)).alias(lower)],
+    ])
+    return IndicatorsResult(df, [middle, TRUE_RANGE_COLUMN, average_range, upper, lower])
+
 def crossover_up(df: pl.DataFrame | pl.LazyFrame, column1: str, column2: str) -> IndicatorResult:
     """Adds column indicator crossover made by column1 over column2 in the upward direction
     This does not handle situations where the values are the same.
@@ -49,37 +369,21 @@ def crossover_up(df: pl.DataFrame | pl.LazyFrame, column1: str, column2: str) ->
     if column_name in df.columns:
         return IndicatorResult(df, column_name)
 
-    same_symbol = 'same_symbol'
-    cross_up = 'cross_up'
-
-    new_columns = df.columns.copy()
-    new_columns.append(column_name)
+    df = df.with_columns(_crossover_up_expr(column1, column2, _symbol_by(df.columns), _prepared(df.columns)))
+    return IndicatorResult(df, column_name)
 
-    lf = df.lazy()
-    
-    if SYMBOL_COLUMN in lf.columns:
-        lf = lf.with_columns((pl.col(SYMBOL_COLUMN).shift(1) == pl.col(SYMBOL_COLUMN)).alias(same_symbol))
+def _crossover_up_expr(column1: str, column2: str, by: str | None=None, prepared: bool=False) -> pl.Expr:
+    """expression behind crossover_up"""
+    if prepared:
+        same_symbol = pl.col(BAR_COLUMN) > 0
+    elif by is not None:
+        same_symbol = pl.col(by).shift(1) == pl.col(by)
     else:
-        lf = lf.with_columns(pl.lit(True).alias(same_symbol))
-
+        same_symbol = pl.lit(True)
 
-    lf = lf.with_columns(
-            (
-                (pl.col(column1) > pl.col(column2))
-                &
-                (pl.col(column1).shift(1) < pl.col(column2).shift(1))
-            ).alias(cross_up)
-        )
+    cross_up = (pl.col(column1) > pl.col(column2)) & (pl.col(column1).shift(1) < pl.col(column2).shift(1))
 
-    lf = lf.with_columns((pl.col(cross_up) & pl.col(same_symbol)).alias(column_name))
-    lf = lf.select(new_columns)
-
-    if isinstance(df, pl.LazyFrame):
-        df = lf
-    else:
-        df = lf.collect()
-
-    return IndicatorResult(df, column_name)
+    return (cross_up & same_symbol).alias(column1 + '_cross_up_' + column2)
 
 def crossover_down(df: pl.DataFrame | pl.LazyFrame, column1: str, column2: str) -> IndicatorResult:
     """Adds column indicator crossover made by column1 over column2 in the downward direction
@@ -92,13 +396,15 @@ def crossover_down(df: pl.DataFrame | pl.LazyFrame, column1: str, column2: str)
     if column_name in df.columns:
         return IndicatorResult(df, column_name)
 
-    
-    cross_up = crossover_up(df, column2, column1) #cross up with columns flipped is the same as cross cown
 
-    #this leaves a corner case where you can add a crossover up for col1 and col2 and then later add a crossover down for col2 and col1. This would rename the first column. The columns are identical though so just don't do that
-    df = cross_up.df.rename({cross_up.column: column_name})
+    df = df.with_columns(_crossover_down_expr(column1, column2, _symbol_by(df.columns), _prepared(df.columns)))
     return IndicatorResult(df, column_name)
 
+def _crossover_down_expr(column1: str, column2: str, by: str | None=None, prepared: bool=False) -> pl.Expr:
+    """expression behind crossover_down"""
+    #cross up with columns flipped is the same as cross down
+    return _crossover_up_expr(column2, column1, by, prepared).alias(column1 + '_cross_down_' + column2)
+
 
 def crossover(df: pl.DataFrame | pl.LazyFrame, column1: str, column2: str) -> IndicatorResult:
     """Adds column indicator crossover of input columns
@@ -113,24 +419,60 @@ def crossover(df: pl.DataFrame | pl.LazyFrame, column1: str, column2: str) -> In
     if column_name in df.columns:
         return IndicatorResult(df, column_name)
 
-    new_columns = df.columns.copy()
-    new_columns.append(column_name)
-
-    lf = df.lazy()
-
-    cross_up = crossover_up(lf, column1, column2)
-    cross_down = crossover_down(cross_up.df, column1, column2)
-    
-    lf = cross_down.df.with_columns((pl.col(cross_up.column) | pl.col(cross_down.column)).alias(column_name))
-
-    lf = lf.select(new_columns)
+    df = df.with_columns(_crossover_expr(column1, column2, _symbol_by(df.columns), _prepared(df.columns)))
+    return IndicatorResult(df, column_name)
 
-    if isinstance(df, pl.LazyFrame):
-        df = lf
+def _crossover_expr(column1: str, column2: str, by: str | None=None, prepared: bool=False) -> pl.Expr:
+    """expression behind crossover"""
+    return (_crossover_up_expr(column1, column2, by, prepared) | _crossover_down_expr(column1, column2, by, prepared)).alias(column1 + '_cross_' + column2)
+
+_CROSSOVER_NAMES = {'up': '_cross_up_', 'down': '_cross_down_', 'any': '_cross_'}
+
+def crossovers(df: pl.DataFrame | pl.LazyFrame, pairs: list[tuple], directions: tuple[str, ...]=('up', 'down', 'any')) -> IndicatorsResult:
+    """adds the crossover columns of directions for every pair. Columns are named like crossover_up, crossover_down and crossover
+    A pair is (column1, column2) or (column1, column2, multiplier) to cross column1 over multiplier * column2
+        like ('Close', 'SMA20', 0.95) named Close_cross_up_0.95xSMA20. column2 can also be a number to cross a fixed level
+    The sign of column1 - column2 is computed once per pair and every direction compares it with its shift
+    so all the columns are added in one projection instead of a frame per column
+    A NaN counts as a missing value. Rows of each symbol must be contiguous"""
+    for direction in directions:
+        if direction not in _CROSSOVER_NAMES:
+            raise ValueError(f"direction has to be one of {list(_CROSSOVER_NAMES)} not {direction}")
+
+    signs = {}
+    column_names = []
+    for pair in pairs:
+        column1, column2, multiplier = pair if len(pair) == 3 else (*pair, 1)
+        level = pl.col(column2) if isinstance(column2, str) else pl.lit(column2)
+        if multiplier != 1:
+            level = level * multiplier
+            column2 = f"{multiplier}x{column2}"
+        names = {direction: f"{column1}{_CROSSOVER_NAMES[direction]}{column2}" for direction in directions}
+        column_names.extend(names.values())
+        if any(name not in df.columns for name in names.values()):
+            signs[f"crossovers_sign_{len(signs)}"] = ((pl.col(column1) - level).sign().cast(pl.Int8), names)
+    if not signs:
+        return IndicatorsResult(df, column_names)
+
+    same_symbol = "crossovers_same_symbol"
+    by = _symbol_by(df.columns)
+    if _prepared(df.columns):
+        same = pl.col(BAR_COLUMN) > 0
+    elif by is not None:
+        same = pl.col(by).shift(1) == pl.col(by)
     else:
-        df = lf.collect()
+        same = pl.lit(True)
 
-    return IndicatorResult(df, column_name)
+    lf = df.lazy().with_columns(same.alias(same_symbol), *[sign.alias(name) for name, (sign, _) in signs.items()])
+    flags = []
+    for name, (_, names) in signs.items():
+        #> and < keep missing values null like crossover_up where == would make them False
+        up = (pl.col(name) > 0) & (pl.col(name).shift(1) < 0) & pl.col(same_symbol)
+        down = (pl.col(name) < 0) & (pl.col(name).shift(1) > 0) & pl.col(same_symbol)
+        directions_flags = {'up': up, 'down': down, 'any': up | down}
+        flags.extend(directions_flags[direction].alias(column) for direction, column in names.items() if column not in df.columns)
+    lf = lf.with_columns(flags).drop([same_symbol, *signs])
+    return IndicatorsResult(_finish(df, lf), column_names)
 
 
 def trailing_stop(df: pl.DataFrame | pl.LazyFrame, bars: int) -> IndicatorResult:
@@ -139,27 +481,39 @@ def trailing_stop(df: pl.DataFrame | pl.LazyFrame, bars: int) -> IndicatorResult
     if column_name in df.columns:
         return IndicatorResult(df, column_name)
     
-    df = df.with_columns(pl.when(
-        pl.col(LOW_COLUMN) < pl.col(LOW_COLUMN).rolling_min(bars).shift(1)).then( #when our low is less than the trailing stop
-            pl.min(pl.col(LOW_COLUMN).rolling_min(bars).shift(1), pl.col(OPEN_COLUMN))).alias(column_name)) #set the value equal to the minimum of the Open and the trailing stop. This handles cases where we gap below the trailing stop
-
+    df = df.with_columns(_trailing_stop_expr(bars, _symbol_by(df.columns), _prepared(df.columns)))
     return IndicatorResult(df, column_name)
 
+def _trailing_stop_expr(bars: int, by: str | None=None, prepared: bool=False) -> pl.Expr:
+    """expression behind trailing_stop"""
+    stop = pl.col(LOW_COLUMN).rolling_min(bars).shift(1)
+    if prepared:
+        stop = pl.when(pl.col(BAR_COLUMN) >= bars).then(stop).otherwise(None)
+    elif by is not None:
+        stop = stop.over(by)
+    return pl.when(
+        pl.col(LOW_COLUMN) < stop).then( #when our low is less than the trailing stop
+            pl.min(stop, pl.col(OPEN_COLUMN))).alias(f"{bars}_bar_trailing_stop") #set the value equal to the minimum of the Open and the trailing stop. This handles cases where we gap below the trailing stop
+
 
 def end_of_data_stop(df: pl.DataFrame | pl.LazyFrame) -> IndicatorResult:
     """adds a stop at the close of the last bar of the data"""
     column_name = f"EOD_Stops"
     if column_name in df.columns:
         return IndicatorResult(df, column_name)
-    
-    index_name = "index"
-    if SYMBOL_COLUMN in df.columns:
-        df = df.with_row_count(index_name).with_columns(pl.when(pl.col(index_name) == pl.col(index_name).max().over(SYMBOL_COLUMN)).then(pl.col(CLOSE_COLUMN)).alias(column_name)).select(pl.exclude(index_name))
-    else:
-        df = df.with_row_count(index_name).with_columns(pl.when(pl.col(index_name) == pl.col(index_name).max()).then(pl.col(CLOSE_COLUMN)).alias(column_name)).select(pl.exclude(index_name))
 
+    df = df.with_columns(_end_of_data_stop_expr(_symbol_by(df.columns), _prepared(df.columns)))
     return IndicatorResult(df, column_name)
 
+def _end_of_data_stop_expr(by: str | None=None, prepared: bool=False) -> pl.Expr:
+    """expression behind end_of_data_stop"""
+    bars_remaining = pl.col(CLOSE_COLUMN).cumcount(reverse=True)
+    if prepared:
+        bars_remaining = pl.col(BARS_LEFT_COLUMN)
+    elif by is not None:
+        bars_remaining = bars_remaining.over(by)
+    return pl.when(bars_remaining == 0).then(pl.col(CLOSE_COLUMN)).alias("EOD_Stops")
+
 
 def entry_percentage_stop(df: pl.DataFrame | pl.LazyFrame, percentage: float, entry_column: str) -> IndicatorResult:
     """Allows for percentage of entry stop
@@ -171,15 +525,17 @@ def entry_percentage_stop(df: pl.DataFrame | pl.LazyFrame, percentage: float, en
     if column_name in df.columns:
         return IndicatorResult(df, column_name)
     
-    df = df.with_columns(pl.when(
+    df = df.with_columns(_entry_percentage_stop_expr(percentage, entry_column))
+    return IndicatorResult(df, column_name)
+
+def _entry_percentage_stop_expr(percentage: float, entry_column: str) -> pl.Expr:
+    """expression behind entry_percentage_stop"""
+    return pl.when(
         (
             pl.col(entry_column) * ((100+percentage)/100)).is_between(pl.col(LOW_COLUMN), pl.col(HIGH_COLUMN))
         ).then(
             pl.col(entry_column) * ((100+percentage)/100)
-        ).alias(column_name)
-        )
-    
-    return IndicatorResult(df, column_name)
+        ).alias(f"Entry_{percentage}%_Stops")
 
  
 
@@ -189,50 +545,40 @@ def targeted_value(df: pl.DataFrame | pl.LazyFrame, targets: str) -> IndicatorRe
     column_name = f"{targets}_targets"
     if column_name in df.columns:
         return IndicatorResult(df, column_name)
-    df = df.with_columns(pl.when(pl.col(targets).is_between(pl.col(LOW_COLUMN), pl.col(HIGH_COLUMN))).then(pl.col(targets)).alias(column_name))
+    df = df.with_columns(_targeted_value_expr(targets))
     return IndicatorResult(df, column_name)
 
+def _targeted_value_expr(targets: str) -> pl.Expr:
+    """expression behind targeted_value"""
+    return pl.when(pl.col(targets).is_between(pl.col(LOW_COLUMN), pl.col(HIGH_COLUMN))).then(pl.col(targets)).alias(f"{targets}_targets")
+
 
 def limit_entries(df: pl.DataFrame | pl.LazyFrame, bars: int, entries: str) -> IndicatorResult:
     """Forces a minimum number of bars between entries"""
-    def group_by_bars(df: pl.DataFrame | pl.LazyFrame, nulls: int, column: str) -> IndicatorResult:
-        """assigns an ID to each group of consecutive non-null values allowing for an
-        input (nulls) number of nulls before considering a set a new group"""
-        column_name = f"group_{nulls}"
-        if column_name in df.columns:
-            return IndicatorResult(df, column_name)
-        
-        tes = "tes"
-        df = df.with_columns(pl.lit(True).alias(tes))
-        for i in range(1, nulls+1):
-            df = df.with_columns(pl.col(tes) & pl.col(column).shift(i).is_null().alias(tes))
-        df = df.with_columns(pl.when(pl.col(tes)).then(1).otherwise(0).cumsum().alias(column_name)) 
-        return IndicatorResult(df, column_name)
-    
     column_name = f"{bars}_minimum_bars_between"
     if column_name in df.columns:
         return IndicatorResult(df, column_name)
-    
-    new_columns = df.columns.copy()
-    new_columns.append(column_name)
-
-    lf = df.lazy()
-    
-    group = group_by_bars(lf, bars, entries)
 
-    ones = "ones"
-
-    lf = group.df
-
-    sum = "sum"
-    lf = group.df.with_columns(pl.lit(1).alias(ones)).with_columns(pl.col(ones).cumsum().over(group.column).alias(sum))
-
-    lf = lf.with_columns(pl.when(pl.col(sum) % (bars+1) == 1).then(pl.col(entries)).alias(column_name))
+    df = df.with_columns(_limit_entries_expr(bars, entries, _symbol_by(df.columns)))
+    return IndicatorResult(df, column_name)
 
-    lf = lf.select(new_columns)
-    df = lf if isinstance(df, pl.LazyFrame) else lf.collect()
+def _limit_entries_expr(bars: int, entries: str, by: str | None=None) -> pl.Expr:
+    """expression behind limit_entries
+    A group of entries starts on any bar that has no entries in the previous bars (or starts the symbol)
+    Within a group only every bars+1th bar counted from the start of the group keeps its entry
+    The bars lookback is a rolling sum so the cost doesn't depend on bars"""
+    def per_symbol(expr: pl.Expr) -> pl.Expr:
+        return expr.over(by) if by is not None else expr
+
+    index = pl.col(entries).cumcount()
+    if bars > 0:
+        recent_entries = pl.col(entries).is_not_null().cast(pl.UInt32).rolling_sum(bars, min_periods=1).shift(1).fill_null(0)
+        group_start = (index * (recent_entries == 0).cast(pl.UInt32)).cummax() #index of the last bar that started a group
+        keep = per_symbol((index - group_start) % (bars+1) == 0)
+    else:
+        keep = pl.lit(True)
 
-    return IndicatorResult(df, column_name)
+    return pl.when(keep).then(pl.col(entries)).alias(f"{bars}_minimum_bars_between")
 
 
 def create_trade_ids_old(df: pl.DataFrame | pl.LazyFrame, enter_column: str, exit_column: str) -> IndicatorResult:
@@ -254,70 +600,83 @@ def create_trade_ids_old(df: pl.DataFrame | pl.LazyFrame, enter_column: str, exi
 def create_trade_ids(df: pl.DataFrame | pl.LazyFrame, enter_column: str, exit_column: str) -> IndicatorResult:
     """Adds a column that undiquely identifies each trade with an integer
     All bars of the trade will get a single value.
-    This considers the bars of a trade to be from the first 'True' value in enter_column to the first
-    True in the exit_column on the same or later bar
+    This considers the bars of a trade to be from the first non-null value in enter_column to the first
+    non-null value in the exit_column on the same or later bar
     Entries indicated in the enter_column will be ignored if there is already an active trade for that symbol
-        i.e. this can only track one active trade per symbol at a time"""
-    def add_exit_ids(df: pl.DataFrame | pl.LazyFrame, exit_column: str) -> IndicatorResult:
-        """adds a column that counts up on each exit"""
-        column_name = f"{exit_column}_exit_ids"
-        if column_name in df.columns:
-            return IndicatorResult(df, column_name)
-        df = df.with_columns(pl.when(pl.col(exit_column).is_not_null()).then(1).otherwise(0).cumsum().shift(1).alias(column_name))
-        return IndicatorResult(df, column_name)
-    def add_traded_column(df: pl.DataFrame | pl.LazyFrame, enter_column:str, exit_ids:str) -> IndicatorResult:
-        """adds a column thats true for every bar that has an active trade"""
-        column_name = f"{enter_column}/{exit_ids}_traded"
-        if column_name in df.columns:
-            return IndicatorResult(df, column_name)
-        df = df.with_columns(
-            pl.when(pl.col(DATE_COLUMN) >= pl.when(pl.col(enter_column).is_not_null()).then(pl.col(DATE_COLUMN)).min().over(exit_ids)).then(True) \
-            .alias(column_name))
-        return IndicatorResult(df, column_name)
-    
+        i.e. this can only track one active trade per symbol at a time
+    A trade still open on the last bar of a symbol ends there"""
     column_name = f"{enter_column}/{exit_column}"
     if column_name in df.columns:
-            return IndicatorResult(df, column_name)
-    
-    new_columns = df.columns.copy()
-    new_columns.append(column_name)
-    
-    lf = df.lazy()
-    exit_ids = add_exit_ids(lf, exit_column)
-    traded = add_traded_column(exit_ids.df, enter_column, exit_ids.column)
-
-    lf = traded.df.with_columns(
-        pl.when(
-            pl.col(traded.column) #pl.col(enter_column).max().over(pl.col(exit_ids)) #ensures we only count trades with entries
-            &
-            (pl.col(DATE_COLUMN) == pl.col(DATE_COLUMN).min().over(exit_ids.column, traded.column)) #ensures we only count a trade once per exit
-        ).then(1).otherwise(0).alias(column_name))
-    
-    lf = lf.with_columns(pl.when(pl.col(traded.column)).then(pl.col(column_name).cumsum()))
-    lf = lf.select(new_columns)
-
-    df = lf if isinstance(df, pl.LazyFrame) else lf.collect()
+        return IndicatorResult(df, column_name)
 
+    df = df.with_columns(_create_trade_ids_expr(enter_column, exit_column, _symbol_by(df.columns), _prepared(df.columns)))
     return IndicatorResult(df, column_name)
-    
+
+def _create_trade_ids_expr(enter_column: str, exit_column: str, by: str | None=None, prepared: bool=False) -> pl.Expr:
+    """expression behind create_trade_ids
+    Every exit ends a segment of bars and each segment holds at most one trade which starts on its first entry
+    so a bar is in a trade when the last entry of its symbol came after the last exit before that bar
+    Bars are numbered from 1 over the whole frame so running maximums don't need a window per symbol
+    Rows of each symbol must be contiguous"""
+    bar = pl.col(enter_column).cumcount() + 1
+    if prepared:
+        symbol_start = bar - pl.col(BAR_COLUMN)
+    elif by is not None:
+        symbol_start = (bar * (pl.col(by) != pl.col(by).shift(1)).fill_null(True).cast(pl.UInt32)).cummax()
+    else:
+        symbol_start = pl.lit(1)
+
+    is_entry = pl.col(enter_column).is_not_null()
+    last_entry = (bar * is_entry.cast(pl.UInt32)).cummax()
+    previous_entry = last_entry.shift(1).fill_null(0)
+    last_exit_before = (bar * pl.col(exit_column).is_not_null().cast(pl.UInt32)).cummax().shift(1).fill_null(0)
+
+    in_trade = (last_entry >= symbol_start) & (last_entry > last_exit_before)
+    trade_start = is_entry & ((previous_entry < symbol_start) | (previous_entry <= last_exit_before))
+
+    return pl.when(in_trade).then(trade_start.cast(pl.Int32).cumsum()).alias(f"{enter_column}/{exit_column}")
+
+def trade_indices(df: pl.DataFrame | pl.LazyFrame, trade_id_column: str, exit_column: str) -> pl.DataFrame | pl.LazyFrame:
+    """returns one row per trade with the row index of its entry and exit bars and its symbol if there is one
+    trade_id_column comes from create_trade_ids. Closed is False for trades that ran to the end of a symbol without an exit"""
+    index = "index"
+    next_id = "next_id"
+    entry_index = "Entry_Index"
+    exit_index = "Exit_Index"
+    closed = "Closed"
+
+    lf = df.lazy().with_row_count(index).with_columns(pl.col(trade_id_column).shift(-1).alias(next_id))
+    lf = lf.filter(pl.col(trade_id_column).is_not_null())
+
+    #ids only go up so the first and last bar of each trade are where the id changes
+    symbol = [pl.col(SYMBOL_COLUMN)] if SYMBOL_COLUMN in df.columns else []
+    entries = lf.filter(pl.col(trade_id_column) != pl.col(trade_id_column).shift(1).fill_null(0)).select(
+        pl.col(trade_id_column), *symbol, pl.col(index).alias(entry_index))
+    exits = lf.filter(pl.col(trade_id_column) != pl.col(next_id).fill_null(0)).select(
+        pl.col(trade_id_column), pl.col(index).alias(exit_index), pl.col(exit_column).is_not_null().alias(closed))
+
+    lf = entries.join(exits, on=trade_id_column, how="left")
+    return lf if isinstance(df, pl.LazyFrame) else lf.collect()
+
 def summarize_trades(df: pl.DataFrame | pl.LazyFrame, trade_id_column: str, enter_column: str, exit_column: str) -> pl.DataFrame | pl.LazyFrame:
     """summarizes trade information given ids in input column
+    The bars of a trade are contiguous and in date order so its first and last bars are its entry and exit
+    the aggregations are plain first, last, min, max and count so the streaming engine can run them
     PROTOTYPE. NEEDS MORE WORK AND MAY NOT BE THE DIRECTION I GO"""
-    index_name = "index"
     start = "Start"
     end = "End"
     entry_price = "Entry_Price"
     exit_price = "Exit_Price"
     length = "Length"
-    df = df.drop_nulls(trade_id_column).with_row_count(index_name).groupby(trade_id_column).agg(
-              pl.col(SYMBOL_COLUMN).min().alias(SYMBOL_COLUMN),
-              pl.col(DATE_COLUMN).min().alias(start),
-              pl.col(DATE_COLUMN).max().alias(end),
-              pl.when(pl.col(DATE_COLUMN) == pl.col(DATE_COLUMN).min()).then(pl.col(enter_column)).min().alias(entry_price),
-              pl.when(pl.col(DATE_COLUMN) == pl.col(DATE_COLUMN).max()).then(pl.col(exit_column)).min().alias(exit_price),
+    df = df.filter(pl.col(trade_id_column).is_not_null()).groupby(trade_id_column).agg(
+              pl.col(SYMBOL_COLUMN).first().alias(SYMBOL_COLUMN),
+              pl.col(DATE_COLUMN).first().alias(start),
+              pl.col(DATE_COLUMN).last().alias(end),
+              pl.col(enter_column).first().alias(entry_price),
+              pl.col(exit_column).last().alias(exit_price),
               pl.col(LOW_COLUMN).min().alias(LOW_COLUMN),
               pl.col(HIGH_COLUMN).max().alias(HIGH_COLUMN),
-              (pl.col(index_name).max() - pl.col(index_name).min() + 1).alias(length)
+              pl.count().alias(length)
     ).sort(trade_id_column)
 
     net_gain = "Gain/Loss"
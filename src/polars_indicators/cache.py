@@ -0,0 +1,226 @@
+"""
+On disk cache of indicator results
+Rerunning the same indicators on unchanged history recomputes the same columns. The cache stores the columns an indicator added
+and joins them back onto the input on the next call with the same data and parameters
+    cache = IndicatorCache('indicator_cache', max_bytes=2**30)
+    ret = cache.run(pi.simple_moving_average, df, days=20)
+    strategy = cache.wrap(buy_x_week_low.strategy)
+Entries are keyed on a fingerprint of the input plus the function and its arguments
+    a Python function is known by its name, its code, its defaults and the values its closure captured
+    the fingerprint is the row count and last date of each symbol and a hash of every column
+Each entry is a Parquet file of the added columns with a json file describing the result
+    a hit means the input is the same row for row so the columns are put back by position instead of joined on Symbol and Date
+    for functions that drop rows the entry also holds the rows of the input that were kept. They're matched on Symbol and Date when stored
+The least recently used entries are removed once the files take more than max_bytes
+Cached functions have to return an IndicatorResult or IndicatorsResult, may only add columns and drop rows and must keep the row order
+Functions that drop rows need a Date column with one row per symbol and date
+"""
+
+from dataclasses import fields, is_dataclass
+from pathlib import Path
+from typing import Any, Callable
+import functools
+import hashlib
+import inspect
+import json
+import os
+import types
+import polars as pl
+import polars_indicators as pi
+
+
+CachedResult = pi.IndicatorResult | pi.IndicatorsResult
+_ROW = "__row"
+
+
+class IndicatorCache:
+    """Content addressed cache of indicator results in directory
+    hits and misses count the calls that were and weren't answered from the cache"""
+
+    def __init__(self, directory: str | Path, max_bytes: int=2**30):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def run(self, function: Callable[..., CachedResult], df: pl.DataFrame | pl.LazyFrame, *args, **kwargs) -> CachedResult:
+        """returns function(df, *args, **kwargs) from the cache or runs it and caches the added columns
+        LazyFrames are collected to fingerprint them and the result is returned lazy"""
+        lazy = isinstance(df, pl.LazyFrame)
+        df = df.collect() if lazy else df
+        key = self.key(function, df, *args, **kwargs)
+
+        ret = self._load(key, df)
+        if ret is None:
+            self.misses += 1
+            ret = function(df, *args, **kwargs)
+            self._store(key, df, ret)
+        else:
+            self.hits += 1
+
+        if lazy:
+            ret.df = ret.df.lazy()
+        return ret
+
+    def wrap(self, function: Callable[..., CachedResult]) -> Callable[..., CachedResult]:
+        """function that goes through the cache and takes the same arguments"""
+        @functools.wraps(function)
+        def cached(df: pl.DataFrame | pl.LazyFrame, *args, **kwargs) -> CachedResult:
+            return self.run(function, df, *args, **kwargs)
+        return cached
+
+    def key(self, function: Callable[..., CachedResult], df: pl.DataFrame, *args, **kwargs) -> str:
+        """hex digest of the fingerprint of df with the function and arguments"""
+        digest = hashlib.sha256(fingerprint(df).encode())
+        digest.update(json.dumps([_token(function), _token(args), _token(kwargs), pl.__version__]).encode())
+        return digest.hexdigest()
+
+    def clear(self):
+        """removes every entry"""
+        for path in self.directory.glob("*.parquet"):
+            _remove(path)
+
+    def size(self) -> int:
+        """bytes used by the entries"""
+        return sum(path.stat().st_size for path in self.directory.glob("*") if path.is_file())
+
+    def _load(self, key: str, df: pl.DataFrame) -> CachedResult | None:
+        """result for key with the cached columns joined onto df or None on a miss"""
+        path = self.directory / f"{key}.parquet"
+        if not path.exists():
+            return None
+        try:
+            meta = json.loads(path.with_suffix(".json").read_text())
+            stored = pl.read_parquet(path)
+        except (OSError, ValueError, pl.ComputeError):
+            return None
+        #touching the file marks it as recently used for eviction
+        os.utime(path)
+
+        if _ROW in stored.columns:
+            df = df.select(pl.all().take(stored[_ROW]))
+            stored = stored.drop(_ROW)
+        result = df.hstack(stored).select(meta["columns"])
+        if "column" in meta:
+            return pi.IndicatorResult(result, meta["column"])
+        return pi.IndicatorsResult(result, meta["indicators"])
+
+    def _store(self, key: str, df: pl.DataFrame, ret: CachedResult):
+        """writes the columns ret added to df and evicts old entries"""
+        if not isinstance(ret, (pi.IndicatorResult, pi.IndicatorsResult)):
+            raise TypeError(f"only IndicatorResult and IndicatorsResult can be cached, not {type(ret).__name__}")
+        result = ret.df.collect() if isinstance(ret.df, pl.LazyFrame) else ret.df
+        added = [column for column in result.columns if column not in df.columns]
+        stored = result.select(added)
+        if len(result) != len(df):
+            keys = _keys(df)
+            rows = df.select(keys).with_row_count(_ROW).join(result.select(keys), on=keys, how="semi")[_ROW].sort()
+            stored = stored.with_columns(rows)
+
+        meta: dict[str, Any] = {"columns": result.columns}
+        if isinstance(ret, pi.IndicatorResult):
+            meta["column"] = ret.column
+        else:
+            meta["indicators"] = ret.columns
+
+        #write to temporary files first so a reader never sees half an entry
+        path = self.directory / f"{key}.parquet"
+        temporary = path.with_suffix(f".{os.getpid()}.tmp")
+        stored.write_parquet(temporary)
+        path.with_suffix(".json").write_text(json.dumps(meta))
+        os.replace(temporary, path)
+        self._evict()
+
+    def _evict(self):
+        """removes the least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self.directory.glob("*.parquet"), key=lambda path: path.stat().st_mtime)
+        sizes = {path: path.stat().st_size + _json_size(path) for path in entries}
+        total = sum(sizes.values())
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= sizes[path]
+
+
+def fingerprint(df: pl.DataFrame) -> str:
+    """row count and last date of each symbol and a hash of every column of df"""
+    by = [pi.SYMBOL_COLUMN] if pi.SYMBOL_COLUMN in df.columns else []
+    if pi.DATE_COLUMN in df.columns:
+        if by:
+            summary = df.groupby(by, maintain_order=True).agg(pl.count(), pl.col(pi.DATE_COLUMN).last())
+        else:
+            summary = df.select(pl.count(), pl.col(pi.DATE_COLUMN).last())
+        summary = summary.rows()
+    else:
+        summary = [len(df)]
+    digest = hashlib.sha256(repr((df.schema, summary)).encode())
+    digest.update(df.hash_rows().to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _keys(df: pl.DataFrame) -> list[str]:
+    """columns that identify a row"""
+    if pi.DATE_COLUMN not in df.columns:
+        raise ValueError(f"cached functions that drop rows need a {pi.DATE_COLUMN} column to match the rows they kept")
+    return [column for column in (pi.SYMBOL_COLUMN, pi.DATE_COLUMN) if column in df.columns]
+
+
+def _token(value: Any) -> Any:
+    """json representation of an argument that is the same in every process"""
+    if inspect.ismethod(value):
+        return [_token(value.__func__), _token(value.__self__)]
+    if inspect.isfunction(value):
+        #lambdas of a module and closures of a factory share a name so their code and captured values tell them apart
+        return [f"{value.__module__}.{value.__qualname__}", _code_token(value.__code__), _token(value.__defaults__),
+                _token(value.__kwdefaults__), [_cell_token(cell, value) for cell in value.__closure__ or ()]]
+    if callable(value) and hasattr(value, "__qualname__"):
+        return f"{value.__module__}.{value.__qualname__}"
+    if isinstance(value, functools.partial):
+        return [_token(value.func), _token(value.args), _token(value.keywords)]
+    if is_dataclass(value):
+        return [type(value).__qualname__, {field.name: _token(getattr(value, field.name)) for field in fields(value)}]
+    if isinstance(value, dict):
+        return {str(key): _token(item) for key, item in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_token(item) for item in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if hasattr(value, "__dict__"):
+        return [type(value).__qualname__, _token(vars(value))]
+    return repr(value)
+
+
+def _code_token(code: types.CodeType) -> str:
+    """hash of the bytecode and constants of a function including the functions defined in it"""
+    #frozenset constants like the one in x in {'a', 'b'} are sorted since their order changes with the string hash seed
+    consts = [_code_token(const) if isinstance(const, types.CodeType) else sorted(map(repr, const)) if isinstance(const, frozenset) else repr(const)
+              for const in code.co_consts]
+    return hashlib.sha256(code.co_code + repr((consts, code.co_names)).encode()).hexdigest()
+
+
+def _cell_token(cell: types.CellType, function: Callable) -> Any:
+    """token of a value a closure captured"""
+    try:
+        value = cell.cell_contents
+    except ValueError:
+        return None
+    #a function that refers to itself through its closure
+    return function.__qualname__ if value is function else _token(value)
+
+
+def _json_size(path: Path) -> int:
+    try:
+        return path.with_suffix(".json").stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _remove(path: Path):
+    """removes an entry"""
+    for file in (path, path.with_suffix(".json")):
+        try:
+            file.unlink()
+        except FileNotFoundError:
+            pass
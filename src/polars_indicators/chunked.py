@@ -0,0 +1,66 @@
+"""
+Runs a Pipeline over a long history one window of dates at a time so memory doesn't grow with the length of the history
+    for chunk in chunked.run_chunked(pl.scan_parquet('minutes.parquet'), pipeline, every='1mo'):
+        chunk.df.write_parquet(...)
+Each window is read from the source on its own and run with an Incremental of the pipeline
+    the last bars of the window before are prepended as warmup. As many as the indicators of the pipeline look back
+        and the bars within the lookback of buy_x_week_low's entries
+    and the warmup rows are dropped from the output
+    limit_entries and the exit engine carry the state they need into the next window instead of warmup
+        the start of the last group of entries and the last entry, and the entry bar and price of the open trade
+    trades open at the end of a window are continued in the next one
+A price store root as the source only opens the files of the years of each window
+    polars 0.17 can't skip Parquet row groups on a Date filter so a LazyFrame source is read once per window
+end_of_data_stop and the end_of_data exits only mark the last bar of each symbol in the whole source like an unchunked run
+Float columns match an unchunked run to rounding. Trade ids of a single symbol match
+    with several symbols a window numbers the trades it opens in symbol order so ids match up to renumbering
+Only the indicators Incremental can update are supported. See incremental for them
+"""
+
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterator
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import store
+from polars_indicators.incremental import Incremental
+from polars_indicators.pipeline import Pipeline
+
+
+def run_chunked(source: pl.LazyFrame | pl.DataFrame | str | Path, pipeline: Pipeline, every: str | timedelta) -> Iterator[pi.IndicatorsResult]:
+    """yields the pipeline run on each window of every dates of source in date order
+    source is a frame or the root of a price store
+    every is a timedelta or a polars interval like '1w' or '1mo'. Rows of each symbol must be in date order"""
+    lf = store.scan_prices(source) if isinstance(source, (str, Path)) else source.lazy()
+    incremental = Incremental(pipeline)
+    ends = _ends(lf)
+
+    started = False
+    for start, end in windows(lf, every):
+        window = store.scan_prices(source, start=start, end=end) if isinstance(source, (str, Path)) else lf
+        chunk = pi._reindex(window.filter((pl.col(pi.DATE_COLUMN) >= start) & (pl.col(pi.DATE_COLUMN) < end)).collect())
+        if len(chunk) == 0:
+            continue
+        if started:
+            yield incremental.update(chunk, ends)
+        else:
+            yield incremental.start(chunk, ends)
+            started = True
+
+
+def windows(lf: pl.LazyFrame, every: str | timedelta) -> list[tuple[date | datetime, date | datetime]]:
+    """start and exclusive end of each window of every from the first to the last date of lf"""
+    first, last = lf.select(pl.col(pi.DATE_COLUMN).min().alias("first"), pl.col(pi.DATE_COLUMN).max().alias("last")).collect(streaming=True).row(0)
+    if first is None:
+        return []
+    starts = pl.date_range(first, last, every, eager=True).to_list()
+    #the last window has to include the last date
+    step = timedelta(days=1) if not isinstance(last, datetime) else timedelta(microseconds=1)
+    return list(zip(starts, starts[1:] + [last + step]))
+
+
+def _ends(lf: pl.LazyFrame) -> pl.DataFrame:
+    """date of the last bar of each symbol"""
+    if pi.SYMBOL_COLUMN in lf.columns:
+        return lf.groupby(pi.SYMBOL_COLUMN).agg(pl.col(pi.DATE_COLUMN).max()).collect(streaming=True)
+    return lf.select(pl.col(pi.DATE_COLUMN).max()).collect(streaming=True)
@@ -0,0 +1,238 @@
+"""
+Exit engine that follows every trade from its entry bar to its first exit
+The stop indicators in polars_indicators are evaluated on every bar whether or not a trade is open
+so a percentage stop can trigger for an entry that never happened and stops aren't anchored to the entry that opened the trade
+Here trades are chained in order per symbol so every stop is anchored to the entry of the trade that's actually open
+    percentage stop: percentage of the entry price. Checked from the entry bar on
+    trailing stop: trailing_stop of the previous bars lows. Checked from the bar after entry
+    target: target_percentage of the entry price. Checked from the bar after entry
+    time stop: close of the bar time_bars after the entry bar
+    end of data: close of the last bar of the symbol
+When more than one exit is hit on the same bar they are taken in the order above
+Rows of each symbol must be contiguous
+"""
+
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+
+
+STOP = "stop"
+TRAILING = "trailing"
+TARGET = "target"
+TIME = "time"
+END_OF_DATA = "end_of_data"
+
+#reasons in the order they win when hit on the same bar
+REASONS = [STOP, TRAILING, TARGET, TIME, END_OF_DATA]
+
+
+def trade_exits(df: pl.DataFrame | pl.LazyFrame, enter_column: str, percentage: float | None=None, trailing_bars: int | None=None,
+                time_bars: int | None=None, target_percentage: float | None=None) -> pi.IndicatorsResult:
+    """Adds the exit price, exit reason and trade id of every trade opened by enter_column
+    enter_column holds the entry price on entry bars and is null elsewhere. Entries while a trade is open are ignored
+    The exit price and reason are on the exit bar. The trade id is on every bar of the trade like create_trade_ids
+    percentage and target_percentage are relative to the entry price so a 5% stop is percentage=-5"""
+    columns = _exit_columns(enter_column, percentage, trailing_bars, time_bars, target_percentage)
+    column_name, reason_column, trade_id_column = columns
+
+    if all(column in df.columns for column in columns):
+        return pi.IndicatorsResult(df, columns)
+
+    by = pi._symbol_by(df.columns)
+
+    def add_exits(df: pl.DataFrame) -> pl.DataFrame:
+        exits = _exits(df, enter_column, by, percentage, trailing_bars, time_bars, target_percentage)
+        return df.with_columns(
+            exits["price"].alias(column_name),
+            exits["reason"].alias(reason_column),
+            exits["trade_id"].alias(trade_id_column))
+
+    if isinstance(df, pl.DataFrame):
+        return pi.IndicatorsResult(add_exits(df), columns)
+
+    schema = dict(df.schema)
+    schema.update({column_name: pl.Float64, reason_column: pl.Utf8, trade_id_column: pl.Int32})
+    #the exits of a row depend on the rows before it so filters and slices can't be pushed below the engine
+    lf = df.lazy().map(add_exits, schema=schema, predicate_pushdown=False, slice_pushdown=False)
+    return pi.IndicatorsResult(pi._finish(df, lf), columns)
+
+
+def _exit_columns(enter_column: str, percentage: float | None, trailing_bars: int | None, time_bars: int | None,
+                  target_percentage: float | None) -> list[str]:
+    """names of the exit price, exit reason and trade id columns trade_exits adds"""
+    column_name = f"{enter_column}_exit"
+    if percentage is not None:
+        column_name += f"_{percentage}%"
+    if trailing_bars is not None:
+        column_name += f"_{trailing_bars}_bar_trailing"
+    if target_percentage is not None:
+        column_name += f"_{target_percentage}%_target"
+    if time_bars is not None:
+        column_name += f"_{time_bars}_bar_time"
+    return [column_name, column_name + "_reason", column_name + "_trade_id"]
+
+
+def _exits(df: pl.DataFrame, enter_column: str, by: str | None, percentage: float | None, trailing_bars: int | None,
+           time_bars: int | None, target_percentage: float | None, ends: np.ndarray | None=None,
+           carried: tuple[np.ndarray, np.ndarray, np.ndarray] | None=None) -> pl.DataFrame:
+    """returns the price, reason and trade_id columns for every row of df
+    The exit of every entry is found at once as if it opened a trade. Then the trades are chained from the first entry
+    each trade is followed by the first entry after its exit
+    ends is True on the bars where the data of a symbol ends. By default that's the last bar of each symbol in df
+        a trade that reaches the last bar of its symbol in df anywhere else is still open so it gets no exit
+    carried are trades opened before df. The row each one continues on, its entry price and the bars from its entry to that row"""
+    n = len(df)
+    if trailing_bars is None:
+        trailing = pl.lit(np.nan)
+    elif f"{trailing_bars}_bar_trailing_stop" in df.columns:
+        #a trailing_stop column that's already there is the same stop
+        trailing = pl.col(f"{trailing_bars}_bar_trailing_stop").fill_null(np.nan)
+    else:
+        trailing = pi._trailing_stop_expr(trailing_bars, by, pi._prepared(df.columns)).fill_null(np.nan)
+    inputs = df.select(
+        pl.col(enter_column).cast(pl.Float64).alias("entry"),
+        pl.col(pi.OPEN_COLUMN).cast(pl.Float64).alias("open"),
+        pl.col(pi.HIGH_COLUMN).cast(pl.Float64).alias("high"),
+        pl.col(pi.LOW_COLUMN).cast(pl.Float64).alias("low"),
+        pl.col(pi.CLOSE_COLUMN).cast(pl.Float64).alias("close"),
+        _is_last(df.columns, by).alias("is_last"),
+        trailing.alias("trailing"),
+    )
+
+    entries = np.flatnonzero(inputs["entry"].is_not_null().to_numpy())
+    entry_prices = inputs["entry"].to_numpy()[entries]
+    ages = np.zeros(len(entries), dtype=np.int64)
+    if carried is not None:
+        rows, prices, carried_ages = carried
+        #a carried trade comes before an entry on the same bar so the chain takes it
+        order = np.lexsort((np.append(np.ones(len(entries)), np.zeros(len(rows))), np.append(entries, rows)))
+        entries = np.append(entries, rows)[order]
+        entry_prices = np.append(entry_prices, prices)[order]
+        ages = np.append(ages, carried_ages)[order]
+    #a carried trade is past its entry bar so the exits checked from the bar after entry are checked from its first row
+    after = entries + (ages == 0)
+    opens = inputs["open"].to_numpy()
+    highs = inputs["high"].to_numpy()
+    lows = inputs["low"].to_numpy()
+    closes = inputs["close"].to_numpy()
+    trailing = inputs["trailing"].to_numpy()
+    symbol_ends = np.flatnonzero(inputs["is_last"].to_numpy())
+    if n and (len(symbol_ends) == 0 or symbol_ends[-1] != n - 1):
+        symbol_ends = np.append(symbol_ends, n - 1)
+
+    data_ends = np.zeros(n, dtype=bool)
+    data_ends[symbol_ends] = True
+    if ends is not None:
+        data_ends = ends
+
+    #exits that don't depend on the path come first and bound the search for the others
+    #a trade still open past its last bar has the reason after every other one so any exit on that bar wins
+    exit_bars = symbol_ends[np.searchsorted(symbol_ends, entries)]
+    reasons = np.where(data_ends[exit_bars], REASONS.index(END_OF_DATA), len(REASONS)).astype(np.int8)
+    if time_bars is not None:
+        timed = entries - ages + time_bars <= exit_bars
+        exit_bars[timed] = entries[timed] - ages[timed] + time_bars
+        reasons[timed] = REASONS.index(TIME)
+    prices = closes[exit_bars]
+
+    trailing_hits = np.flatnonzero(~np.isnan(trailing))
+    if len(trailing_hits):
+        bars = trailing_hits[np.minimum(np.searchsorted(trailing_hits, after), len(trailing_hits) - 1)]
+        hit = (bars >= after) & (bars <= exit_bars)
+        exit_bars[hit], reasons[hit], prices[hit] = bars[hit], REASONS.index(TRAILING), trailing[bars[hit]]
+
+    if target_percentage is not None:
+        level = entry_prices * (100 + target_percentage) / 100
+        bars = _first_at_or_below(-highs, after, exit_bars, -level)
+        hit = (bars >= 0) & ((bars < exit_bars) | (REASONS.index(TARGET) < reasons))
+        exit_bars[hit], reasons[hit], prices[hit] = bars[hit], REASONS.index(TARGET), np.maximum(opens[bars[hit]], level[hit])
+
+    if percentage is not None:
+        level = entry_prices * (100 + percentage) / 100
+        bars = _first_at_or_below(lows, entries, exit_bars, level)
+        hit = bars >= 0
+        exit_bars[hit], reasons[hit] = bars[hit], REASONS.index(STOP)
+        prices[hit] = np.where((bars[hit] == entries[hit]) & (ages[hit] == 0), level[hit], np.minimum(opens[bars[hit]], level[hit]))
+    prices[reasons == len(REASONS)] = np.nan
+
+    trades = _chain(np.searchsorted(entries, exit_bars + 1))
+    trade_entries, trade_exits = entries[trades], exit_bars[trades]
+
+    starts = np.zeros(n + 1, dtype=np.int32)
+    ends = np.zeros(n + 1, dtype=np.int32)
+    starts[trade_entries] = 1
+    ends[trade_exits + 1] = 1
+    trade_ids = np.cumsum(starts[:n], dtype=np.int32)
+    trade_ids[trade_ids == np.cumsum(ends[:n], dtype=np.int32)] = 0
+
+    exit_prices = np.full(n, np.nan)
+    exit_prices[trade_exits] = prices[trades]
+    exit_reasons = np.full(n, -1, dtype=np.int8)
+    exit_reasons[trade_exits] = reasons[trades]
+
+    return pl.DataFrame({"price": exit_prices, "reason": exit_reasons, "trade_id": trade_ids}).select(
+        pl.col("price").fill_nan(None),
+        #a lookup is several times faster than a when/then per reason. Bars without an exit and open trades aren't in it so they're null
+        pl.col("reason").map_dict(dict(enumerate(REASONS))).alias("reason"),
+        pl.when(pl.col("trade_id") > 0).then(pl.col("trade_id")).alias("trade_id"))
+
+
+def _is_last(columns: list[str], by: str | None) -> pl.Expr:
+    """True on the last bar of each symbol. The end of the data is handled separately"""
+    if pi._prepared(columns):
+        return pl.col(pi.BARS_LEFT_COLUMN) == 0
+    if by is not None:
+        return (pl.col(by) != pl.col(by).shift(-1)).fill_null(True)
+    return pl.lit(False)
+
+
+def _chain(next_entries: np.ndarray) -> np.ndarray:
+    """indices of the entries that are taken starting from the first one
+    next_entries is the entry that follows each entry's exit. len(next_entries) is past the last entry
+    The path is built by doubling. After k steps nodes holds the first 2**k entries and jumps goes 2**k entries ahead"""
+    if len(next_entries) == 0:
+        return next_entries
+    end = len(next_entries)
+    jumps = np.append(next_entries, end)
+    nodes = np.zeros(1, dtype=np.int64)
+    while True:
+        further = jumps[nodes]
+        further = further[further < end]
+        if len(further) == 0:
+            return nodes
+        nodes = np.concatenate([nodes, further])
+        jumps = jumps[jumps]
+
+
+def _first_at_or_below(values: np.ndarray, starts: np.ndarray, ends: np.ndarray, levels: np.ndarray, block: int=32) -> np.ndarray:
+    """index of the first value at or below level from each start to end inclusive or -1 if there isn't one
+    The first block bars of each range are checked one offset at a time for all ranges at once
+    Longer ranges search the minimums of each block the same way and then check the bars of the block they found"""
+    hits = np.full(len(starts), -1, dtype=np.int64)
+    active = np.flatnonzero(starts <= ends)
+    for offset in range(block):
+        bars = starts[active] + offset
+        inside = bars <= ends[active]
+        active, bars = active[inside], bars[inside]
+        hit = values[bars] <= levels[active]
+        hits[active[hit]] = bars[hit]
+        active = active[~hit]
+    if len(active) == 0:
+        return hits
+
+    #every remaining range covers the block after its first block bars so the search continues on block minimums
+    padded = np.full(-(-len(values) // block) * block, np.nan)
+    padded[:len(values)] = values
+    minimums = np.fmin.reduce(padded.reshape(-1, block), axis=1)
+    blocks = _first_at_or_below(minimums, (starts[active] + block) // block, ends[active] // block, levels[active], block)
+    found = blocks >= 0
+    active, bars = active[found], blocks[found] * block
+
+    for offset in range(block):
+        inside = bars <= ends[active]
+        active, bars = active[inside], bars[inside]
+        hit = values[bars] <= levels[active]
+        hits[active[hit]] = bars[hit]
+        active, bars = active[~hit], bars[~hit] + 1
+    return hits
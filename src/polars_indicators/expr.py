@@ -0,0 +1,64 @@
+"""
+Expression versions of the indicators
+Each function returns a polars expression instead of a new DataFrame so many indicators can go in one select or with_columns
+    df.with_columns(expr.simple_moving_average(20), expr.trailing_stop(2), expr.targeted_value('SMA20'))
+The expressions are aliased to the same column names the DataFrame indicators use
+Windowed expressions are partitioned by the symbol column by default. Pass by=None for single symbol data without one
+    pass prepared=True for frames from pi.prepare to use their symbol boundary index instead of windows over the symbol
+"""
+
+import polars as pl
+import polars_indicators as pi
+
+
+def simple_moving_average(days: int, column: str='Close', by: str | None=pi.SYMBOL_COLUMN, float32: bool=False, prepared: bool=False) -> pl.Expr:
+    """simple moving average of column named 'SMA' + days"""
+    return pi._simple_moving_average_expr(days, column, by, float32, prepared)
+
+def exponential_moving_average(days: int, by: str | None=pi.SYMBOL_COLUMN) -> pl.Expr:
+    """exponential moving average of Close named 'EMA' + days"""
+    return pi._exponential_moving_average_expr(days, by)
+
+def true_range(by: str | None=pi.SYMBOL_COLUMN, prepared: bool=False) -> pl.Expr:
+    """true range named True_Range"""
+    return pi._true_range_expr(by, prepared)
+
+def relative_strength_index(days: int=14, by: str | None=pi.SYMBOL_COLUMN) -> pl.Expr:
+    """relative strength index of Close named 'RSI' + days"""
+    return pi._relative_strength_index_expr(days, by)
+
+def crossover_up(column1: str, column2: str, by: str | None=pi.SYMBOL_COLUMN, prepared: bool=False) -> pl.Expr:
+    """True where column1 crosses over column2 in the upward direction"""
+    return pi._crossover_up_expr(column1, column2, by, prepared)
+
+def crossover_down(column1: str, column2: str, by: str | None=pi.SYMBOL_COLUMN, prepared: bool=False) -> pl.Expr:
+    """True where column1 crosses over column2 in the downward direction"""
+    return pi._crossover_down_expr(column1, column2, by, prepared)
+
+def crossover(column1: str, column2: str, by: str | None=pi.SYMBOL_COLUMN, prepared: bool=False) -> pl.Expr:
+    """True where column1 crosses over column2 in either direction"""
+    return pi._crossover_expr(column1, column2, by, prepared)
+
+def trailing_stop(bars: int, by: str | None=pi.SYMBOL_COLUMN, prepared: bool=False) -> pl.Expr:
+    """exit values where the trailing stop of the previous bars lows was hit"""
+    return pi._trailing_stop_expr(bars, by, prepared)
+
+def end_of_data_stop(by: str | None=pi.SYMBOL_COLUMN, prepared: bool=False) -> pl.Expr:
+    """close of the last bar of the data"""
+    return pi._end_of_data_stop_expr(by, prepared)
+
+def entry_percentage_stop(percentage: float, entry_column: str) -> pl.Expr:
+    """percentage of entry stop if it was hit on the entry bar"""
+    return pi._entry_percentage_stop_expr(percentage, entry_column)
+
+def targeted_value(targets: str) -> pl.Expr:
+    """values of the targets column where they were hit"""
+    return pi._targeted_value_expr(targets)
+
+def limit_entries(bars: int, entries: str, by: str | None=pi.SYMBOL_COLUMN) -> pl.Expr:
+    """entries with a minimum number of bars between them"""
+    return pi._limit_entries_expr(bars, entries, by)
+
+def create_trade_ids(enter_column: str, exit_column: str, by: str | None=pi.SYMBOL_COLUMN, prepared: bool=False) -> pl.Expr:
+    """integer id shared by every bar of each trade"""
+    return pi._create_trade_ids_expr(enter_column, exit_column, by, prepared)
@@ -0,0 +1,385 @@
+"""
+Updates the indicators of a Pipeline for newly arrived bars without recomputing the history
+    incremental = Incremental(Pipeline().add(pi.simple_moving_average, days=20).add(pi.crossover_up, column1='Close', column2='SMA20'))
+    incremental.start(history)
+    new_rows = incremental.update(todays_bars).df
+The state kept per symbol is
+    the last bars of the input. As many as the indicators look back so every window of a new bar is full
+        buy_x_week_low.entries looks back over a duration so the bars of that long before the last bar are kept too
+        it leaves out the bars within its lookback of the first date of the data so the earliest bar of the history is kept to see that date
+    the trade that's open on the last bar for each create_trade_ids in the pipeline and the largest trade id so far
+    the bars since the start of the last group of entries and since the last entry for each limit_entries
+    the id, entry price and bars since the entry of the trade that's open on the last bar for each exits.trade_exits
+An update runs the windowed indicators on the kept bars plus the new bars and keeps only the new rows
+    so it takes time in the number of new bars times the look back instead of the length of the history
+limit_entries, exits.trade_exits and create_trade_ids depend on every bar before so they run on the new rows from their state
+    they have to come after every other indicator but can be in any order among themselves
+create_trade_ids and exits.trade_exits continue the open trade of each symbol and number new trades after the largest id so far
+    a full recompute numbers trades in symbol order so its ids can differ but every trade holds the same bars
+    a trailing stop of exits.trade_exits is added to the windowed indicators when the pipeline doesn't have it and left out of the output
+end_of_data_stop marks the last bar of each update. A full recompute only marks the last bar of all of the data
+    pass ends with the last date of each symbol to only mark those bars like a full recompute
+    exits.trade_exits closes trades at the same bars so with ends a trade stays open across updates until the real end
+Float columns match a full recompute to rounding. polars rolling means carry rounding from every earlier bar of the window they slide over
+Only indicators whose look back is known or that keep a state can be updated
+    exponential averages like exponential_moving_average, average_true_range and relative_strength_index depend on every bar before so they can't
+New bars have to come after the bars already seen for their symbol
+"""
+
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Callable
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import exits
+from polars_indicators.pipeline import IndicatorSpec, Pipeline, _unwrapped
+from polars_indicators.strategies import buy_x_week_low
+
+
+#bars before a row that each indicator reads or the time before it for the ones that look back over a duration
+_LOOKBACK: dict[Callable, Callable[..., int | timedelta]] = {
+    pi.simple_moving_average: lambda days, **kwargs: days - 1,
+    pi.moving_average_sweep: lambda windows, **kwargs: max(windows) - 1,
+    pi.true_range: lambda: 1,
+    pi.bollinger_bands: lambda days=20, **kwargs: days - 1,
+    pi.crossover_up: lambda **kwargs: 1,
+    pi.crossover_down: lambda **kwargs: 1,
+    pi.crossover: lambda **kwargs: 1,
+    pi.crossovers: lambda **kwargs: 1,
+    pi.trailing_stop: lambda bars: bars,
+    pi.end_of_data_stop: lambda: 0,
+    pi.entry_percentage_stop: lambda **kwargs: 0,
+    pi.targeted_value: lambda **kwargs: 0,
+    buy_x_week_low.entries: lambda lookback: lookback,
+}
+
+_NEW = "__new"
+_ROW = "__row"
+_SEED = "__seed"
+_OPEN = "__open"
+_END = "__end"
+_EOD = "EOD_Stops"
+_BAR = "__bar"
+_START = "__start"
+_ENTRY = "__entry"
+_LAST = "__last"
+_GROUP = "__group"
+_PRICE = "__price"
+_AGE = "__age"
+_EXIT_OPTIONS = ("percentage", "trailing_bars", "time_bars", "target_percentage")
+
+
+@dataclass
+class TradeState:
+    """open trade of each symbol for one create_trade_ids
+    open_trades has the symbol column if there is one and the id of the trade open on its last bar or null"""
+    enter_column: str
+    exit_column: str
+    open_trades: pl.DataFrame
+    last_id: int = 0
+
+    @property
+    def column(self) -> str:
+        return f"{self.enter_column}/{self.exit_column}"
+
+
+@dataclass
+class EntryState:
+    """group of entries of each symbol for one limit_entries
+    last has the symbol column if there is one and the bars from the start of the last group and from the last entry to its last bar"""
+    bars: int
+    entries: str
+    last: pl.DataFrame | None = None
+
+    @property
+    def column(self) -> str:
+        return f"{self.bars}_minimum_bars_between"
+
+
+@dataclass
+class ExitState:
+    """open trade of each symbol for one exits.trade_exits
+    options are the percentage, trailing_bars, time_bars and target_percentage it was called with
+    open_trades has the symbol column if there is one and the id, entry price and bars since the entry of the trade open on its last bar"""
+    enter_column: str
+    options: dict[str, Any]
+    open_trades: pl.DataFrame | None = None
+    last_id: int = 0
+
+    @property
+    def columns(self) -> list[str]:
+        return exits._exit_columns(self.enter_column, **self.options)
+
+
+@dataclass
+class Incremental:
+    """Pipeline that can be extended with new bars once it has been started on the history"""
+    pipeline: Pipeline
+    lookback: int = field(init=False)
+    duration: timedelta | None = field(default=None, init=False)
+    windowed: Pipeline = field(init=False)
+    sequential: list[IndicatorSpec] = field(init=False)
+    hidden: list[str] = field(default_factory=list, init=False)
+    tail: pl.DataFrame | None = field(default=None, init=False)
+    states: list[TradeState | EntryState | ExitState] = field(default_factory=list, init=False)
+
+    def __post_init__(self):
+        specs = self.pipeline.specs
+        sequential = [_unwrapped(pi.limit_entries), _unwrapped(exits.trade_exits), _unwrapped(pi.create_trade_ids)]
+        first = next((i for i, spec in enumerate(specs) if spec.indicator in sequential), len(specs))
+        windowed = list(specs[:first])
+        self.sequential = specs[first:]
+        for spec in windowed:
+            if spec.indicator not in _LOOKBACK:
+                raise ValueError(f"{spec.function.__name__} can't be updated incrementally")
+        if any(spec.indicator not in sequential for spec in self.sequential):
+            raise ValueError("limit_entries, trade_exits and create_trade_ids have to come after every other indicator")
+        #the exit engine uses a trailing_stop column that's already there so the new rows get the stops of the bars before them
+        for spec in self.sequential:
+            bars = spec.kwargs.get("trailing_bars") if spec.indicator is _unwrapped(exits.trade_exits) else None
+            if bars is not None and not any(other.indicator is _unwrapped(pi.trailing_stop) and other.kwargs.get("bars") == bars for other in windowed):
+                windowed.append(IndicatorSpec(pi.trailing_stop, {"bars": bars}))
+                self.hidden.append(f"{bars}_bar_trailing_stop")
+        self.windowed = Pipeline(windowed)
+        #chained indicators add up their look backs
+        lookbacks = [_LOOKBACK[spec.indicator](**spec.kwargs) for spec in self.windowed.specs]
+        self.lookback = sum(lookback for lookback in lookbacks if not isinstance(lookback, timedelta))
+        durations = [lookback for lookback in lookbacks if isinstance(lookback, timedelta)]
+        if durations:
+            self.duration = sum(durations, timedelta())
+
+    def start(self, df: pl.DataFrame, ends: pl.DataFrame | None=None) -> pi.IndicatorsResult:
+        """runs the whole pipeline on the history in df and keeps the state to update it
+        ends has the Date of the last bar of each symbol for end_of_data_stop and exits.trade_exits. By default it's the last bar of df"""
+        windowed = self.windowed.run(df)
+        result = self._end_of_data(windowed.df, ends)
+        columns = list(windowed.columns)
+        self._keep_tail(df)
+        self.states = []
+        for spec in self.sequential:
+            if spec.indicator is _unwrapped(pi.create_trade_ids):
+                ret = Pipeline([spec]).run(result)
+                state = TradeState(spec.kwargs["enter_column"], spec.kwargs["exit_column"], pl.DataFrame())
+                self._keep_trades(state, ret.df)
+                result = ret.df
+                columns.extend(ret.columns)
+                self.states.append(state)
+                continue
+            if spec.indicator is _unwrapped(pi.limit_entries):
+                state = EntryState(spec.kwargs["bars"], spec.kwargs["entries"])
+            else:
+                state = ExitState(spec.kwargs["enter_column"], {option: spec.kwargs.get(option) for option in _EXIT_OPTIONS})
+            #a state without bars before continues nothing so this is a full run
+            result = self._continue(state, result, ends)
+            columns.extend([state.column] if isinstance(state, EntryState) else state.columns)
+            self.states.append(state)
+        return self._without_hidden(result, columns)
+
+    def update(self, df: pl.DataFrame, ends: pl.DataFrame | None=None) -> pi.IndicatorsResult:
+        """indicators for the new bars in df. Returns only the new rows
+        ends has the Date of the last bar of each symbol for end_of_data_stop. By default it's the last bar of df"""
+        if self.tail is None:
+            raise ValueError("start has to be called with the history before update")
+
+        combined = pl.concat([self.tail.with_columns(pl.lit(False).alias(_NEW)), df.select(self.tail.columns).with_columns(pl.lit(True).alias(_NEW))])
+        if pi.SYMBOL_COLUMN in combined.columns:
+            combined = combined.with_row_count(_ROW).sort([pi.SYMBOL_COLUMN, _ROW]).drop(_ROW)
+        #the kept bars and the new ones were numbered apart
+        combined = pi._reindex(combined)
+
+        ret = self.windowed.run(combined)
+        self._keep_tail(combined.drop(_NEW))
+        result = self._end_of_data(ret.df.filter(pl.col(_NEW)).drop(_NEW), ends)
+
+        columns = list(ret.columns)
+        for state in self.states:
+            result = self._continue(state, result, ends)
+            if isinstance(state, ExitState):
+                columns.extend(state.columns)
+            else:
+                columns.append(state.column)
+        return self._without_hidden(result, columns)
+
+    def _without_hidden(self, df: pl.DataFrame, columns: list[str]) -> pi.IndicatorsResult:
+        """drops the trailing stops added for the exit engine"""
+        return pi.IndicatorsResult(df.drop(self.hidden), [column for column in columns if column not in self.hidden])
+
+    def _continue(self, state: TradeState | EntryState | ExitState, df: pl.DataFrame, ends: pl.DataFrame | None) -> pl.DataFrame:
+        if isinstance(state, TradeState):
+            return self._continue_trades(state, df)
+        if isinstance(state, EntryState):
+            return self._continue_entries(state, df)
+        return self._continue_exits(state, df, ends)
+
+    def _end_of_data(self, df: pl.DataFrame, ends: pl.DataFrame | None) -> pl.DataFrame:
+        """moves the end_of_data_stop columns to the bars on the dates in ends"""
+        if ends is None or not any(spec.indicator is _unwrapped(pi.end_of_data_stop) for spec in self.windowed.specs):
+            return df
+        return _with_end(df, ends).with_columns(
+            pl.when(pl.col(pi.DATE_COLUMN) == pl.col(_END)).then(pl.col(pi.CLOSE_COLUMN)).alias(_EOD)
+        ).drop(_END)
+
+    def _keep_tail(self, df: pl.DataFrame):
+        """keeps the last lookback bars of each symbol of the input columns
+        with a duration it's the lookback bars before the ones within the duration of the last bar and the earliest bar of df"""
+        if self.duration is None:
+            if pi.SYMBOL_COLUMN in df.columns:
+                self.tail = df.groupby(pi.SYMBOL_COLUMN, maintain_order=True).tail(self.lookback).select(df.columns)
+            else:
+                self.tail = df.tail(self.lookback)
+            return
+
+        by = pi._symbol_by(df.columns)
+
+        def per_symbol(expr: pl.Expr) -> pl.Expr:
+            return expr.over(by) if by is not None else expr
+
+        remaining = per_symbol(pl.col(pi.DATE_COLUMN).cumcount(reverse=True))
+        within = per_symbol((pl.col(pi.DATE_COLUMN) >= pl.col(pi.DATE_COLUMN).max() - self.duration).sum())
+        first = pl.col(pi.DATE_COLUMN).cumcount() == pl.col(pi.DATE_COLUMN).arg_min()
+        self.tail = df.filter((remaining < within + self.lookback) | first)
+
+    def _keep_trades(self, state: TradeState, df: pl.DataFrame):
+        """keeps the trade open on the last bar of each symbol in df and the largest id
+        a trade that exits on the last bar isn't open any more"""
+        symbol = [pl.col(pi.SYMBOL_COLUMN)] if pi.SYMBOL_COLUMN in df.columns else []
+        open_trades = _last_rows(df, pi._symbol_by(df.columns)).select(
+            *symbol,
+            pl.when(pl.col(state.exit_column).is_null()).then(pl.col(state.column)).alias(_OPEN))
+
+        state.open_trades = _merged(state.open_trades if len(state.open_trades) else None, open_trades)
+        state.last_id = max(state.last_id, df[state.column].max() or 0)
+
+    def _continue_trades(self, state: TradeState, df: pl.DataFrame) -> pl.DataFrame:
+        """adds the trade ids of the new bars in df continuing the trades open before them"""
+        by = pi._symbol_by(df.columns)
+        if by is not None:
+            df = df.join(state.open_trades, on=by, how="left")
+            first = (pl.col(by) != pl.col(by).shift(1)).fill_null(True)
+        else:
+            df = df.with_columns(pl.lit(state.open_trades[_OPEN][0], pl.Int32).alias(_OPEN))
+            first = pl.col(state.exit_column).cumcount() == 0
+
+        #an open trade is continued by an entry on the first new bar of its symbol
+        df = df.with_columns(pl.when(pl.col(state.enter_column).is_not_null() | (first & pl.col(_OPEN).is_not_null())).then(True).alias(_SEED))
+        local = pi._create_trade_ids_expr(_SEED, state.exit_column, by)
+        df = df.with_columns(local.alias(state.column))
+        df = df.with_columns(_renumbered(state.column, state.last_id, by)).drop([_SEED, _OPEN])
+
+        self._keep_trades(state, df)
+        return df
+
+    def _continue_entries(self, state: EntryState, df: pl.DataFrame) -> pl.DataFrame:
+        """adds limit_entries for the new bars in df continuing the group of entries of each symbol before them
+        a bar starts a group when no entry of its symbol is in the bars before it. The entries in df are seen with a rolling sum
+        and the last entry before df with the bars kept since it"""
+        by = pi._symbol_by(df.columns)
+        if state.bars == 0:
+            return df.with_columns(pi._limit_entries_expr(0, state.entries, by))
+
+        def per_symbol(expr: pl.Expr) -> pl.Expr:
+            return expr.over(by) if by is not None else expr
+
+        df = _with_state(df, state.last, by, {_START: pl.Int64, _ENTRY: pl.Int64})
+        is_entry = pl.col(state.entries).is_not_null()
+        df = df.with_columns(
+            per_symbol(pl.col(state.entries).cumcount()).cast(pl.Int64).alias(_BAR),
+            per_symbol(is_entry.cast(pl.UInt32).rolling_sum(state.bars, min_periods=1).shift(1).fill_null(0)).alias(_GROUP))
+        earlier = (pl.col(_BAR) + pl.col(_ENTRY) < state.bars).fill_null(False)
+        #the group start before df is the bars kept since it before the first row
+        #the conditions are columns before the windows because polars warns about when/then inside over
+        df = df.with_columns(
+            pl.when((pl.col(_GROUP) == 0) & ~earlier).then(pl.col(_BAR)).otherwise((-1 - pl.col(_START)).fill_null(-1)).alias(_GROUP),
+            pl.when(is_entry).then(pl.col(_BAR)).alias(_LAST))
+        df = df.with_columns(per_symbol(pl.col(_GROUP).cummax()), per_symbol(pl.col(_LAST).forward_fill()))
+        keep = (pl.col(_BAR) - pl.col(_GROUP)) % (state.bars + 1) == 0
+        df = df.with_columns(pl.when(keep).then(pl.col(state.entries)).alias(state.column))
+
+        symbol = [pl.col(by)] if by is not None else []
+        last = _last_rows(df, by).select(
+            *symbol,
+            (pl.col(_BAR) - pl.col(_GROUP)).alias(_START),
+            pl.when(pl.col(_LAST).is_not_null()).then(pl.col(_BAR) - pl.col(_LAST)).otherwise(pl.col(_ENTRY) + pl.col(_BAR) + 1).alias(_ENTRY))
+        state.last = _merged(state.last, last)
+        return df.drop([_START, _ENTRY, _BAR, _GROUP, _LAST])
+
+    def _continue_exits(self, state: ExitState, df: pl.DataFrame, ends: pl.DataFrame | None) -> pl.DataFrame:
+        """adds the exits of the new bars in df continuing the trade open before them on the first new bar of each symbol"""
+        by = pi._symbol_by(df.columns)
+        exit_price, reason, trade_id = state.columns
+
+        def per_symbol(expr: pl.Expr) -> pl.Expr:
+            return expr.over(by) if by is not None else expr
+
+        df = _with_state(df, state.open_trades, by, {_OPEN: pl.Int32, _PRICE: pl.Float64, _AGE: pl.Int64})
+        first = (pl.col(by) != pl.col(by).shift(1)).fill_null(True) if by is not None else pl.col(state.enter_column).cumcount() == 0
+        rows = np.flatnonzero(df.select(first & pl.col(_OPEN).is_not_null()).to_series().to_numpy())
+        carried = (rows, df[_PRICE].to_numpy()[rows], df[_AGE].to_numpy()[rows].astype(np.int64) + 1)
+        at_ends = None
+        if ends is not None:
+            symbol = [pi.SYMBOL_COLUMN] if pi.SYMBOL_COLUMN in df.columns else []
+            at_ends = _with_end(df.select(*symbol, pi.DATE_COLUMN), ends).select(
+                (pl.col(pi.DATE_COLUMN) == pl.col(_END)).fill_null(False)).to_series().to_numpy()
+        found = exits._exits(df, state.enter_column, by, ends=at_ends, carried=carried, **state.options)
+        df = df.with_columns(found["price"].alias(exit_price), found["reason"].alias(reason), found["trade_id"].alias(trade_id))
+        df = df.with_columns(_renumbered(trade_id, state.last_id, by))
+
+        #the entry of the trade on each bar. A continued trade entered the bars kept before its first row
+        trade = pl.col(trade_id)
+        start = trade.is_not_null() & (trade != trade.shift(1)).fill_null(True)
+        continued = start & (trade == pl.col(_OPEN)).fill_null(False)
+        df = df.with_columns(per_symbol(pl.col(trade_id).cumcount()).cast(pl.Int64).alias(_BAR))
+        df = df.with_columns(
+            pl.when(continued).then(-1 - pl.col(_AGE)).when(start).then(pl.col(_BAR)).alias(_ENTRY),
+            pl.when(continued).then(pl.col(_PRICE)).when(start).then(pl.col(state.enter_column).cast(pl.Float64)).alias(_LAST))
+        df = df.with_columns(per_symbol(pl.col(_ENTRY).forward_fill()), per_symbol(pl.col(_LAST).forward_fill()))
+
+        symbol = [pl.col(by)] if by is not None else []
+        open_trades = _last_rows(df, by).select(
+            *symbol,
+            pl.when(trade.is_not_null() & pl.col(reason).is_null()).then(trade).alias(_OPEN),
+            pl.col(_LAST).alias(_PRICE),
+            (pl.col(_BAR) - pl.col(_ENTRY)).alias(_AGE))
+        state.open_trades = _merged(state.open_trades, open_trades)
+        state.last_id = max(state.last_id, df[trade_id].max() or 0)
+        return df.drop([_OPEN, _PRICE, _AGE, _BAR, _ENTRY, _LAST])
+
+
+def _with_end(df: pl.DataFrame, ends: pl.DataFrame) -> pl.DataFrame:
+    """adds the Date in ends of the last bar of the symbol of each row as _END"""
+    end = ends.select(*([pi.SYMBOL_COLUMN] if pi.SYMBOL_COLUMN in ends.columns else []), pl.col(pi.DATE_COLUMN).alias(_END))
+    if pi.SYMBOL_COLUMN in df.columns:
+        return df.join(end, on=pi.SYMBOL_COLUMN, how="left")
+    return df.with_columns(pl.lit(end[_END][0]).alias(_END))
+
+
+def _with_state(df: pl.DataFrame, state: pl.DataFrame | None, by: str | None, schema: dict[str, pl.PolarsDataType]) -> pl.DataFrame:
+    """adds the state kept for the symbol of each row. Symbols without one get nulls"""
+    if state is None:
+        return df.with_columns([pl.lit(None, dtype).alias(name) for name, dtype in schema.items()])
+    if by is not None:
+        return df.join(state, on=by, how="left")
+    return df.with_columns([pl.lit(state[name][0], dtype).alias(name) for name, dtype in schema.items()])
+
+
+def _last_rows(df: pl.DataFrame, by: str | None) -> pl.DataFrame:
+    return df.groupby(by, maintain_order=True).tail(1) if by is not None else df.tail(1)
+
+
+def _merged(state: pl.DataFrame | None, last: pl.DataFrame) -> pl.DataFrame:
+    """the state of the last bar of each symbol in last. Symbols without new bars keep theirs"""
+    if state is not None and pi.SYMBOL_COLUMN in last.columns:
+        return pl.concat([state.join(last, on=pi.SYMBOL_COLUMN, how="anti"), last])
+    return last
+
+
+def _renumbered(column: str, last_id: int, by: str | None) -> pl.Expr:
+    """trade ids of column numbered after last_id. The trade on the first bar of a symbol with an _OPEN trade keeps that id
+    local ids only go up so the first bar of each trade is where the id changes"""
+    trade = pl.col(column)
+    continued = pl.col(_OPEN).is_not_null() & (trade == trade.first().over(by) if by is not None else trade == trade.first())
+    starts = (trade.is_not_null() & (trade != trade.shift(1)).fill_null(True) & ~continued).cast(pl.Int32).cumsum()
+    return (pl.when(trade.is_null()).then(None)
+            .when(continued).then(pl.col(_OPEN))
+            .otherwise(starts + last_id).cast(pl.Int32).alias(column))
@@ -0,0 +1,76 @@
+"""
+Runs an indicator chain or strategy on batches of symbols in parallel
+The frame is cut into slices of whole symbols so every batch can be handled on its own
+    rows of each symbol must be contiguous. Sort by symbol and date first
+The function is run on each batch in a thread or process pool and the results are concatenated in the original order
+The function must only depend on the rows of each symbol. Anything computed across symbols will be computed per batch instead
+For process pools the function has to be picklable. Use a module level function or functools.partial of one
+    processes are spawned rather than forked since forking a process that's running polars threads can deadlock
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Literal
+import multiprocessing
+import os
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+
+
+BatchResult = pl.DataFrame | pl.LazyFrame | pi.IndicatorResult | pi.IndicatorsResult
+
+
+def symbol_batches(df: pl.DataFrame, batches: int) -> list[pl.DataFrame]:
+    """splits df into at most batches slices of whole symbols with about the same number of rows
+    slices don't copy the data"""
+    if pi.SYMBOL_COLUMN not in df.columns or batches <= 1 or len(df) == 0:
+        return [df]
+
+    is_start = df.select((pl.col(pi.SYMBOL_COLUMN) != pl.col(pi.SYMBOL_COLUMN).shift(1)).fill_null(True)).to_series()
+    starts = np.flatnonzero(is_start.to_numpy())
+    if len(starts) != df[pi.SYMBOL_COLUMN].n_unique():
+        raise ValueError(f"rows of each symbol must be contiguous. Sort by {pi.SYMBOL_COLUMN} first")
+
+    #cut at the first symbol start at or after each even split of the rows
+    targets = np.linspace(0, len(df), batches + 1)[1:-1]
+    cuts = np.unique(starts[np.minimum(np.searchsorted(starts, targets), len(starts) - 1)])
+    offsets = [0] + [int(cut) for cut in cuts if cut > 0] + [len(df)]
+    return [df.slice(start, end - start) for start, end in zip(offsets[:-1], offsets[1:]) if end > start]
+
+
+def run_partitioned(df: pl.DataFrame | pl.LazyFrame, function: Callable[[pl.DataFrame], BatchResult], workers: int | None=None,
+                    batches: int | None=None, executor: Literal["thread", "process"]="thread", id_columns: list[str] | None=None) -> pl.DataFrame:
+    """runs function on batches of symbols in a pool of workers and returns the concatenated results
+    function takes a DataFrame and returns a DataFrame, LazyFrame or the result of an indicator
+    workers defaults to the number of cpus and batches defaults to workers
+    Each batch numbers its trades from 1. id_columns are columns of ids like those from create_trade_ids
+        that are offset by the largest id of the earlier batches so they match an unpartitioned run
+        ids in columns not listed repeat across batches"""
+    workers = workers or os.cpu_count() or 1
+    batches = batches or workers
+
+    df = df.collect() if isinstance(df, pl.LazyFrame) else df
+    parts = symbol_batches(df, batches)
+
+    if workers == 1 or len(parts) == 1:
+        results = [_run_batch(function, part) for part in parts]
+    else:
+        pool: Executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) if executor == "process" else ThreadPoolExecutor(workers)
+        with pool:
+            results = list(pool.map(_run_batch, [function] * len(parts), parts))
+
+    for column in id_columns or []:
+        offset = 0
+        for i, result in enumerate(results):
+            results[i] = result.with_columns(pl.col(column) + offset)
+            offset += result[column].max() or 0
+
+    return pl.concat(results)
+
+
+def _run_batch(function: Callable[[pl.DataFrame], BatchResult], df: pl.DataFrame) -> pl.DataFrame:
+    """runs function on a single batch and returns a DataFrame"""
+    result = function(df)
+    if isinstance(result, (pi.IndicatorResult, pi.IndicatorsResult)):
+        result = result.df
+    return result.collect() if isinstance(result, pl.LazyFrame) else result
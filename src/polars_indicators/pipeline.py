@@ -0,0 +1,129 @@
+"""
+Builds a chain of indicators into a single lazy query
+Calling indicators one after another on a DataFrame collects the frame after every indicator
+A Pipeline holds the indicator specs and applies all of them to one LazyFrame so there is only one collect at the end
+Consecutive indicators that are plain expressions and don't depend on each other are merged into one with_columns
+    this lets polars evaluate them in parallel instead of one projection at a time
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable
+import polars as pl
+import polars_indicators as pi
+
+
+#indicators that can be written as a single expression
+#maps the indicator to the function that builds its expression, whether that expression takes the symbol column
+#and whether it can use the symbol boundary index from pi.prepare
+_EXPRESSIONS: dict[Callable, tuple[Callable[..., pl.Expr], bool, bool]] = {
+    pi.simple_moving_average: (pi._simple_moving_average_expr, True, True),
+    pi.exponential_moving_average: (pi._exponential_moving_average_expr, True, False),
+    pi.true_range: (pi._true_range_expr, True, True),
+    pi.relative_strength_index: (pi._relative_strength_index_expr, True, False),
+    pi.crossover_up: (pi._crossover_up_expr, True, True),
+    pi.crossover_down: (pi._crossover_down_expr, True, True),
+    pi.crossover: (pi._crossover_expr, True, True),
+    pi.trailing_stop: (pi._trailing_stop_expr, True, True),
+    pi.end_of_data_stop: (pi._end_of_data_stop_expr, True, True),
+    pi.limit_entries: (pi._limit_entries_expr, True, False),
+    pi.create_trade_ids: (pi._create_trade_ids_expr, True, True),
+    pi.entry_percentage_stop: (pi._entry_percentage_stop_expr, False, False),
+    pi.targeted_value: (pi._targeted_value_expr, False, False),
+}
+
+
+def _unwrapped(function: Callable) -> Callable:
+    """the indicator behind the recording wrapper profiling.instrument swaps in for it"""
+    return getattr(function, "_recorded_indicator", function)
+
+
+@dataclass
+class IndicatorSpec:
+    """An indicator function and the keyword arguments to call it with
+    function can be any function that takes a df as its first argument and returns an IndicatorResult or IndicatorsResult"""
+    function: Callable[..., pi.IndicatorResult | pi.IndicatorsResult]
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def indicator(self) -> Callable[..., pi.IndicatorResult | pi.IndicatorsResult]:
+        """function without the wrapper profiling.instrument puts around it inside its block"""
+        return _unwrapped(self.function)
+
+    def expression(self, by: str | None, prepared: bool=False) -> pl.Expr | None:
+        """returns the expression for this indicator or None if it can't be written as one
+        prepared is True if the frame has the index from pi.prepare"""
+        if self.indicator not in _EXPRESSIONS:
+            return None
+        builder, symbol_aware, index_aware = _EXPRESSIONS[self.indicator]
+        if index_aware:
+            return builder(**self.kwargs, by=by, prepared=prepared)
+        if symbol_aware:
+            return builder(**self.kwargs, by=by)
+        return builder(**self.kwargs)
+
+
+class Pipeline:
+    """Chain of indicators run as one lazy plan
+
+    pipeline = Pipeline().add(pi.simple_moving_average, days=20).add(pi.crossover_up, column1='Close', column2='SMA20')
+    result = pipeline.run(df)
+    """
+
+    def __init__(self, specs: list[IndicatorSpec] | None=None):
+        self.specs = list(specs) if specs is not None else []
+
+    def add(self, function: Callable[..., pi.IndicatorResult | pi.IndicatorsResult], **kwargs) -> 'Pipeline':
+        """adds an indicator to the end of the chain. Returns the pipeline so calls can be chained"""
+        self.specs.append(IndicatorSpec(function, kwargs))
+        return self
+
+    def plan(self, df: pl.DataFrame | pl.LazyFrame) -> pi.IndicatorsResult:
+        """builds the LazyFrame for every indicator in the chain without collecting it"""
+        lf = df.lazy()
+        known_columns = list(lf.columns)
+        indicator_columns = []
+        batch: dict[str, pl.Expr] = {}
+
+        def flush(lf: pl.LazyFrame) -> pl.LazyFrame:
+            if batch:
+                lf = lf.with_columns(list(batch.values()))
+                known_columns.extend(batch)
+                batch.clear()
+            return lf
+
+        for spec in self.specs:
+            expr = spec.expression(pi._symbol_by(known_columns), pi._prepared(known_columns))
+            if expr is None:
+                lf = flush(lf)
+                ret = spec.function(lf, **spec.kwargs)
+                lf = ret.df
+                known_columns = list(lf.columns)
+                if isinstance(ret, pi.IndicatorsResult):
+                    indicator_columns.extend(ret.columns)
+                else:
+                    indicator_columns.append(ret.column)
+                continue
+
+            column_name = expr.meta.output_name()
+            indicator_columns.append(column_name)
+            if column_name in known_columns or column_name in batch:
+                continue
+            #an expression can't see columns added in the same with_columns so it starts a new batch
+            if any(root in batch for root in expr.meta.root_names()):
+                lf = flush(lf)
+            batch[column_name] = expr
+            #inside a profiling.instrument block the indicator isn't called so the recorder is told about its column
+            record = getattr(spec.function, "_record_expression", None)
+            if record is not None:
+                record(column_name)
+
+        lf = flush(lf)
+        return pi.IndicatorsResult(lf, indicator_columns)
+
+    def run(self, df: pl.DataFrame | pl.LazyFrame) -> pi.IndicatorsResult:
+        """runs every indicator in the chain and returns the input type
+        DataFrames are collected once at the end"""
+        result = self.plan(df)
+        if isinstance(df, pl.DataFrame):
+            result.df = result.df.collect()
+        return result
@@ -0,0 +1,202 @@
+"""
+Simulates a portfolio with limited capital taking the trades of a strategy
+    trades = pi.summarize_trades(df, trade_id_column, enter_column, exit_column)
+    result = portfolio.simulate(trades, capital=100_000, position_size=0.1, max_positions=10)
+    result.equity, result.trades, result.symbol_stats(), result.year_stats()
+Every trade is offered to the portfolio on its Start date. It's taken if a position is free and there's cash for it
+    trades that start on the same date are offered in the order of the table so sort it by priority first
+    summarize_trades orders them by trade id which is symbol order for ids from create_trade_ids
+    a position is held from its Start through its End date and its cash can be used again the day after
+    each position is position_size of the book equity on its Start date. The capital plus the profit of the trades closed before then
+The positions and cash are resolved once per date that has entries with numpy operations on all the trades of that date
+    the trades of a date depend on the trades taken before it so the dates are walked in order but the trades aren't
+simulate only knows the trade table so its equity changes on exit dates and open positions are valued at cost
+backtest takes bars with trade ids like those from create_trade_ids and marks the open positions to the Close of every bar
+"""
+
+from dataclasses import dataclass
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+
+
+START = "Start"
+END = "End"
+ENTRY_PRICE = "Entry_Price"
+EXIT_PRICE = "Exit_Price"
+
+
+@dataclass
+class PortfolioResult:
+    """trades has the trades that were taken with their Shares, Cost, Profit and Return%
+    equity has a row per date with the Equity, Cash, Positions, Exposure as the open positions over Equity and Drawdown% from the highest Equity before it"""
+    trades: pl.DataFrame
+    equity: pl.DataFrame
+    capital: float
+
+    def symbol_stats(self) -> pl.DataFrame:
+        """Trades, Win_Rate, Profit and Mean_Return% of the taken trades of each symbol"""
+        return self.trades.groupby(pi.SYMBOL_COLUMN).agg(_trade_stats()).sort(pi.SYMBOL_COLUMN)
+
+    def year_stats(self) -> pl.DataFrame:
+        """Return% and Max_Drawdown% of the equity in each year and the stats of the trades that ended in it"""
+        years = self.equity.groupby(pl.col(pi.DATE_COLUMN).dt.year().alias("Year")).agg(
+            pl.col("Equity").last().alias("End_Equity"),
+            pl.col("Drawdown%").min().alias("Max_Drawdown%"),
+        ).sort("Year")
+        years = years.with_columns(
+            ((pl.col("End_Equity") / pl.col("End_Equity").shift(1).fill_null(self.capital) - 1) * 100).alias("Return%"))
+        trades = self.trades.groupby(pl.col(END).dt.year().alias("Year")).agg(_trade_stats())
+        return years.join(trades, on="Year", how="left").with_columns(pl.col("Trades").fill_null(0))
+
+
+def _trade_stats() -> list[pl.Expr]:
+    return [
+        pl.count().alias("Trades"),
+        (pl.col("Profit") > 0).mean().alias("Win_Rate"),
+        pl.col("Profit").sum().alias("Profit"),
+        pl.col("Return%").mean().alias("Mean_Return%"),
+    ]
+
+
+def simulate(trades: pl.DataFrame | pl.LazyFrame, capital: float=100_000, position_size: float=0.1, max_positions: int | None=None) -> PortfolioResult:
+    """takes the trades the capital allows from a table like summarize_trades returns
+    trades needs Symbol, Start, End, Entry_Price and Exit_Price. Raises ValueError if a trade has no Exit_Price
+    position_size is the fraction of the book equity put in each position. max_positions caps the open positions"""
+    trades = trades.collect() if isinstance(trades, pl.LazyFrame) else trades
+    if trades[EXIT_PRICE].null_count():
+        raise ValueError(f"every trade needs an {EXIT_PRICE}. backtest closes open trades at their last Close")
+    days = _days(trades[START].append(trades[END]))
+    taken = _take(trades, days, capital, position_size, max_positions)
+
+    start_days, end_days = _day_indices(days, taken[START]), _day_indices(days, taken[END])
+    positions = _per_day(len(days), start_days, 1) - _per_day(len(days), end_days + 1, 1)
+    at_cost = _per_day(len(days), start_days, taken["Cost"]) - _per_day(len(days), end_days + 1, taken["Cost"])
+    realized = _per_day(len(days), end_days, taken["Profit"])
+    equity = pl.DataFrame({
+        pi.DATE_COLUMN: days,
+        "Equity": capital + np.cumsum(realized),
+        "Positions": np.cumsum(positions).astype(np.int64),
+        #positions are valued at cost but at their exit price on their End date like backtest does
+        "Open_Value": np.cumsum(at_cost) + realized,
+    })
+    return PortfolioResult(taken, _finish_equity(equity), capital)
+
+
+def backtest(df: pl.DataFrame | pl.LazyFrame, trade_id_column: str, enter_column: str, exit_column: str, capital: float=100_000,
+             position_size: float=0.1, max_positions: int | None=None) -> PortfolioResult:
+    """simulates the trades in bars with trade ids like those from create_trade_ids or trade_exits
+    the trades are summarized with summarize_trades and trades without an exit price are closed at their last Close
+    Equity is marked to the Close of every bar of the open positions and there's a row for every date of df"""
+    lf = df.lazy()
+    trades = pi.summarize_trades(lf, trade_id_column, enter_column, exit_column)
+    last_close = lf.filter(pl.col(trade_id_column).is_not_null()).groupby(trade_id_column).agg(pl.col(pi.CLOSE_COLUMN).last().alias("__close"))
+    trades = trades.join(last_close, on=trade_id_column).with_columns(pl.col(EXIT_PRICE).fill_null(pl.col("__close"))).drop("__close")
+    trades = trades.sort(trade_id_column).collect()
+
+    days = _days(lf.select(pl.col(pi.DATE_COLUMN).unique()).collect().to_series())
+    taken = _take(trades, days, capital, position_size, max_positions)
+
+    #every bar of a taken trade is marked to its Close but the last which is realized at the exit price
+    end_bar = pl.col(pi.DATE_COLUMN) == pl.col(END)
+    held = lf.select(trade_id_column, pi.DATE_COLUMN, pi.CLOSE_COLUMN).join(
+        taken.lazy().select(trade_id_column, END, ENTRY_PRICE, EXIT_PRICE, "Shares"), on=trade_id_column
+    ).with_columns(
+        (pl.col("Shares") * pl.when(end_bar).then(pl.col(EXIT_PRICE)).otherwise(pl.col(pi.CLOSE_COLUMN))).alias("Open_Value"),
+        (pl.col("Shares") * pl.when(end_bar).then(0.0).otherwise(pl.col(pi.CLOSE_COLUMN) - pl.col(ENTRY_PRICE))).alias("Unrealized"),
+    ).groupby(pi.DATE_COLUMN).agg(
+        pl.col("Open_Value").sum(),
+        pl.col("Unrealized").sum(),
+        pl.count().cast(pl.Int64).alias("Positions"),
+    ).collect()
+
+    marks = days.to_frame().join(held, on=pi.DATE_COLUMN, how="left").fill_null(0)
+    realized = _per_day(len(days), _day_indices(days, taken[END]), taken["Profit"])
+    equity = pl.DataFrame({
+        pi.DATE_COLUMN: days,
+        "Equity": capital + np.cumsum(realized) + marks["Unrealized"].to_numpy(),
+        "Positions": marks["Positions"],
+        "Open_Value": marks["Open_Value"],
+    })
+    return PortfolioResult(taken, _finish_equity(equity), capital)
+
+
+def _take(trades: pl.DataFrame, days: pl.Series, capital: float, position_size: float, max_positions: int | None) -> pl.DataFrame:
+    """the trades the portfolio takes with their Shares, Cost, Profit and Return%"""
+    #the row number keeps the order of the table for trades that start on the same date
+    trades = trades.with_row_count("__row").sort([START, "__row"]).drop("__row")
+    starts = _day_indices(days, trades[START])
+    ends = _day_indices(days, trades[END])
+    entry_prices = trades[ENTRY_PRICE].cast(pl.Float64).to_numpy()
+    exit_prices = trades[EXIT_PRICE].cast(pl.Float64).to_numpy()
+    limit = max_positions if max_positions is not None else len(trades)
+
+    n_days = len(days)
+    #positions taken add what they give back on the day after their End. Only the dates up to each entry date are summed
+    freed = np.zeros(n_days + 1, dtype=np.int64)
+    returned_cash = np.zeros(n_days + 1)
+    returned_profit = np.zeros(n_days + 1)
+    shares = np.zeros(len(trades))
+    taken = np.zeros(len(trades), dtype=bool)
+
+    positions = 0
+    cash = float(capital)
+    book = float(capital)
+    summed = 0
+    groups = np.flatnonzero(np.diff(starts)) + 1
+    firsts = np.concatenate([[0], groups]) if len(trades) else []
+    for first, last in zip(firsts, np.concatenate([groups, [len(trades)]])):
+        day = starts[first]
+        positions -= int(freed[summed:day + 1].sum())
+        cash += returned_cash[summed:day + 1].sum()
+        book += returned_profit[summed:day + 1].sum()
+        summed = day + 1
+
+        size = book * position_size
+        if size <= 0:
+            continue
+        count = min(limit - positions, int(cash / size + 1e-9), last - first)
+        if count <= 0:
+            continue
+        chosen = np.arange(first, first + count)
+        taken[chosen] = True
+        shares[chosen] = size / entry_prices[chosen]
+        profit = shares[chosen] * (exit_prices[chosen] - entry_prices[chosen])
+        positions += count
+        cash -= size * count
+        np.add.at(freed, ends[chosen] + 1, 1)
+        np.add.at(returned_cash, ends[chosen] + 1, size + profit)
+        np.add.at(returned_profit, ends[chosen] + 1, profit)
+
+    result = trades.with_columns(pl.Series("Shares", shares)).filter(pl.Series(taken))
+    return result.with_columns(
+        (pl.col("Shares") * pl.col(ENTRY_PRICE)).alias("Cost"),
+        (pl.col("Shares") * (pl.col(EXIT_PRICE) - pl.col(ENTRY_PRICE))).alias("Profit"),
+        ((pl.col(EXIT_PRICE) - pl.col(ENTRY_PRICE)) / pl.col(ENTRY_PRICE) * 100).alias("Return%"),
+    )
+
+
+def _finish_equity(equity: pl.DataFrame) -> pl.DataFrame:
+    """adds Cash, Exposure and Drawdown% to the Equity and Open_Value of each date"""
+    return equity.with_columns(
+        (pl.col("Equity") - pl.col("Open_Value")).alias("Cash"),
+        (pl.col("Open_Value") / pl.col("Equity")).alias("Exposure"),
+        ((pl.col("Equity") / pl.col("Equity").cummax() - 1) * 100).alias("Drawdown%"),
+    ).drop("Open_Value")
+
+
+def _days(dates: pl.Series) -> pl.Series:
+    """the sorted dates the portfolio is valued on"""
+    return dates.unique().sort().alias(pi.DATE_COLUMN)
+
+
+def _day_indices(days: pl.Series, dates: pl.Series) -> np.ndarray:
+    """position of each of dates in days"""
+    return np.searchsorted(days.to_numpy(), dates.to_numpy())
+
+
+def _per_day(n_days: int, indices: np.ndarray, values: float | pl.Series) -> np.ndarray:
+    """values added up on the day of each index. Indices past the last day are dropped"""
+    totals = np.zeros(n_days + 1)
+    np.add.at(totals, indices, values.to_numpy() if isinstance(values, pl.Series) else values)
+    return totals[:n_days]
@@ -0,0 +1,206 @@
+"""
+Instrumentation of indicator calls to find which indicator a slow strategy spends its time in
+    with profiling.instrument() as recorder:
+        buy_x_week_low.strategy(df, timedelta(weeks=52))
+    print(recorder.report())
+Inside the block every public indicator records its wall time, rows in and out and the columns it added
+    the indicators are swapped for recording wrappers in every loaded module that imported them and put back when the block ends
+    indicators called from inside another indicator are part of the outer call
+On a LazyFrame an indicator only builds its part of the plan so its wall time is the time to build the plan and rows aren't counted
+    the cost shows up when the plan is collected. recorder.profile(lf) collects it with LazyFrame.profile
+    and attributes every with_columns node to the indicators that added its columns. A node of several is split evenly between them
+With profile=True DataFrame calls are run as LazyFrames through LazyFrame.profile as well so each gets its own node timings
+explain=True keeps the optimized plan of every LazyFrame an indicator returns
+Pipelines and Incrementals run inside the block merge their expressions like they do outside it
+    an indicator merged as an expression is recorded as a lazy call with no time of its own so profile can attribute its nodes
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+import functools
+import re
+import sys
+import time
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import exits
+
+
+#indicators that are recorded
+INDICATORS: list[Callable] = [
+    pi.simple_moving_average,
+    pi.moving_average_sweep,
+    pi.exponential_moving_average,
+    pi.true_range,
+    pi.average_true_range,
+    pi.relative_strength_index,
+    pi.bollinger_bands,
+    pi.keltner_channels,
+    pi.crossover_up,
+    pi.crossover_down,
+    pi.crossover,
+    pi.crossovers,
+    pi.trailing_stop,
+    pi.end_of_data_stop,
+    pi.entry_percentage_stop,
+    pi.targeted_value,
+    pi.limit_entries,
+    pi.create_trade_ids,
+    pi.trade_indices,
+    pi.summarize_trades,
+    exits.trade_exits,
+]
+
+_WITH_COLUMN = re.compile(r"with_column\((.*)\)")
+
+
+@dataclass
+class IndicatorCall:
+    """one recorded call. rows_in and rows_out are None for LazyFrames. plan is the optimized plan if it was kept"""
+    call: int
+    indicator: str
+    seconds: float
+    lazy: bool
+    rows_in: int | None
+    rows_out: int | None
+    columns_added: list[str]
+    plan: str | None = None
+
+
+@dataclass
+class Recorder:
+    """Calls recorded inside an instrument block and the node timings of profiled plans"""
+    profile_calls: bool = False
+    explain: bool = False
+    calls: list[IndicatorCall] = field(default_factory=list)
+    timings: list[pl.DataFrame] = field(default_factory=list)
+    seconds: float = 0.0
+    _depth: int = 0
+
+    def report(self) -> pl.DataFrame:
+        """one row per call with its wall time, rows, columns added and the time of its profiled plan nodes"""
+        calls = pl.DataFrame(
+            [(call.call, call.indicator, call.seconds, call.lazy, call.rows_in, call.rows_out, call.columns_added) for call in self.calls],
+            schema={"call": pl.Int64, "indicator": pl.Utf8, "seconds": pl.Float64, "lazy": pl.Boolean,
+                    "rows_in": pl.Int64, "rows_out": pl.Int64, "columns_added": pl.List(pl.Utf8)})
+        nodes = self.node_timings().filter(pl.col("call").is_not_null()).groupby("call").agg(pl.col("seconds").sum().alias("profiled_seconds"))
+        return calls.join(nodes, on="call", how="left")
+
+    def node_timings(self) -> pl.DataFrame:
+        """every profiled plan node with its seconds and the call and indicator it's attributed to"""
+        if not self.timings:
+            return pl.DataFrame(schema={"node": pl.Utf8, "start": pl.UInt64, "end": pl.UInt64, "seconds": pl.Float64, "call": pl.Int64, "indicator": pl.Utf8})
+        return pl.concat(self.timings)
+
+    def profile(self, lf: pl.LazyFrame) -> pl.DataFrame:
+        """collects lf with LazyFrame.profile and attributes its nodes to the recorded calls that added their columns"""
+        df, timings = lf.profile()
+        owners = {column: call.call for call in self.calls for column in call.columns_added}
+        calls = [_owners(node, owners) for node in timings["node"]]
+        names = {call.call: call.indicator for call in self.calls}
+        #a node that adds the columns of several calls is split evenly between them
+        timings = _with_seconds(timings).with_columns(
+            pl.Series("call", [node_calls or [None] for node_calls in calls], dtype=pl.List(pl.Int64)),
+            pl.Series("share", [1 / len(node_calls) if node_calls else 1.0 for node_calls in calls]),
+        ).explode("call").with_columns((pl.col("seconds") * pl.col("share")).alias("seconds")).drop("share")
+        self.timings.append(timings.with_columns(pl.col("call").map_dict(names, return_dtype=pl.Utf8).alias("indicator")))
+        return df
+
+    def _wrap(self, function: Callable) -> Callable:
+        """recording version of an indicator
+        Pipeline and Incremental look up the indicator behind it so they run the same way as outside the block"""
+        @functools.wraps(function)
+        def recorded(df: pl.DataFrame | pl.LazyFrame, *args, **kwargs) -> Any:
+            if self._depth > 0:
+                return function(df, *args, **kwargs)
+
+            self._depth += 1
+            try:
+                return self._record(function, df, *args, **kwargs)
+            finally:
+                self._depth -= 1
+        recorded._recorded_indicator = function
+        recorded._record_expression = functools.partial(self._record_expression, function)
+        return recorded
+
+    def _record_expression(self, function: Callable, column: str):
+        """records an indicator a Pipeline merged into its plan as an expression instead of calling it"""
+        if self._depth == 0:
+            self.calls.append(IndicatorCall(len(self.calls), function.__name__, 0.0, True, None, None, [column]))
+
+    def _record(self, function: Callable, df: pl.DataFrame | pl.LazyFrame, *args, **kwargs) -> Any:
+        lazy = isinstance(df, pl.LazyFrame)
+        columns = set(df.columns)
+        call = len(self.calls)
+        profiled = self.profile_calls and not lazy
+
+        start = time.perf_counter()
+        ret = function(df.lazy() if profiled else df, *args, **kwargs)
+        result = ret.df if isinstance(ret, (pi.IndicatorResult, pi.IndicatorsResult)) else ret
+        plan = result.explain() if self.explain and isinstance(result, pl.LazyFrame) else None
+        if profiled:
+            result, timings = result.profile()
+            self.timings.append(_with_seconds(timings).with_columns(pl.lit(call, pl.Int64).alias("call"), pl.lit(function.__name__).alias("indicator")))
+            if isinstance(ret, (pi.IndicatorResult, pi.IndicatorsResult)):
+                ret.df = result
+            else:
+                ret = result
+        seconds = time.perf_counter() - start
+
+        self.calls.append(IndicatorCall(
+            call, function.__name__, seconds, lazy,
+            None if lazy else len(df), len(result) if isinstance(result, pl.DataFrame) else None,
+            [column for column in result.columns if column not in columns], plan))
+        return ret
+
+
+@contextmanager
+def instrument(profile: bool=False, explain: bool=False) -> Iterator[Recorder]:
+    """records every indicator called inside the block
+    profile runs DataFrame calls through LazyFrame.profile. explain keeps the optimized plan of lazy results"""
+    recorder = Recorder(profile_calls=profile, explain=explain)
+    wrappers = {id(function): recorder._wrap(function) for function in INDICATORS}
+
+    #swap the indicators in every module that holds them including modules that imported them by name
+    patched = []
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, "__dict__", None)
+        if not isinstance(namespace, dict):
+            continue
+        for name, value in list(namespace.items()):
+            if callable(value) and id(value) in wrappers:
+                patched.append((namespace, name, value))
+                namespace[name] = wrappers[id(value)]
+
+    start = time.perf_counter()
+    try:
+        yield recorder
+    finally:
+        recorder.seconds = time.perf_counter() - start
+        for namespace, name, value in patched:
+            namespace[name] = value
+
+
+def _owners(node: str, owners: dict[str, int]) -> list[int]:
+    """the calls that added the columns of a with_columns node
+    column names can have ', ' in them like the ones from buy_x_week_low so the longest recorded name is matched first"""
+    match = _WITH_COLUMN.fullmatch(node)
+    if not match:
+        return []
+    calls = []
+    rest = match.group(1)
+    while rest:
+        column = max((column for column in owners if rest == column or rest.startswith(column + ", ")), key=len, default=None)
+        if column is None:
+            #a column no recorded call added
+            column, _, _ = rest.partition(", ")
+        elif owners[column] not in calls:
+            calls.append(owners[column])
+        rest = rest[len(column) + 2:]
+    return calls
+
+
+def _with_seconds(timings: pl.DataFrame) -> pl.DataFrame:
+    """profile timings are in microseconds"""
+    return timings.with_columns(((pl.col("end") - pl.col("start")) / 1e6).alias("seconds"))
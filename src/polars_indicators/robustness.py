@@ -0,0 +1,91 @@
+"""
+Confidence intervals on the results of a strategy from resamples of its trades
+    trades = pi.summarize_trades(df, trade_id_column, enter_column, exit_column)
+    result = robustness.resample(trades, resamples=10_000, seed=0)
+    result.intervals(0.95)
+Every resample is a sequence of as many trades as the table has
+    bootstrap draws the trades with replacement and shuffle puts all of them in a random order
+    shuffle keeps the win rate, mean and ending equity of the trades so only the drawdown changes
+Each trade compounds position_size of the equity at its return. Max_Drawdown% is the worst fall of that equity from its highest
+The resamples are drawn as a matrix of trade indices a chunk of rows at a time
+    the statistics of a chunk are cumulative products and maxima along its rows so memory is bounded by the chunk and not the resamples
+    the same seed and chunk_size give the same samples
+"""
+
+from dataclasses import dataclass
+from typing import Literal
+import numpy as np
+import polars as pl
+from polars_indicators.portfolio import END, ENTRY_PRICE, EXIT_PRICE
+
+
+STATISTICS = ["Win_Rate", "Mean_Gain%", "Max_Drawdown%", "End_Equity"]
+#about 8MB for each float matrix of a chunk
+CHUNK_CELLS = 1 << 20
+
+
+@dataclass
+class RobustnessResult:
+    """samples has a row with the STATISTICS of every resample and actual has them for the trades in the order they were made"""
+    samples: pl.DataFrame
+    actual: dict[str, float]
+
+    def intervals(self, confidence: float=0.95) -> pl.DataFrame:
+        """the Lower, Median and Upper quantiles of each statistic over the resamples next to its Actual value"""
+        tail = (1 - confidence) / 2
+        quantiles = np.quantile(self.samples.select(STATISTICS).to_numpy(), [tail, 0.5, 1 - tail], axis=0)
+        return pl.DataFrame({
+            "Statistic": STATISTICS,
+            "Actual": [self.actual[statistic] for statistic in STATISTICS],
+            "Lower": quantiles[0],
+            "Median": quantiles[1],
+            "Upper": quantiles[2],
+        })
+
+
+def resample(trades: pl.DataFrame | pl.LazyFrame, resamples: int=10_000, method: Literal["bootstrap", "shuffle"]="bootstrap",
+             seed: int | None=None, position_size: float=1.0, capital: float=1.0, chunk_size: int | None=None) -> RobustnessResult:
+    """statistics of resamples of the trades of a table like summarize_trades returns
+    trades needs Entry_Price and Exit_Price. The actual order is by End when there's an End column
+    chunk_size is the resamples drawn at once. By default as many as keep a chunk's matrices around 8MB"""
+    if method not in ("bootstrap", "shuffle"):
+        raise ValueError(f"method must be bootstrap or shuffle not {method}")
+    trades = trades.collect() if isinstance(trades, pl.LazyFrame) else trades
+    if END in trades.columns:
+        trades = trades.with_row_count("__row").sort([END, "__row"]).drop("__row")
+    returns = trades.select((pl.col(EXIT_PRICE) / pl.col(ENTRY_PRICE) - 1).cast(pl.Float64)).to_series().to_numpy()
+    if len(returns) == 0 or np.isnan(returns).any():
+        raise ValueError(f"every trade needs an {ENTRY_PRICE} and {EXIT_PRICE}")
+
+    actual = _statistics(returns[np.newaxis, :].copy(), position_size, capital)
+    chunk_size = chunk_size or max(1, CHUNK_CELLS // len(returns))
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for first in range(0, resamples, chunk_size):
+        rows = min(chunk_size, resamples - first)
+        if method == "bootstrap":
+            indices = rng.integers(0, len(returns), (rows, len(returns)))
+        else:
+            indices = rng.permuted(np.broadcast_to(np.arange(len(returns)), (rows, len(returns))), axis=1)
+        chunks.append(_statistics(returns[indices], position_size, capital))
+
+    samples = pl.DataFrame({statistic: np.concatenate([chunk[statistic] for chunk in chunks]) for statistic in STATISTICS})
+    return RobustnessResult(samples, {statistic: float(values[0]) for statistic, values in actual.items()})
+
+
+def _statistics(returns: np.ndarray, position_size: float, capital: float) -> dict[str, np.ndarray]:
+    """the STATISTICS of each row of a matrix of trade returns. returns is overwritten"""
+    statistics = {
+        "Win_Rate": np.count_nonzero(returns > 0, axis=1) / returns.shape[1],
+        "Mean_Gain%": returns.mean(axis=1) * 100,
+    }
+    #the matrix becomes the equity in place so a chunk only needs one more for the highest equity
+    equity = np.multiply(returns, position_size, out=returns)
+    equity += 1
+    np.cumprod(equity, axis=1, out=equity)
+    highest = np.maximum.accumulate(equity, axis=1)
+    #the equity before the first trade is the highest so far too
+    np.maximum(highest, 1, out=highest)
+    statistics["Max_Drawdown%"] = (np.divide(equity, highest, out=highest).min(axis=1) - 1) * 100
+    statistics["End_Equity"] = equity[:, -1] * capital
+    return statistics
@@ -0,0 +1,55 @@
+"""
+Ranks symbols against each other on every date by an indicator column
+    df = pi.simple_moving_average(df, 20).df
+    screener.top(df.with_columns((pl.col('Close') / pl.col('SMA20')).alias('Spread')), 'Spread', 50)
+    screener.bottom(df, 'RSI14', 20, latest=True)
+The column is compared to the n-th best value of its date found with top_k and only the rows that pass are sorted
+    so the frame is never sorted as a whole. Ties with the n-th value are broken by row order
+latest ranks the last bar of every symbol against the others. A symbol whose last bar is before the frame's last date is kept
+    on frames from prepare that's a filter of Bars_Left == 0 which polars pushes down into a scan_parquet
+    otherwise the last date of each symbol is a window over the whole frame
+"""
+
+import polars as pl
+import polars_indicators as pi
+
+
+RANK_COLUMN = "Rank"
+
+
+def top(df: pl.DataFrame | pl.LazyFrame, column: str, n: int=50, latest: bool=False) -> pl.DataFrame | pl.LazyFrame:
+    """the rows with the n largest values of column on each date with their Rank from 1. Nulls are left out
+    with latest it's the n of the last bars of the symbols"""
+    return _screen(df, column, n, True, latest)
+
+
+def bottom(df: pl.DataFrame | pl.LazyFrame, column: str, n: int=50, latest: bool=False) -> pl.DataFrame | pl.LazyFrame:
+    """the rows with the n smallest values of column on each date with their Rank from 1. Nulls are left out
+    with latest it's the n of the last bars of the symbols"""
+    return _screen(df, column, n, False, latest)
+
+
+def _screen(df: pl.DataFrame | pl.LazyFrame, column: str, n: int, largest: bool, latest: bool) -> pl.DataFrame | pl.LazyFrame:
+    lf = df.lazy()
+    columns = lf.columns
+    group = pi.DATE_COLUMN
+    if latest:
+        if pi._prepared(columns):
+            lf = lf.filter(pl.col(pi.BARS_LEFT_COLUMN) == 0)
+        elif pi.SYMBOL_COLUMN in columns:
+            lf = lf.filter(pl.col(pi.DATE_COLUMN) == pl.col(pi.DATE_COLUMN).max().over(pi.SYMBOL_COLUMN))
+        else:
+            lf = lf.filter(pl.col(pi.DATE_COLUMN) == pl.col(pi.DATE_COLUMN).max())
+        #the last bars are ranked together whatever their dates
+        group = "__latest"
+        lf = lf.with_columns(pl.lit(0, pl.UInt8).alias(group))
+    lf = lf.filter(pl.col(column).is_not_null())
+    #the n-th value of each date. top_k selects without sorting the date
+    if largest:
+        passes = pl.col(column) >= pl.col(column).top_k(n).min().over(group)
+    else:
+        passes = pl.col(column) <= pl.col(column).bottom_k(n).max().over(group)
+    lf = lf.filter(passes).with_row_count("__row").sort([group, column, "__row"], descending=[False, largest, False])
+    lf = lf.groupby(group, maintain_order=True).head(n).drop("__row").with_columns(
+        (pl.col(group).cumcount().over(group) + 1).cast(pl.UInt32).alias(RANK_COLUMN)).select(columns + [RANK_COLUMN])
+    return lf.collect() if isinstance(df, pl.DataFrame) else lf
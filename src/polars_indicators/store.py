@@ -0,0 +1,72 @@
+"""
+Partitioned Parquet store of price bars
+Bars are written one file per symbol and year so a scan only opens the files for the symbols and years it needs
+    root/<symbol>/<year>.parquet
+Within a file the Date statistics of each row group let polars skip the row groups outside a date range
+and only the columns the plan uses are read
+Files are listed in symbol then year order so the rows of each symbol are contiguous and sorted by date like the indicators expect
+"""
+
+from datetime import date, datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
+import polars as pl
+import polars_indicators as pi
+
+
+YEAR = "year"
+
+
+def write_prices(df: pl.DataFrame | pl.LazyFrame, root: str | Path) -> list[Path]:
+    """writes the bars of df to the store at root and returns the paths written
+    Each symbol and year of df replaces the file already in the store for that symbol and year"""
+    df = df.lazy().with_columns(pl.col(pi.DATE_COLUMN).dt.year().alias(YEAR)).sort([pi.SYMBOL_COLUMN, pi.DATE_COLUMN]).collect()
+    paths = []
+    for (symbol, year), part in df.partition_by([pi.SYMBOL_COLUMN, YEAR], as_dict=True).items():
+        path = _path(root, symbol, year)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part.drop(YEAR).write_parquet(path, statistics=True)
+        paths.append(path)
+    return paths
+
+
+def list_symbols(root: str | Path) -> list[str]:
+    """symbols in the store at root"""
+    return sorted(unquote(path.name) for path in Path(root).iterdir() if path.is_dir())
+
+
+def scan_prices(root: str | Path, symbols: list[str] | None=None, start: date | datetime | None=None, end: date | datetime | None=None,
+                columns: list[str] | None=None) -> pl.LazyFrame:
+    """LazyFrame of the bars in the store at root for symbols from start to end inclusive
+    symbols defaults to every symbol and start and end default to all of the data
+    columns limits the columns read. Symbol and Date are always included"""
+    paths = _paths(root, symbols, start.year if start is not None else None, end.year if end is not None else None)
+    if not paths:
+        raise FileNotFoundError(f"no prices in {root} for the symbols and dates given")
+
+    lf = pl.concat([pl.scan_parquet(path) for path in paths], rechunk=False)
+    if columns is not None:
+        lf = lf.select([pi.SYMBOL_COLUMN, pi.DATE_COLUMN] + [column for column in columns if column not in (pi.SYMBOL_COLUMN, pi.DATE_COLUMN)])
+    if start is not None:
+        lf = lf.filter(pl.col(pi.DATE_COLUMN) >= start)
+    if end is not None:
+        lf = lf.filter(pl.col(pi.DATE_COLUMN) <= end)
+    return lf
+
+
+def _path(root: str | Path, symbol: str, year: int) -> Path:
+    """file for the bars of symbol in year. Symbols are quoted so they are always one valid directory name"""
+    return Path(root) / quote(symbol, safe="") / f"{year}.parquet"
+
+
+def _paths(root: str | Path, symbols: list[str] | None, first_year: int | None, last_year: int | None) -> list[Path]:
+    """files for the symbols between the years in symbol then year order"""
+    paths = []
+    for symbol in sorted(symbols) if symbols is not None else list_symbols(root):
+        directory = Path(root) / quote(symbol, safe="")
+        if not directory.is_dir():
+            continue
+        years = sorted(int(path.stem) for path in directory.glob("*.parquet"))
+        paths.extend(_path(root, symbol, year) for year in years
+                     if (first_year is None or year >= first_year) and (last_year is None or year <= last_year))
+    return paths
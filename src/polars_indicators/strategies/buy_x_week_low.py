@@ -1,38 +1,149 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import timedelta
+from typing import Literal
+import itertools
+import multiprocessing
+import os
 import polars as pl
 import polars_indicators as pi
 from polars_indicators import IndicatorResult
+from polars_indicators.exits import END_OF_DATA, trade_exits
 
-def strategy(df: pl.DataFrame | pl.LazyFrame, lookback: timedelta) -> IndicatorResult:
+def entries(df: pl.DataFrame | pl.LazyFrame, lookback: timedelta) -> IndicatorResult:
+    """adds the entries of the strategy. The lookback low of each symbol wherever a bar trades at it
+    this will filter out all data from before we have a full min from the lookback period"""
+    weeks_min = f"{lookback}_week_min"
+    #rolling by a duration needs a Datetime column. compact() leaves Date as Date
+    by = pi.DATE_COLUMN
+    if df.schema[pi.DATE_COLUMN] == pl.Date:
+        by = "__datetime"
+        df = df.with_columns(pl.col(pi.DATE_COLUMN).cast(pl.Datetime).alias(by))
+    df = df.with_columns(pl.col("Low").rolling_min(lookback, by=by).over(pi.SYMBOL_COLUMN).alias(weeks_min))
+    if by != pi.DATE_COLUMN:
+        df = df.drop(by)
+    #this filters out data that doesn't have the full lookback. An expression so LazyFrames in a Pipeline can use it
+    df = df.filter(pl.col(pi.DATE_COLUMN) > pl.col(pi.DATE_COLUMN).min() + lookback)
+    #the first bars of every symbol are gone so the index of a prepared frame has to be renumbered
+    df = pi._reindex(df)
+
+    return pi.targeted_value(df, weeks_min)
+
+def strategy(df: pl.DataFrame | pl.LazyFrame, lookback: timedelta, percentage: float | None=-5, trailing_bars: int | None=2) -> IndicatorResult:
     """generates trades on input df
     this will filter out all data from before we have a full min from the lookback period
     lookback is a string like 52w for 52 weeks
-    see polars 'rolling_' documentation for all options"""
+    see polars 'rolling_' documentation for all options
+    percentage is the stop below the entry price and trailing_bars the bars of the trailing stop. None leaves either out"""
+    target = entries(df, lookback)
+    enter_column = target.column
 
-    weeks_min = f"{lookback}_week_min"
-    df = df.with_columns(pl.col("Low").rolling_min(lookback, by=pi.DATE_COLUMN).over(pi.SYMBOL_COLUMN).alias(weeks_min))
-    filter_datetime = df[pi.DATE_COLUMN].min() + lookback
-    df = df.filter(pl.col(pi.DATE_COLUMN) > filter_datetime) #this filters out data that doesn't have the full lookback
+    trades = trade_exits(target.df, enter_column, percentage=percentage, trailing_bars=trailing_bars)
+    exit_price, _, trade_id = trades.columns
 
-    target = pi.targeted_value(df, weeks_min)
-    enter_column = target.column
-    df = target.df
-    
-    percentage = -5
-    percentage_stop = pi.entry_percentage_stop(df, percentage, target.column)
-    df = percentage_stop.df
+    exit_column = "exit_column"
+    column_name = f"{enter_column}/{exit_column}"
+    df = trades.df.rename({exit_price: exit_column, trade_id: column_name})
 
-    trail = pi.trailing_stop(df, bars=2) #magic number should be parameter
+    return IndicatorResult(df, column_name)
 
-    eod = pi.end_of_data_stop(trail.df)
-    df = eod.df
+def grid(df: pl.DataFrame, lookbacks: list[timedelta], percentages: list[float | None], trailing_bars: list[int | None],
+         workers: int | None=None, executor: Literal["thread", "process"]="thread") -> pl.DataFrame:
+    """runs the strategy for every combination of the parameters and returns one row per combination
+    with its Trades, Win_Rate as the fraction of trades that gained and Mean_Gain% over its trades
+    The entries are computed once per lookback and the trailing stops once per lookback and bars
+    then the exits of every percentage and trailing_bars are split over a pool of workers like parallel.run_partitioned"""
+    workers = workers or os.cpu_count() or 1
+    combinations = list(itertools.product(percentages, trailing_bars))
+    #every worker gets a share of the combinations of each lookback so the frame is only sent once per worker
+    chunk = -(-len(combinations) // workers)
+    chunks = [combinations[start:start + chunk] for start in range(0, len(combinations), chunk)]
+    pool: Executor | None = None
+    if workers > 1 and len(chunks) > 1:
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) if executor == "process" else ThreadPoolExecutor(workers)
 
-    #clear out trailing stop values on entry columns since that's handled by percentage stop
-    df = df.with_columns(pl.when(pl.col(enter_column).is_not_null()).then(pl.lit(None)).otherwise(pl.col(trail.column)).alias(trail.column))
+    results = []
+    try:
+        #one lookback at a time so only one shared frame is in memory
+        for lookback in lookbacks:
+            target = entries(df, lookback)
+            shared = target.df.lazy()
+            for bars in dict.fromkeys(trailing_bars):
+                if bars is not None:
+                    shared = pi.trailing_stop(shared, bars).df
+            shared = shared.collect()
+            if pool is None:
+                results.extend(_run_exits(lookback, shared, target.column, part) for part in chunks)
+            else:
+                results.extend(pool.map(_run_exits, [lookback] * len(chunks), [shared] * len(chunks), [target.column] * len(chunks), chunks))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return pl.concat(results)
 
-    exit_column = "exit_column"
-    df = df.with_columns(pl.coalesce(pl.col(percentage_stop.column),pl.col(trail.column), pl.col(eod.column)).alias(exit_column))
+def _run_exits(lookback: timedelta, df: pl.DataFrame, enter_column: str, combinations: list[tuple[float | None, int | None]],
+               closed_only: bool=False) -> pl.DataFrame:
+    """summary row of the trades of each combination of percentage and trailing_bars on the entries in df
+    closed_only leaves out the trades the end of df cut off. trade_exits closes them at the last close with reason end_of_data"""
+    rows = []
+    for percentage, bars in combinations:
+        trades = trade_exits(df, enter_column, percentage=percentage, trailing_bars=bars)
+        exit_price, reason, trade_id = trades.columns
+        summary = pi.summarize_trades(trades.df, trade_id, enter_column, exit_price)
+        if closed_only:
+            cut_off = trades.df.filter(pl.col(reason) == END_OF_DATA)[trade_id]
+            summary = summary.filter(~pl.col(trade_id).is_in(cut_off))
+        gain = (pl.col("Exit_Price") - pl.col("Entry_Price")) / pl.col("Entry_Price") * 100
+        rows.append(summary.select(
+            pl.lit(lookback).alias("Lookback"),
+            pl.lit(percentage, pl.Float64).alias("Percentage"),
+            pl.lit(bars, pl.Int64).alias("Trailing_Bars"),
+            pl.count().cast(pl.UInt32).alias("Trades"),
+            (gain > 0).mean().alias("Win_Rate"),
+            gain.mean().alias("Mean_Gain%"),
+        ))
+    return pl.concat(rows)
+
+def walk_forward(df: pl.DataFrame, lookbacks: list[timedelta], percentages: list[float | None], trailing_bars: list[int | None],
+                 in_sample: timedelta, out_of_sample: timedelta, metric: str="Mean_Gain%") -> pl.DataFrame:
+    """picks the parameters with the best metric of the grid in every in-sample window and runs them on the out-of-sample window after it
+    The windows step by out_of_sample from the first date the longest lookback has a full low
+    returns a row per window with its dates, the parameters and the Trades, Win_Rate and Mean_Gain% of both samples
+    The entries and trailing stops only depend on bars before them so they're computed once on the whole history
+    and every window is a date filter of them. Only the exits are rerun per window
+    Trades still open at the end of a window are left out of both samples' stats. Their exit would be the window's last close
+    metric is Trades, Win_Rate or Mean_Gain%. Windows where no combination has one are left out"""
+    combinations = list(itertools.product(percentages, trailing_bars))
+    windows = []
+    start = df[pi.DATE_COLUMN].min() + max(lookbacks)
+    last = df[pi.DATE_COLUMN].max()
+    while start + in_sample <= last:
+        windows.append((start, start + in_sample, start + in_sample + out_of_sample))
+        start += out_of_sample
+
+    samples = []
+    #one lookback at a time so only one shared frame is in memory like grid
+    for index, lookback in enumerate(lookbacks):
+        target = entries(df, lookback)
+        shared = target.df.lazy()
+        for bars in dict.fromkeys(trailing_bars):
+            if bars is not None:
+                shared = pi.trailing_stop(shared, bars).df
+        shared = shared.collect()
+        for window, (start, split, end) in enumerate(windows):
+            for sample, first, after in (("In_Sample", start, split), ("Out_Of_Sample", split, end)):
+                part = pi._reindex(shared.filter((pl.col(pi.DATE_COLUMN) >= first) & (pl.col(pi.DATE_COLUMN) < after)))
+                samples.append(_run_exits(lookback, part, target.column, combinations, closed_only=True).with_row_count("__combination").with_columns(
+                    pl.lit(index).alias("__lookback"), pl.lit(window).alias("Window"), pl.lit(sample).alias("Sample")))
+    if not samples:
+        raise ValueError("the history is shorter than the longest lookback and in_sample")
+    results = pl.concat(samples)
 
-    return pi.create_trade_ids(df, enter_column, exit_column)
-    
-        
\ No newline at end of file
+    stats = ["Trades", "Win_Rate", "Mean_Gain%"]
+    keys = ["Window", "__lookback", "__combination"]
+    best = results.filter((pl.col("Sample") == "In_Sample") & pl.col(metric).is_not_null()).sort(
+        [metric, "__lookback", "__combination"], descending=[True, False, False]).groupby("Window").first()
+    out = results.filter(pl.col("Sample") == "Out_Of_Sample").select(keys + [pl.col(stat).alias(f"Out_Of_Sample_{stat}") for stat in stats])
+    dates = pl.DataFrame(windows, schema=["In_Sample_Start", "Out_Of_Sample_Start", "Out_Of_Sample_End"]).with_row_count("Window").with_columns(pl.col("Window").cast(pl.Int32))
+    return dates.join(
+        best.select(keys + ["Lookback", "Percentage", "Trailing_Bars"] + [pl.col(stat).alias(f"In_Sample_{stat}") for stat in stats]), on="Window"
+    ).join(out, on=keys).drop(["__lookback", "__combination"]).sort("Window")
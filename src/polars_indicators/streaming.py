@@ -0,0 +1,84 @@
+"""
+Runs indicators on data that doesn't fit in memory
+    out = streaming.sink(pl.scan_parquet('prices/*.parquet'), add_indicators, 'indicators')
+    summary = pi.summarize_trades(out, ...).collect(streaming=True)
+The polars streaming engine only runs plans whose expressions work on one row at a time or aggregate
+    windows, shifts, cumulative sums and when/then aren't supported by it in polars 0.17 so most indicators can't stream
+    summarize_trades, targeted_value style comparisons, filters and projections do
+sink runs a plan under the streaming engine when it can
+    otherwise it falls back to running the function on batches of whole symbols read from the source one batch at a time
+    so only one batch of symbols is in memory. Every batch is written to its own Parquet file
+    a price store root as the source reads only the files of each batch
+    polars 0.17 can't skip Parquet row groups on a Symbol filter so a LazyFrame source is read once per batch
+The function must only depend on the rows of each symbol like with parallel.run_partitioned
+"""
+
+from pathlib import Path
+from typing import Callable
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import store
+from polars_indicators.parallel import BatchResult, _run_batch
+
+
+def streamable(lf: pl.LazyFrame) -> bool:
+    """True if the streaming engine runs the whole plan of lf"""
+    plan = lf.explain(streaming=True, common_subplan_elimination=False)
+    return plan.lstrip().startswith("--- PIPELINE")
+
+
+def sink(source: pl.LazyFrame | str | Path, function: Callable[[pl.LazyFrame], BatchResult], directory: str | Path,
+         symbols_per_batch: int=500, id_columns: list[str] | None=None) -> pl.LazyFrame:
+    """writes function of the bars in source to Parquet files in directory and returns a scan of them
+    source is a LazyFrame or the root of a price store
+    Plans the streaming engine can run are written by it in one pass
+    others run on batches of symbols_per_batch symbols in symbol order. id_columns are offset like in run_partitioned
+    Rows of each symbol must be in date order in the source"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for old in directory.glob("part-*.parquet"):
+        old.unlink()
+
+    lf = source if isinstance(source, pl.LazyFrame) else store.scan_prices(source)
+    planned = function(lf)
+    planned = planned.df if isinstance(planned, (pi.IndicatorResult, pi.IndicatorsResult)) else planned
+    if isinstance(planned, pl.LazyFrame) and streamable(planned):
+        planned.sink_parquet(directory / _part(0))
+        return pl.scan_parquet(directory / "part-*.parquet")
+
+    offsets = {column: 0 for column in id_columns or []}
+    batches = _symbol_ranges(lf, symbols_per_batch) if isinstance(source, pl.LazyFrame) else _store_batches(source, symbols_per_batch)
+    for i, batch in enumerate(batches):
+        result = _run_batch(function, batch)
+        for column in offsets:
+            result = result.with_columns(pl.col(column) + offsets[column])
+            offsets[column] = result[column].max() or offsets[column]
+        result.write_parquet(directory / _part(i))
+    return pl.scan_parquet(directory / "part-*.parquet")
+
+
+def _symbol_ranges(lf: pl.LazyFrame, symbols_per_batch: int) -> list[pl.LazyFrame]:
+    """lf filtered to consecutive runs of symbols_per_batch symbols
+    Utf8 symbols are filtered on a range so Parquet sources skip the row groups outside it"""
+    if pi.SYMBOL_COLUMN not in lf.columns:
+        return [lf]
+    symbols = lf.select(pi.SYMBOL_COLUMN).unique().collect(streaming=True).to_series().sort()
+    batches = []
+    for start in range(0, len(symbols), symbols_per_batch):
+        batch = symbols.slice(start, symbols_per_batch)
+        symbol = pl.col(pi.SYMBOL_COLUMN)
+        if symbols.dtype == pl.Utf8:
+            batches.append(lf.filter((symbol >= batch[0]) & (symbol <= batch[-1])))
+        else:
+            batches.append(lf.filter(symbol.is_in(batch)))
+    return batches
+
+
+def _store_batches(root: str | Path, symbols_per_batch: int) -> list[pl.LazyFrame]:
+    """scans of the store at root for consecutive runs of symbols_per_batch symbols"""
+    symbols = sorted(store.list_symbols(root))
+    return [store.scan_prices(root, symbols[start:start + symbols_per_batch]) for start in range(0, len(symbols), symbols_per_batch)]
+
+
+def _part(i: int) -> str:
+    return f"part-{i:05d}.parquet"
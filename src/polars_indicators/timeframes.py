@@ -0,0 +1,52 @@
+"""
+Indicators on weekly or monthly bars next to daily ones
+    weekly = timeframes.resample(df, '1w')
+    ret = timeframes.higher_timeframe(df, lambda bars: pi.simple_moving_average(bars, 20), '1w')
+    ret.df has SMA20_1w on every daily bar
+resample aggregates the bars of each symbol with groupby_dynamic. Weeks start on Monday and months on the 1st
+    the Date of a resampled bar is the date of its last bar so it's the first date the whole bar is known
+higher_timeframe runs the indicator on the resampled bars and join_asofs its columns back onto the bars of df
+    every bar gets the values of the last resampled bar that ended on or before it so nothing is seen early
+    a week's values reach its last day and stay until the next week ends
+    the indicator only sees the resampled frame which is about a fifth of the rows for weeks and a twentieth for months
+Rows of each symbol must be in date order
+"""
+
+from typing import Callable
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import IndicatorResult, IndicatorsResult
+
+
+def resample(df: pl.DataFrame | pl.LazyFrame, every: str="1w") -> pl.DataFrame | pl.LazyFrame:
+    """OHLC bars of each symbol over every like '1w' or '1mo'. Volume is summed when there is one
+    other columns are left out"""
+    by = pi.SYMBOL_COLUMN if pi.SYMBOL_COLUMN in df.columns else None
+    aggregations = [
+        pl.col(pi.DATE_COLUMN).last().alias("__end"),
+        pl.col(pi.OPEN_COLUMN).first(),
+        pl.col(pi.HIGH_COLUMN).max(),
+        pl.col(pi.LOW_COLUMN).min(),
+        pl.col(pi.CLOSE_COLUMN).last(),
+    ]
+    if pi.VOLUMNE_COLUMN in df.columns:
+        aggregations.append(pl.col(pi.VOLUMNE_COLUMN).sum())
+    #groupby_dynamic labels a bar with the start of its window. It's replaced by the last date in it
+    bars = df.groupby_dynamic(pi.DATE_COLUMN, every=every, by=by).agg(aggregations)
+    return bars.drop(pi.DATE_COLUMN).rename({"__end": pi.DATE_COLUMN}).select(
+        ([by] if by else []) + [pi.DATE_COLUMN] + [aggregation.meta.output_name() for aggregation in aggregations[1:]])
+
+
+def higher_timeframe(df: pl.DataFrame | pl.LazyFrame, indicator: Callable[[pl.DataFrame | pl.LazyFrame], IndicatorResult | IndicatorsResult],
+                     every: str="1w") -> IndicatorsResult:
+    """adds the columns indicator adds to the bars resampled to every. They're named with _every after them like SMA20_1w"""
+    result = indicator(resample(df, every))
+    columns = [result.column] if isinstance(result, IndicatorResult) else result.columns
+    column_names = [f"{column}_{every}" for column in columns]
+    if all(column_name in df.columns for column_name in column_names):
+        return IndicatorsResult(df, column_names)
+
+    by = [pi.SYMBOL_COLUMN] if pi.SYMBOL_COLUMN in df.columns else []
+    higher = result.df.select(by + [pi.DATE_COLUMN] + [pl.col(column).alias(column_name) for column, column_name in zip(columns, column_names)])
+    df = df.join_asof(higher, on=pi.DATE_COLUMN, by=by or None, strategy="backward")
+    return IndicatorsResult(df, column_names)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Tests for the buy_x_week_low strategy and its parameter grid
+
+"""
+import unittest
+from datetime import datetime, timedelta
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators.exits import trade_exits
+from polars_indicators.strategies import buy_x_week_low
+from test_parallel import get_trading_test_df
+from test_indicators import get_random_walk_df
+
+
+def summarize(df: pl.DataFrame, lookback: timedelta, percentage: float | None, trailing_bars: int | None) -> dict:
+    """the grid row of one strategy run worked out from summarize_trades"""
+    ret = buy_x_week_low.strategy(df, lookback, percentage, trailing_bars)
+    trades = pi.summarize_trades(ret.df, ret.column, f"{lookback}_week_min_targets", "exit_column")
+    gains = ((trades["Exit_Price"] - trades["Entry_Price"]) / trades["Entry_Price"] * 100).to_list()
+    return {
+        "Lookback": lookback,
+        "Percentage": percentage,
+        "Trailing_Bars": trailing_bars,
+        "Trades": len(gains),
+        "Win_Rate": sum(gain > 0 for gain in gains) / len(gains),
+        "Mean_Gain%": sum(gains) / len(gains),
+    }
+
+
+class TestBuyXWeekLow(unittest.TestCase):
+
+    def test_default_parameters(self):
+        """the stop and trailing stop default to the numbers the strategy always used"""
+        df = get_trading_test_df()
+        expected = buy_x_week_low.strategy(df, timedelta(days=14))
+        ret = buy_x_week_low.strategy(df, timedelta(days=14), percentage=-5, trailing_bars=2)
+        testing.assert_frame_equal(ret.df, expected.df)
+        self.assertNotEqual(buy_x_week_low.strategy(df, timedelta(days=14), trailing_bars=None).df[ret.column].max(), expected.df[ret.column].max())
+
+    def test_prepared(self):
+        """the lookback filter and the window filters renumber the index of prepare so the trades match an unprepared frame"""
+        df = get_random_walk_df([f"S{i:02}" for i in range(30)], 120, seed=5).with_columns(pl.col("Date").cast(pl.Datetime))
+        prepared = pi.prepare(df)
+        expected = buy_x_week_low.strategy(df, timedelta(weeks=4))
+        ret = buy_x_week_low.strategy(prepared, timedelta(weeks=4))
+        testing.assert_frame_equal(ret.df.select(expected.df.columns), expected.df)
+
+        args = ([timedelta(weeks=2), timedelta(weeks=4)], [-5, None], [2, None], timedelta(days=28), timedelta(days=14))
+        testing.assert_frame_equal(buy_x_week_low.walk_forward(prepared, *args), buy_x_week_low.walk_forward(df, *args))
+
+    def test_grid(self):
+        """every row of the grid matches running the strategy with its parameters"""
+        df = get_trading_test_df()
+        lookbacks = [timedelta(days=7), timedelta(days=14)]
+        percentages = [-5, -2, None]
+        trailing_bars = [2, 3, None]
+        result = buy_x_week_low.grid(df, lookbacks, percentages, trailing_bars, workers=1)
+        self.assertEqual(result.columns, ["Lookback", "Percentage", "Trailing_Bars", "Trades", "Win_Rate", "Mean_Gain%"])
+        self.assertEqual(len(result), 18)
+
+        expected = [summarize(df, lookback, percentage, bars) for lookback in lookbacks for percentage in percentages for bars in trailing_bars]
+        for row, expected_row in zip(result.to_dicts(), expected):
+            self.assertEqual({key: row[key] for key in ["Lookback", "Percentage", "Trailing_Bars", "Trades"]},
+                             {key: expected_row[key] for key in ["Lookback", "Percentage", "Trailing_Bars", "Trades"]})
+            self.assertAlmostEqual(row["Win_Rate"], expected_row["Win_Rate"])
+            self.assertAlmostEqual(row["Mean_Gain%"], expected_row["Mean_Gain%"])
+
+        #the workers split the combinations but the rows stay in order
+        for executor in ["thread", "process"]:
+            testing.assert_frame_equal(buy_x_week_low.grid(df, lookbacks, percentages, trailing_bars, workers=4, executor=executor), result)
+
+    def test_walk_forward(self):
+        """every window picks the best in-sample row of the exits on the entries of the whole history and runs it out of sample"""
+        df = get_trading_test_df()
+        lookbacks = [timedelta(days=7), timedelta(days=14)]
+        percentages = [-5, None]
+        trailing_bars = [2, None]
+        result = buy_x_week_low.walk_forward(df, lookbacks, percentages, trailing_bars, timedelta(days=14), timedelta(days=7))
+        self.assertEqual(result["In_Sample_Start"].to_list()[:2], [datetime(2023, 1, 16), datetime(2023, 1, 23)])
+        testing.assert_series_equal(result["Out_Of_Sample_Start"], result["In_Sample_Start"] + timedelta(days=14), check_names=False)
+
+        def sample(lookback, percentage, bars, first, after) -> dict:
+            target = buy_x_week_low.entries(df, lookback)
+            full = pi.trailing_stop(target.df, bars).df if bars is not None else target.df
+            part = full.filter((pl.col("Date") >= first) & (pl.col("Date") < after))
+            trades = trade_exits(part, target.column, percentage=percentage, trailing_bars=bars)
+            exit_price, reason, trade_id = trades.columns
+            summary = pi.summarize_trades(trades.df, trade_id, target.column, exit_price)
+            cut_off = trades.df.filter(pl.col(reason) == "end_of_data")[trade_id]
+            summary = summary.filter(~pl.col(trade_id).is_in(cut_off))
+            gains = ((summary["Exit_Price"] - summary["Entry_Price"]) / summary["Entry_Price"] * 100).drop_nulls()
+            return {"Trades": len(summary), "Mean_Gain%": gains.mean()}
+
+        for row in result.to_dicts():
+            in_sample = [sample(lookback, percentage, bars, row["In_Sample_Start"], row["Out_Of_Sample_Start"])
+                         for lookback in lookbacks for percentage in percentages for bars in trailing_bars]
+            self.assertAlmostEqual(row["In_Sample_Mean_Gain%"], max(gains["Mean_Gain%"] for gains in in_sample if gains["Mean_Gain%"] is not None))
+            out_of_sample = sample(row["Lookback"], row["Percentage"], row["Trailing_Bars"], row["Out_Of_Sample_Start"], row["Out_Of_Sample_End"])
+            self.assertEqual(row["Out_Of_Sample_Trades"], out_of_sample["Trades"])
+            self.assertAlmostEqual(row["Out_Of_Sample_Mean_Gain%"], out_of_sample["Mean_Gain%"])
+
+    def test_walk_forward_leaves_out_cut_off_trades(self):
+        """a trade still open at the end of a window isn't counted in its stats"""
+        df = get_trading_test_df()
+        lookback = timedelta(days=7)
+        result = buy_x_week_low.walk_forward(df, [lookback], [-5], [2], timedelta(days=14), timedelta(days=7))
+        target = buy_x_week_low.entries(df, lookback)
+        full = pi.trailing_stop(target.df, 2).df
+        cut_off = 0
+        for row in result.to_dicts():
+            part = full.filter((pl.col("Date") >= row["Out_Of_Sample_Start"]) & (pl.col("Date") < row["Out_Of_Sample_End"]))
+            trades = trade_exits(part, target.column, percentage=-5, trailing_bars=2)
+            exit_price, reason, trade_id = trades.columns
+            reasons = trades.df.filter(pl.col(reason).is_not_null())[reason]
+            cut_off += (reasons == "end_of_data").sum()
+            self.assertEqual(row["Out_Of_Sample_Trades"], (reasons != "end_of_data").sum())
+        self.assertGreater(cut_off, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Tests for the indicator cache
+
+"""
+import os
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators.cache import IndicatorCache
+from polars_indicators.pipeline import Pipeline
+from polars_indicators.strategies import buy_x_week_low
+from test_indicators import get_multi_symbol_test_df
+from test_parallel import get_trading_test_df
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = IndicatorCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_hit_matches_miss(self):
+        df = get_multi_symbol_test_df()
+        expected = pi.simple_moving_average(df, 3)
+
+        miss = self.cache.run(pi.simple_moving_average, df, days=3)
+        hit = self.cache.run(pi.simple_moving_average, df, days=3)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(hit.column, expected.column)
+        testing.assert_frame_equal(miss.df, expected.df)
+        testing.assert_frame_equal(hit.df, expected.df)
+
+        #lazy input is returned lazy
+        lazy = self.cache.run(pi.simple_moving_average, df.lazy(), days=3)
+        self.assertIsInstance(lazy.df, pl.LazyFrame)
+        testing.assert_frame_equal(lazy.df.collect(), expected.df)
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_key_changes(self):
+        """other parameters, functions or data miss"""
+        df = get_multi_symbol_test_df()
+        self.cache.run(pi.simple_moving_average, df, days=3)
+        self.cache.run(pi.simple_moving_average, df, days=4)
+        self.cache.run(pi.trailing_stop, df, bars=3)
+        self.cache.run(pi.simple_moving_average, df.with_columns(pl.col(pi.CLOSE_COLUMN) + 1), days=3)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 4))
+
+        first = Pipeline().add(pi.simple_moving_average, days=2)
+        second = Pipeline().add(pi.simple_moving_average, days=3)
+        self.assertNotEqual(self.cache.key(first.run, df), self.cache.key(second.run, df))
+        self.assertEqual(self.cache.key(first.run, df), self.cache.key(Pipeline().add(pi.simple_moving_average, days=2).run, df))
+
+    def test_lambdas_and_closures(self):
+        """functions that share a name are told apart by their code and the values they captured"""
+        df = get_multi_symbol_test_df()
+
+        def make(days: int):
+            return lambda frame: pi.simple_moving_average(frame, days)
+        self.assertEqual(self.cache.run(make(2), df).column, 'SMA2')
+        self.assertEqual(self.cache.run(make(5), df).column, 'SMA5')
+        self.assertEqual(self.cache.run(make(2), df).column, 'SMA2')
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+        first, second = (lambda frame: pi.simple_moving_average(frame, 2)), (lambda frame: pi.trailing_stop(frame, 2))
+        self.assertNotEqual(self.cache.key(first, df), self.cache.key(second, df))
+
+        def average(frame, days=2):
+            return pi.simple_moving_average(frame, days)
+        key = self.cache.key(average, df)
+        average.__defaults__ = (3,)
+        self.assertNotEqual(self.cache.key(average, df), key)
+
+    def test_strategy_skips_recomputation(self):
+        """a rerun of the strategy on unchanged data doesn't call it and matches the first run even though it drops rows"""
+        df = get_trading_test_df()
+        #the calls are kept on the function since the values a closure captures are part of the key
+        def strategy(df: pl.DataFrame, lookback: timedelta) -> pi.IndicatorResult:
+            strategy.calls.append(lookback)
+            return buy_x_week_low.strategy(df, lookback)
+        strategy.calls = []
+
+        cached = self.cache.wrap(strategy)
+        first = cached(df, timedelta(days=14))
+        second = cached(df, timedelta(days=14))
+        self.assertEqual(len(strategy.calls), 1)
+        self.assertEqual(second.column, first.column)
+        testing.assert_frame_equal(second.df, buy_x_week_low.strategy(df, timedelta(days=14)).df)
+
+    def test_least_recently_used_evicted(self):
+        df = get_multi_symbol_test_df()
+        self.cache.run(pi.simple_moving_average, df, days=2)
+        entry_size = self.cache.size()
+        self.cache.max_bytes = int(entry_size * 2.5)
+
+        self.cache.run(pi.simple_moving_average, df, days=3)
+        time.sleep(0.01)
+        #using days=2 again makes days=3 the least recently used
+        self.cache.run(pi.simple_moving_average, df, days=2)
+        time.sleep(0.01)
+        self.cache.run(pi.simple_moving_average, df, days=4)
+        self.assertLessEqual(self.cache.size(), self.cache.max_bytes)
+
+        hits = self.cache.hits
+        self.cache.run(pi.simple_moving_average, df, days=2)
+        self.cache.run(pi.simple_moving_average, df, days=4)
+        self.assertEqual(self.cache.hits, hits + 2)
+        self.cache.run(pi.simple_moving_average, df, days=3)
+        self.assertEqual(self.cache.hits, hits + 2)
+
+    def test_dropped_rows_require_date(self):
+        df = get_multi_symbol_test_df().drop(pi.DATE_COLUMN)
+        testing.assert_frame_equal(self.cache.run(pi.simple_moving_average, df, days=3).df, pi.simple_moving_average(df, 3).df)
+
+        def first_rows(df: pl.DataFrame) -> pi.IndicatorResult:
+            return pi.simple_moving_average(df.head(3), 2)
+        with self.assertRaises(ValueError):
+            self.cache.run(first_rows, df)
+
+
+if __name__ == '__main__':
+    unittest.main()
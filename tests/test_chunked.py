@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Tests for running a pipeline in windows of dates
+
+"""
+import tempfile
+import unittest
+from datetime import timedelta
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import chunked, exits, store
+from polars_indicators.pipeline import Pipeline
+from polars_indicators.strategies import buy_x_week_low
+from test_parallel import get_trading_test_df
+
+TRADE_ID = 'SMA5_targets/3_bar_trailing_stop'
+
+
+def get_test_pipeline() -> Pipeline:
+    return Pipeline() \
+        .add(pi.simple_moving_average, days=5) \
+        .add(pi.trailing_stop, bars=3) \
+        .add(pi.targeted_value, targets='SMA5') \
+        .add(pi.end_of_data_stop) \
+        .add(pi.create_trade_ids, enter_column='SMA5_targets', exit_column='3_bar_trailing_stop')
+
+
+def trade_starts(df: pl.DataFrame) -> pl.Series:
+    """where each trade starts so runs can be compared when their ids are numbered differently"""
+    return df.select((pl.col(TRADE_ID) != pl.col(TRADE_ID).shift(1)).fill_null(True) & pl.col(TRADE_ID).is_not_null()).to_series()
+
+
+class TestChunked(unittest.TestCase):
+
+    def test_single_symbol_matches(self):
+        """a single symbol in windows of a week matches one run exactly including trade ids"""
+        df = get_trading_test_df().filter(pl.col(pi.SYMBOL_COLUMN) == 'C').drop(pi.SYMBOL_COLUMN)
+        expected = get_test_pipeline().run(df)
+        results = list(chunked.run_chunked(df.lazy(), get_test_pipeline(), timedelta(weeks=1)))
+        self.assertEqual(len(results), 9)
+        self.assertEqual(results[0].columns, expected.columns)
+        testing.assert_frame_equal(pl.concat([result.df for result in results]), expected.df, rtol=1e-9)
+
+    def test_symbols_match(self):
+        """several symbols match one run up to the numbering of the trades and end_of_data_stop only marks the real ends"""
+        df = get_trading_test_df()
+        #a symbol that ends before the others
+        df = df.filter((pl.col(pi.SYMBOL_COLUMN) != 'B') | (pl.col(pi.DATE_COLUMN) < df[pi.DATE_COLUMN][30]))
+        expected = get_test_pipeline().run(df).df
+        result = pl.concat([chunk.df for chunk in chunked.run_chunked(df, get_test_pipeline(), '1w')]).sort([pi.SYMBOL_COLUMN, pi.DATE_COLUMN])
+        testing.assert_frame_equal(result.drop(TRADE_ID), expected.drop(TRADE_ID), rtol=1e-9)
+        testing.assert_series_equal(trade_starts(result), trade_starts(expected))
+        self.assertEqual(result['EOD_Stops'].is_not_null().sum(), 6)
+
+    def test_store_source(self):
+        """windows read from a price store match one run"""
+        df = get_trading_test_df()
+        expected = get_test_pipeline().run(df).df
+        with tempfile.TemporaryDirectory() as root:
+            store.write_prices(df, root)
+            result = pl.concat([chunk.df for chunk in chunked.run_chunked(root, get_test_pipeline(), '2w')]).sort([pi.SYMBOL_COLUMN, pi.DATE_COLUMN])
+        testing.assert_frame_equal(result.drop(TRADE_ID), expected.drop(TRADE_ID), rtol=1e-9)
+        testing.assert_series_equal(trade_starts(result), trade_starts(expected))
+
+    def test_limit_entries_and_exits(self):
+        """limit_entries and trade_exits carry their state across windows and trades stay open until the real end"""
+        pipeline = Pipeline() \
+            .add(pi.simple_moving_average, days=5) \
+            .add(pi.targeted_value, targets='SMA5') \
+            .add(pi.limit_entries, bars=3, entries='SMA5_targets') \
+            .add(exits.trade_exits, enter_column='3_minimum_bars_between', percentage=-3, trailing_bars=2, target_percentage=3)
+        df = get_trading_test_df()
+        expected = pipeline.run(df)
+        trade_id = expected.columns[-1]
+        result = pl.concat([chunk.df for chunk in chunked.run_chunked(df, pipeline, '1w')]).sort([pi.SYMBOL_COLUMN, pi.DATE_COLUMN])
+        testing.assert_frame_equal(result.drop(trade_id), expected.df.drop(trade_id), rtol=1e-9)
+        self.assertEqual(result[expected.columns[-2]].to_list().count('end_of_data'), expected.df[expected.columns[-2]].to_list().count('end_of_data'))
+
+        single = df.filter(pl.col(pi.SYMBOL_COLUMN) == 'C').drop(pi.SYMBOL_COLUMN)
+        results = [chunk.df for chunk in chunked.run_chunked(single.lazy(), pipeline, timedelta(weeks=1))]
+        testing.assert_frame_equal(pl.concat(results), pipeline.run(single).df, rtol=1e-9)
+
+    def test_duration_lookback(self):
+        """buy_x_week_low entries get the bars of their lookback before each window and leave out the start of the data once"""
+        lookback = timedelta(weeks=2)
+        pipeline = Pipeline() \
+            .add(buy_x_week_low.entries, lookback=lookback) \
+            .add(exits.trade_exits, enter_column=f'{lookback}_week_min_targets', percentage=-5, trailing_bars=2)
+        df = get_trading_test_df()
+        expected = pipeline.run(df)
+        trade_id = expected.columns[-1]
+        self.assertLess(len(expected.df), len(df))
+        for every in ['3d', '1w']:
+            result = pl.concat([chunk.df for chunk in chunked.run_chunked(df, pipeline, every)]).sort([pi.SYMBOL_COLUMN, pi.DATE_COLUMN])
+            testing.assert_frame_equal(result.drop(trade_id), expected.df.drop(trade_id), rtol=1e-9)
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            next(chunked.run_chunked(get_trading_test_df(), Pipeline().add(pi.exponential_moving_average, days=2), '1w'))
+
+
+if __name__ == '__main__':
+    unittest.main()
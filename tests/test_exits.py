@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""Tests for the exit engine
+
+"""
+import unittest
+import numpy as np
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import exits
+
+
+def get_exit_test_df() -> pl.DataFrame:
+    """two symbols of bars with entries at 10 on index 1, 4 and 12"""
+    return pl.DataFrame({
+        pi.SYMBOL_COLUMN: ['A'] * 10 + ['B'] * 5,
+        pi.OPEN_COLUMN:  [10., 10., 10., 10., 10., 10., 11., 12., 12., 10.,   10., 10., 10., 10., 10.],
+        pi.HIGH_COLUMN:  [11., 11., 11., 11., 11., 11., 13., 13., 13., 11.,   11., 11., 11., 11., 11.],
+        pi.LOW_COLUMN:   [9.,  9.,  9.6, 9.,  9.8, 9.5, 10., 11., 11., 9.,    9.,  9.,  9.,  9.6, 9.6],
+        pi.CLOSE_COLUMN: [10., 10., 10., 10., 10., 10., 12., 12., 12., 10.,   10., 10., 10., 10., 10.],
+        'enter':         [None, 10., None, None, 10., None, None, None, None, None,   None, None, 10., None, None],
+    })
+
+def get_random_exit_df(symbols: int, bars: int, seed: int) -> pl.DataFrame:
+    """random walk bars with entries at the close on about one bar in ten"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, symbols * bars)))
+    open = close * np.exp(rng.normal(0, 0.01, len(close)))
+    high = np.maximum(open, close) * np.exp(np.abs(rng.normal(0, 0.01, len(close))))
+    low = np.minimum(open, close) * np.exp(-np.abs(rng.normal(0, 0.01, len(close))))
+    return pl.DataFrame({
+        pi.SYMBOL_COLUMN: np.repeat([f"S{i}" for i in range(symbols)], bars),
+        pi.OPEN_COLUMN: open, pi.HIGH_COLUMN: high, pi.LOW_COLUMN: low, pi.CLOSE_COLUMN: close,
+        'enter': np.where(rng.random(len(close)) < 0.1, close, np.nan),
+    }).with_columns(pl.col('enter').fill_nan(None))
+
+def exits_reference(df: pl.DataFrame, enter_column: str, percentage: float | None=None, trailing_bars: int | None=None,
+                    time_bars: int | None=None, target_percentage: float | None=None) -> pl.DataFrame:
+    """frozen copy of the engine that walked one trade at a time before the exits were vectorized
+    kept to check the current version against on random data"""
+    n = len(df)
+    inputs = df.select(
+        pl.col(enter_column).is_not_null().alias("is_entry"),
+        pl.col(enter_column).cast(pl.Float64).fill_null(np.nan),
+        pl.col(pi.OPEN_COLUMN).cast(pl.Float64),
+        pl.col(pi.HIGH_COLUMN).cast(pl.Float64),
+        pl.col(pi.LOW_COLUMN).cast(pl.Float64),
+        pl.col(pi.CLOSE_COLUMN).cast(pl.Float64),
+        (pl.col(pi.SYMBOL_COLUMN) != pl.col(pi.SYMBOL_COLUMN).shift(-1)).fill_null(True).alias("is_last"),
+        pi._trailing_stop_expr(trailing_bars, pi.SYMBOL_COLUMN).fill_null(np.nan).alias("trailing") if trailing_bars is not None else pl.lit(np.nan).alias("trailing"),
+    )
+
+    entries = np.flatnonzero(inputs["is_entry"].to_numpy())
+    entry_prices = inputs[enter_column].to_numpy()
+    opens = inputs[pi.OPEN_COLUMN].to_numpy()
+    highs = inputs[pi.HIGH_COLUMN].to_numpy()
+    lows = inputs[pi.LOW_COLUMN].to_numpy()
+    closes = inputs[pi.CLOSE_COLUMN].to_numpy()
+    trailing = inputs["trailing"].to_numpy()
+    symbol_ends = np.flatnonzero(inputs["is_last"].to_numpy())
+    trailing_hits = np.flatnonzero(~np.isnan(trailing))
+
+    trade_ids = [None] * n
+    prices = [None] * n
+    reasons = [None] * n
+
+    trade_id = 0
+    next_entry = 0
+    while next_entry < len(entries):
+        entry = entries[next_entry]
+        entry_price = entry_prices[entry]
+        symbol_end = symbol_ends[np.searchsorted(symbol_ends, entry)]
+
+        if time_bars is not None and entry + time_bars <= symbol_end:
+            exit_bar, reason, price = entry + time_bars, exits.TIME, closes[entry + time_bars]
+        else:
+            exit_bar, reason, price = symbol_end, exits.END_OF_DATA, closes[symbol_end]
+
+        hit = np.searchsorted(trailing_hits, entry + 1)
+        if hit < len(trailing_hits) and trailing_hits[hit] <= exit_bar:
+            exit_bar, reason, price = trailing_hits[hit], exits.TRAILING, trailing[trailing_hits[hit]]
+
+        if target_percentage is not None and exit_bar > entry:
+            level = entry_price * (100 + target_percentage) / 100
+            hits = highs[entry + 1:exit_bar + 1] >= level
+            if hits.any():
+                bar = entry + 1 + int(hits.argmax())
+                if bar < exit_bar or exits.REASONS.index(exits.TARGET) < exits.REASONS.index(reason):
+                    exit_bar, reason, price = bar, exits.TARGET, max(opens[bar], level)
+
+        if percentage is not None:
+            level = entry_price * (100 + percentage) / 100
+            hits = lows[entry:exit_bar + 1] <= level
+            if hits.any():
+                bar = entry + int(hits.argmax())
+                exit_bar, reason, price = bar, exits.STOP, level if bar == entry else min(opens[bar], level)
+
+        trade_id += 1
+        trade_ids[entry:exit_bar + 1] = [trade_id] * (exit_bar + 1 - entry)
+        prices[exit_bar] = float(price)
+        reasons[exit_bar] = reason
+        next_entry = np.searchsorted(entries, exit_bar + 1)
+
+    return pl.DataFrame({"price": prices, "reason": reasons, "trade_id": trade_ids}, schema={"price": pl.Float64, "reason": pl.Utf8, "trade_id": pl.Int32})
+
+
+class TestExits(unittest.TestCase):
+
+    def test_percentage_stop(self):
+        """stop is hit on the entry bar of the first trade and the bar after entry of the second"""
+        df = get_exit_test_df()
+        ret = exits.trade_exits(df, 'enter', percentage=-5)
+        price, reason, trade_id = ret.columns
+
+        self.assertEqual(ret.df[price].to_list(), [None, 9.5, None, None, None, 9.5, None, None, None, None,   None, None, 9.5, None, None])
+        self.assertEqual(ret.df[reason].drop_nulls().to_list(), [exits.STOP] * 3)
+        self.assertEqual(ret.df[trade_id].to_list(), [None, 1, None, None, 2, 2, None, None, None, None,   None, None, 3, None, None])
+
+    def test_entries_ignored_while_trade_open(self):
+        """the second entry is inside the first trade so there is only one trade per symbol"""
+        df = get_exit_test_df()
+        ret = exits.trade_exits(df, 'enter')
+        price, reason, trade_id = ret.columns
+
+        self.assertEqual(ret.df[trade_id].to_list(), [None] + [1] * 9 + [None, None, 2, 2, 2])
+        self.assertEqual(ret.df[reason].drop_nulls().to_list(), [exits.END_OF_DATA] * 2)
+        self.assertEqual(ret.df[price].drop_nulls().to_list(), [10., 10.])
+
+    def test_stop_priority(self):
+        """target, trailing and time exits compete for the first trade"""
+        df = get_exit_test_df()
+
+        ret = exits.trade_exits(df, 'enter', target_percentage=20)
+        self.assertEqual(ret.df.filter(pl.col(ret.columns[1]) == exits.TARGET)[ret.columns[0]].to_list(), [12.0])
+
+        ret = exits.trade_exits(df, 'enter', time_bars=3, target_percentage=20)
+        self.assertEqual(ret.df[ret.columns[1]].drop_nulls().to_list(), [exits.TIME, exits.END_OF_DATA])
+        self.assertEqual(ret.df[ret.columns[2]].to_list(), [None] + [1] * 4 + [None] * 7 + [2] * 3)
+
+        #the trailing stop of the last 2 lows is hit on index 9 and wins over the time stop on the same bar
+        ret = exits.trade_exits(df, 'enter', trailing_bars=2, time_bars=8)
+        self.assertEqual(ret.df[ret.columns[1]].to_list()[9], exits.TRAILING)
+        self.assertEqual(ret.df[ret.columns[0]].to_list()[9], 10.0)
+
+    def test_returns_input_type(self):
+        df = get_exit_test_df()
+        expected = exits.trade_exits(df, 'enter', percentage=-5, trailing_bars=2).df
+
+        ret = exits.trade_exits(df.lazy(), 'enter', percentage=-5, trailing_bars=2)
+        self.assertIsInstance(ret.df, pl.LazyFrame)
+        self.assertEqual(ret.df.collect().to_dicts(), expected.to_dicts())
+
+        #filters after the engine aren't pushed below it
+        filtered = exits.trade_exits(df.lazy(), 'enter', percentage=-5, trailing_bars=2).df.filter(pl.col(pi.SYMBOL_COLUMN) == 'B')
+        self.assertEqual(filtered.collect().to_dicts(), expected.filter(pl.col(pi.SYMBOL_COLUMN) == 'B').to_dicts())
+        self.assertEqual(exits.trade_exits(df.lazy(), 'enter').df.tail(3).collect().to_dicts(), exits.trade_exits(df, 'enter').df.tail(3).to_dicts())
+
+        #calling again doesn't add columns
+        again = exits.trade_exits(expected, 'enter', percentage=-5, trailing_bars=2)
+        self.assertEqual(again.df.columns, expected.columns)
+
+    def test_existing_trailing_stop(self):
+        """a trailing_stop column that's already there is used instead of computing it again"""
+        df = get_exit_test_df()
+        expected = exits.trade_exits(df, 'enter', trailing_bars=2).df
+        ret = exits.trade_exits(pi.trailing_stop(df, 2).df, 'enter', trailing_bars=2)
+        self.assertEqual(ret.df.drop('2_bar_trailing_stop').to_dicts(), expected.to_dicts())
+
+        #a stop on every bar exits every trade on the bar after its entry
+        ret = exits.trade_exits(df.with_columns(pl.lit(5.0).alias('2_bar_trailing_stop')), 'enter', trailing_bars=2)
+        self.assertEqual(ret.df[ret.columns[0]].to_list()[2], 5.0)
+
+    def test_price_column_entries(self):
+        """entries can be one of the price columns"""
+        df = get_exit_test_df()
+        ret = exits.trade_exits(df, pi.CLOSE_COLUMN)
+        self.assertEqual(ret.df[ret.columns[2]].to_list(), [1] * 10 + [2] * 5)
+        self.assertEqual(ret.df[ret.columns[1]].drop_nulls().to_list(), [exits.END_OF_DATA] * 2)
+
+    def test_matches_reference(self):
+        """the vectorized engine matches the trade by trade loop on random data with long and short trades"""
+        df = get_random_exit_df(3, 1500, seed=7)
+        for kwargs in [{}, {'percentage': -5}, {'percentage': -30}, {'trailing_bars': 3}, {'time_bars': 10, 'target_percentage': 5},
+                       {'percentage': -3, 'trailing_bars': 2, 'time_bars': 20, 'target_percentage': 4}, {'time_bars': 0, 'target_percentage': 1}]:
+            ret = exits.trade_exits(df, 'enter', **kwargs)
+            expected = exits_reference(df, 'enter', **kwargs)
+            with self.subTest(**kwargs):
+                self.assertEqual(ret.df[ret.columns[2]].to_list(), expected['trade_id'].to_list())
+                self.assertEqual(ret.df[ret.columns[1]].to_list(), expected['reason'].to_list())
+                np.testing.assert_allclose(ret.df[ret.columns[0]].fill_null(np.nan).to_numpy(), expected['price'].fill_null(np.nan).to_numpy())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Tests for expression versions of the indicators
+
+"""
+import unittest
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import expr
+from test_indicators import get_multi_symbol_test_df, get_single_symbol_test_df
+
+
+class TestExpr(unittest.TestCase):
+
+    def test_matches_indicators(self):
+        """every expression should match the DataFrame indicator with the same name"""
+        cases = [
+            (expr.simple_moving_average(3), pi.simple_moving_average, {'days': 3}),
+            (expr.crossover_up('Close', 'Adj Close'), pi.crossover_up, {'column1': 'Close', 'column2': 'Adj Close'}),
+            (expr.crossover_down('Close', 'Adj Close'), pi.crossover_down, {'column1': 'Close', 'column2': 'Adj Close'}),
+            (expr.crossover('Close', 'Adj Close'), pi.crossover, {'column1': 'Close', 'column2': 'Adj Close'}),
+            (expr.trailing_stop(2), pi.trailing_stop, {'bars': 2}),
+            (expr.end_of_data_stop(), pi.end_of_data_stop, {}),
+            (expr.entry_percentage_stop(-5, 'High'), pi.entry_percentage_stop, {'percentage': -5, 'entry_column': 'High'}),
+            (expr.targeted_value('High'), pi.targeted_value, {'targets': 'High'}),
+            (expr.limit_entries(2, 'High'), pi.limit_entries, {'bars': 2, 'entries': 'High'}),
+            (expr.create_trade_ids('High', 'Adj Close'), pi.create_trade_ids, {'enter_column': 'High', 'exit_column': 'Adj Close'}),
+        ]
+        df = get_multi_symbol_test_df()
+        for e, function, args in cases:
+            ret = function(df, **args)
+            result = df.with_columns(e)
+            testing.assert_frame_equal(result, ret.df)
+            self.assertEqual(e.meta.output_name(), ret.column)
+
+    def test_single_symbol(self):
+        df = get_single_symbol_test_df()
+        result = df.with_columns(expr.simple_moving_average(3, by=None), expr.end_of_data_stop(by=None))
+        expected = pi.end_of_data_stop(pi.simple_moving_average(df, 3).df).df
+        testing.assert_frame_equal(result, expected)
+
+    def test_one_projection(self):
+        df = get_multi_symbol_test_df()
+        result = df.with_columns(
+            expr.simple_moving_average(2),
+            expr.simple_moving_average(3),
+            expr.trailing_stop(2),
+            expr.targeted_value('High'),
+            expr.entry_percentage_stop(-5, 'High'))
+        self.assertEqual(result.columns[-5:], ['SMA2', 'SMA3', '2_bar_trailing_stop', 'High_targets', 'Entry_-5%_Stops'])
+
+    def test_trailing_stop_stays_in_symbol(self):
+        """the first bars of a symbol shouldn't use lows from the previous symbol"""
+        multi = get_multi_symbol_test_df()
+        low_values = [float(i) for i in range(10, 20)] + [float(i) for i in range(10)]
+        df = multi.with_columns(pl.Series(pi.LOW_COLUMN, low_values))
+
+        result = df.with_columns(expr.trailing_stop(2))['2_bar_trailing_stop'].null_count()
+        self.assertEqual(result, len(df))
+
+
+if __name__ == '__main__':
+    unittest.main()
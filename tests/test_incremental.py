@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""Tests for incremental updates
+
+"""
+import unittest
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import exits
+from polars_indicators.incremental import Incremental
+from polars_indicators.pipeline import Pipeline
+from test_parallel import get_trading_test_df
+
+
+def get_incremental_test_pipeline() -> Pipeline:
+    return Pipeline() \
+        .add(pi.simple_moving_average, days=5) \
+        .add(pi.simple_moving_average, days=10) \
+        .add(pi.crossover_up, column1='SMA5', column2='SMA10') \
+        .add(pi.trailing_stop, bars=2) \
+        .add(pi.targeted_value, targets='SMA10') \
+        .add(pi.end_of_data_stop) \
+        .add(pi.create_trade_ids, enter_column='SMA10_targets', exit_column='2_bar_trailing_stop')
+
+
+def split(df: pl.DataFrame, new_bars: int) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """history without the last new_bars of each symbol and those bars"""
+    df = df.with_columns(pl.col(pi.SYMBOL_COLUMN).cumcount(reverse=True).over(pi.SYMBOL_COLUMN).alias('remaining'))
+    return df.filter(pl.col('remaining') >= new_bars).drop('remaining'), df.filter(pl.col('remaining') < new_bars).drop('remaining')
+
+
+class TestIncremental(unittest.TestCase):
+
+    def assert_matches_full(self, result: pl.DataFrame, expected: pl.DataFrame, trade_column: str):
+        """floats match to rounding and trades hold the same bars even if their ids differ"""
+        testing.assert_frame_equal(result.drop(trade_column), expected.drop(trade_column), check_exact=False, rtol=1e-12)
+        pairs = pl.DataFrame({'result': result[trade_column], 'expected': expected[trade_column]}).drop_nulls().unique()
+        self.assertEqual(result[trade_column].null_count(), expected[trade_column].null_count())
+        self.assertEqual(len(pairs), pairs['result'].n_unique())
+        self.assertEqual(len(pairs), pairs['expected'].n_unique())
+
+    def test_update_matches_full_recompute(self):
+        df = get_trading_test_df()
+        pipeline = get_incremental_test_pipeline()
+        expected = pipeline.run(df)
+        history, new = split(df, 5)
+
+        incremental = Incremental(pipeline)
+        incremental.start(history)
+        ret = incremental.update(new)
+
+        self.assertEqual(ret.columns, expected.columns)
+        self.assertEqual(len(ret.df), len(new))
+        self.assertLessEqual(len(incremental.tail), 6 * incremental.lookback)
+        self.assert_matches_full(ret.df, expected.df.join(new.select(pi.SYMBOL_COLUMN, pi.DATE_COLUMN), on=[pi.SYMBOL_COLUMN, pi.DATE_COLUMN]), ret.columns[-1])
+
+    def test_prepared(self):
+        """the kept bars and the new bars are renumbered together so prepared frames match unprepared ones"""
+        df = get_trading_test_df()
+        pipeline = get_incremental_test_pipeline()
+        history, new = split(df, 5)
+
+        expected = Incremental(pipeline)
+        expected.start(history)
+        incremental = Incremental(pipeline)
+        incremental.start(pi.prepare(history))
+        ret = incremental.update(pi.prepare(new))
+        testing.assert_frame_equal(ret.df.drop(['Bar', 'Bars_Left']), expected.update(new).df)
+
+    def test_bar_by_bar(self):
+        """one bar per symbol at a time with trades open across updates"""
+        df = get_trading_test_df()
+        pipeline = get_incremental_test_pipeline()
+        expected = pipeline.run(df)
+        history, new = split(df, 30)
+
+        incremental = Incremental(pipeline)
+        frames = [incremental.start(history).df]
+        new = new.with_columns(pl.col(pi.SYMBOL_COLUMN).cumcount().over(pi.SYMBOL_COLUMN).alias('bar'))
+        for bar in range(30):
+            frames.append(incremental.update(new.filter(pl.col('bar') == bar).drop('bar')).df)
+
+        #every update ends with an end of data stop so only the last one matches
+        result = pl.concat(frames).sort([pi.SYMBOL_COLUMN, pi.DATE_COLUMN])
+        self.assertGreater(expected.df[expected.columns[-1]].n_unique(), 10)
+        self.assert_matches_full(result.drop('EOD_Stops'), expected.df.drop('EOD_Stops'), expected.columns[-1])
+
+    def test_single_symbol(self):
+        df = get_trading_test_df().filter(pl.col(pi.SYMBOL_COLUMN) == 'B').drop(pi.SYMBOL_COLUMN)
+        pipeline = get_incremental_test_pipeline()
+        expected = pipeline.run(df)
+
+        incremental = Incremental(pipeline)
+        frames = [incremental.start(df.head(40)).df]
+        for start in range(40, 60, 4):
+            frames.append(incremental.update(df.slice(start, 4)).df)
+        self.assert_matches_full(pl.concat(frames).drop('EOD_Stops'), expected.df.drop('EOD_Stops'), expected.columns[-1])
+
+    def test_limit_entries_and_exits(self):
+        """limit_entries and trade_exits continue from their state bar by bar. With ends trades stay open across updates"""
+        df = get_trading_test_df()
+        pipeline = Pipeline() \
+            .add(pi.simple_moving_average, days=5) \
+            .add(pi.targeted_value, targets='SMA5') \
+            .add(pi.limit_entries, bars=3, entries='SMA5_targets') \
+            .add(exits.trade_exits, enter_column='3_minimum_bars_between', percentage=-2, trailing_bars=2, time_bars=4)
+        expected = pipeline.run(df)
+        self.assertLess(expected.df['3_minimum_bars_between'].is_not_null().sum(), expected.df['SMA5_targets'].is_not_null().sum())
+        self.assertLessEqual({'stop', 'trailing', 'time'}, set(expected.df[expected.columns[-2]].drop_nulls()))
+        ends = df.groupby(pi.SYMBOL_COLUMN).agg(pl.col(pi.DATE_COLUMN).max())
+        history, new = split(df, 30)
+
+        incremental = Incremental(pipeline)
+        frames = [incremental.start(history, ends).df]
+        new = new.with_columns(pl.col(pi.SYMBOL_COLUMN).cumcount().over(pi.SYMBOL_COLUMN).alias('bar'))
+        for bar in range(30):
+            ret = incremental.update(new.filter(pl.col('bar') == bar).drop('bar'), ends)
+            frames.append(ret.df)
+        self.assertEqual(ret.columns, expected.columns)
+        self.assertLessEqual(len(incremental.tail), 6 * incremental.lookback)
+        self.assert_matches_full(pl.concat(frames).sort([pi.SYMBOL_COLUMN, pi.DATE_COLUMN]), expected.df, expected.columns[-1])
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            Incremental(Pipeline().add(pi.exponential_moving_average, days=2))
+        with self.assertRaises(ValueError):
+            Incremental(Pipeline().add(pi.create_trade_ids, enter_column='a', exit_column='b').add(pi.simple_moving_average, days=2))
+        with self.assertRaises(ValueError):
+            Incremental(Pipeline().add(pi.limit_entries, bars=2, entries='Close').add(pi.simple_moving_average, days=2))
+        with self.assertRaises(ValueError):
+            Incremental(Pipeline().add(pi.simple_moving_average, days=2)).update(get_trading_test_df())
+
+
+if __name__ == '__main__':
+    unittest.main()
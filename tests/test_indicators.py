@@ -6,8 +6,10 @@ Created on Sat 3/26/23
 @author: Avery
 
 """
+import random
+import statistics
 import unittest
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from polars import testing
 import polars as pl
 import polars_indicators as pi
@@ -72,6 +74,38 @@ class TestIndicators(unittest.TestCase):
         self.validate_indicator(pi.simple_moving_average, args)
 
 
+    def test_moving_average_sweep(self):
+        """every window should match simple_moving_average"""
+        windows = [1, 2, 3, 5, 10, 11]
+        multi = get_multi_symbol_test_df()
+        close_values = [float((i * 7) % 11) for i in range(len(multi))]
+        close_values[3] = None
+        df = multi.with_columns(pl.Series(pi.CLOSE_COLUMN, close_values))
+
+        expected = df
+        for days in windows:
+            expected = pi.simple_moving_average(expected, days).df
+
+        ret = pi.moving_average_sweep(df, windows)
+        self.assertEqual(ret.columns, ['SMA' + str(days) for days in windows])
+        testing.assert_frame_equal(ret.df, expected)
+
+        single = df.filter(pl.col(pi.SYMBOL_COLUMN) == 'A').drop(pi.SYMBOL_COLUMN)
+        ret = pi.moving_average_sweep(single, windows)
+        testing.assert_frame_equal(ret.df, expected.filter(pl.col(pi.SYMBOL_COLUMN) == 'A').drop(pi.SYMBOL_COLUMN))
+
+        ret = pi.moving_average_sweep(df.lazy(), windows, float32=True)
+        self.assertIsInstance(ret.df, pl.LazyFrame)
+        result = ret.df.collect()
+        self.assertEqual(result['SMA5'].dtype, pl.Float32)
+        testing.assert_frame_equal(result, expected, check_dtype=False, rtol=1e-6)
+
+        #existing columns are kept
+        existing = pi.simple_moving_average(df, 5).df
+        ret = pi.moving_average_sweep(existing, [5])
+        testing.assert_frame_equal(ret.df, existing)
+
+
     def test_validate_crossover_up(self):
         args = {'column1': 'Close',
                 'column2': 'Open'}
@@ -199,6 +233,114 @@ class TestIndicators(unittest.TestCase):
 
         self.assertTrue(crossovers.is_empty(), "crossover found between symbols")
 
+    def test_crossovers(self):
+        """every direction of every pair should match the single crossover indicators"""
+        multi = get_multi_symbol_test_df()
+        close_values = [float((i * 7) % 11) for i in range(len(multi))]
+        close_values[5] = None
+        df = pi.moving_average_sweep(multi.with_columns(pl.Series(pi.CLOSE_COLUMN, close_values)), [2, 3]).df
+        pairs = [('SMA2', 'SMA3'), ('Close', 'SMA3')]
+
+        expected = df
+        for column1, column2 in pairs:
+            expected = pi.crossover_up(expected, column1, column2).df
+            expected = pi.crossover_down(expected, column1, column2).df
+            expected = pi.crossover(expected, column1, column2).df
+
+        ret = pi.crossovers(df, pairs)
+        self.assertEqual(ret.columns, expected.columns[len(df.columns):])
+        testing.assert_frame_equal(ret.df, expected)
+
+        single = df.filter(pl.col(pi.SYMBOL_COLUMN) == 'A').drop(pi.SYMBOL_COLUMN)
+        ret = pi.crossovers(single.lazy(), pairs, directions=('up',))
+        self.assertEqual(ret.columns, ['SMA2_cross_up_SMA3', 'Close_cross_up_SMA3'])
+        single_expected = pi.crossover_up(pi.crossover_up(single, 'SMA2', 'SMA3').df, 'Close', 'SMA3').df
+        testing.assert_frame_equal(ret.df.collect(), single_expected)
+
+        ret = pi.crossovers(pi.prepare(df), pairs)
+        testing.assert_frame_equal(ret.df.drop([pi.BAR_COLUMN, pi.BARS_LEFT_COLUMN]), expected)
+
+        #multipliers and fixed levels are the same as crossing a column of those values
+        scaled = df.with_columns((pl.col('SMA3') * 0.95).alias('0.95xSMA3'), pl.lit(5.0).alias('5'))
+        ret = pi.crossovers(df, [('Close', 'SMA3', 0.95), ('Close', 5.0)], directions=('any',))
+        self.assertEqual(ret.columns, ['Close_cross_0.95xSMA3', 'Close_cross_5.0'])
+        testing.assert_series_equal(ret.df['Close_cross_0.95xSMA3'], pi.crossover(scaled, 'Close', '0.95xSMA3').df['Close_cross_0.95xSMA3'])
+        testing.assert_series_equal(ret.df['Close_cross_5.0'], pi.crossover(scaled, 'Close', '5').df['Close_cross_5'], check_names=False)
+
+        #existing columns are kept
+        testing.assert_frame_equal(pi.crossovers(expected, pairs).df, expected)
+        with self.assertRaises(ValueError):
+            pi.crossovers(df, pairs, directions=('sideways',))
+
+
+    def test_validate_exponential_moving_average(self):
+        self.validate_indicator(pi.exponential_moving_average, {'days': 3})
+
+    def test_validate_true_range(self):
+        self.validate_indicator(pi.true_range, {})
+
+    def test_validate_relative_strength_index(self):
+        self.validate_indicator(pi.relative_strength_index, {'days': 3})
+
+    def test_relative_strength_index_unchanged_closes(self):
+        """a halted symbol has no gain and no loss so its RSI is 50 and a symbol that only rises is at 100"""
+        df = pl.DataFrame({
+            'Symbol': ['A'] * 6 + ['B'] * 6,
+            'Close': [10.0] * 6 + [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        })
+        expected = pl.Series('RSI3', [None] * 3 + [50.0] * 3 + [None] * 3 + [100.0] * 3)
+        testing.assert_series_equal(pi.relative_strength_index(df, 3).df['RSI3'], expected)
+        single = pi.relative_strength_index(df.filter(pl.col('Symbol') == 'A').drop('Symbol').lazy(), 3).df.collect()
+        testing.assert_series_equal(single['RSI3'], expected.head(6))
+
+    def test_volatility_indicators(self):
+        """every indicator should match a bar by bar reference on each symbol"""
+        df = get_random_walk_df(['A', 'AA', 'B'], 40)
+        ret = pi.bollinger_bands(df, 5, 2)
+        self.assertEqual(ret.columns, ['SMA5', 'STD5', 'BB5_2_Upper', 'BB5_2_Lower'])
+        ret = pi.keltner_channels(ret.df, 6, 1.5, 4)
+        self.assertEqual(ret.columns, ['EMA6', 'True_Range', 'ATR4', 'KC6_4_1.5_Upper', 'KC6_4_1.5_Lower'])
+        result = pi.relative_strength_index(pi.average_true_range(ret.df, 5).df, 5).df
+
+        for symbol in ['A', 'AA', 'B']:
+            bars = result.filter(pl.col(pi.SYMBOL_COLUMN) == symbol)
+            closes = bars[pi.CLOSE_COLUMN].to_list()
+            previous = [closes[0]] + closes[:-1]
+            true_ranges = [max(high, close) - min(low, close) for high, low, close in zip(bars[pi.HIGH_COLUMN], bars[pi.LOW_COLUMN], previous)]
+            deviations = [None] * 4 + [statistics.pstdev(closes[i - 4:i + 1]) for i in range(4, len(closes))]
+            changes = [closes[i] - closes[i - 1] for i in range(1, len(closes))]
+            gains = wilder_average([max(change, 0) for change in changes], 5)
+            losses = wilder_average([max(-change, 0) for change in changes], 5)
+            expected = {
+                'True_Range': true_ranges,
+                'STD5': deviations,
+                'EMA6': exponential_average(closes, 2 / 7, 6),
+                'ATR4': wilder_average(true_ranges, 4),
+                'ATR5': wilder_average(true_ranges, 5),
+                'RSI5': [None] + [100 * gain / (gain + loss) if gain is not None else None for gain, loss in zip(gains, losses)],
+            }
+            for column, values in expected.items():
+                testing.assert_series_equal(bars[column], pl.Series(column, values, pl.Float64), rtol=1e-9)
+            testing.assert_series_equal(bars['BB5_2_Upper'], (bars['SMA5'] + 2 * bars['STD5']).alias('BB5_2_Upper'))
+            testing.assert_series_equal(bars['KC6_4_1.5_Lower'], (bars['EMA6'] - 1.5 * bars['ATR4']).alias('KC6_4_1.5_Lower'))
+
+        #prepared frames and single symbols give the same values
+        prepared = pi.bollinger_bands(pi.keltner_channels(pi.prepare(df), 6, 1.5, 4).df, 5, 2).df
+        testing.assert_frame_equal(prepared.select(ret.df.columns), ret.df)
+        single = df.filter(pl.col(pi.SYMBOL_COLUMN) == 'B').drop(pi.SYMBOL_COLUMN)
+        single = pi.keltner_channels(pi.bollinger_bands(single.lazy(), 5, 2).df, 6, 1.5, 4).df
+        self.assertIsInstance(single, pl.LazyFrame)
+        testing.assert_frame_equal(single.collect(), ret.df.filter(pl.col(pi.SYMBOL_COLUMN) == 'B').drop(pi.SYMBOL_COLUMN))
+
+    def test_shared_intermediates(self):
+        """indicators reuse the intermediate columns that already exist instead of computing them again"""
+        df = get_random_walk_df(['A', 'AA'], 30)
+        #a stand in SMA shows which mean the bands were built on
+        marked = df.with_columns(pl.lit(1000.0).alias('SMA5'), pl.lit(1.0).alias('True_Range'))
+        bands = pi.bollinger_bands(marked, 5, 2).df
+        self.assertEqual(bands['BB5_2_Upper'].drop_nulls().min(), 1000.0 + 2 * bands['STD5'].drop_nulls().min())
+        channels = pi.keltner_channels(marked, 5, 2, 3).df
+        self.assertEqual(channels['ATR3'].drop_nulls().unique().to_list(), [1.0])
 
     def test_trailing_stop_validate(self):
         args = {"bars": 2}
@@ -255,6 +397,63 @@ class TestIndicators(unittest.TestCase):
 
         self.assertEqual(result, expected)
 
+        #a trade open at the end of one symbol ends there instead of continuing into the next symbol
+        enter_values = [None] * 8 + [1.0, None] + [None, 2.0] + [None] * 8
+        exit_values = [None] * 12 + [3.0] + [None] * 7
+        df = multi.with_columns(pl.Series(enter_column, enter_values), pl.Series(exit_column, exit_values))
+
+        ret = pi.create_trade_ids(df, enter_column, exit_column)
+
+        result = ret.df[ret.column].to_list()
+        expected = [None] * 8 + [1, 1] + [None, 2, 2] + [None] * 7
+        self.assertEqual(result, expected)
+
+    def test_create_trade_ids_matches_reference(self):
+        """randomized single symbol frames should match the window based implementation create_trade_ids replaced"""
+        rng = random.Random(2)
+        for _ in range(200):
+            bars = rng.randint(2, 40)
+            enter_probability = rng.random()
+            exit_probability = rng.random()
+            #the reference starts a one bar trade for an entry on the first bar so that is pinned below instead
+            enter_values = [None] + [1.0 if rng.random() < enter_probability else None for _ in range(bars - 1)]
+            exit_values = [2.0 if rng.random() < exit_probability else None for _ in range(bars)]
+            df = get_single_symbol_df(bars).with_columns(
+                pl.Series("enter", enter_values, dtype=pl.Float64),
+                pl.Series("exit", exit_values, dtype=pl.Float64))
+
+            result = pi.create_trade_ids(df, "enter", "exit").df
+            expected = create_trade_ids_reference(df, "enter", "exit")
+            testing.assert_frame_equal(result, expected)
+
+        #an entry on the first bar starts a trade that lasts until the first exit
+        #the reference ends it on the first bar and leaves the exit outside of any trade
+        df = get_single_symbol_df(4).with_columns(
+            pl.Series("enter", [1.0, None, 1.0, None]),
+            pl.Series("exit", [None, 2.0, None, None]))
+        self.assertEqual(pi.create_trade_ids(df, "enter", "exit").df["enter/exit"].to_list(), [1, 1, 2, 2])
+        self.assertEqual(create_trade_ids_reference(df, "enter", "exit")["enter/exit"].to_list(), [1, None, 2, 2])
+
+    def test_trade_indices(self):
+        multi = get_multi_symbol_test_df()
+        enter_column = "enter"
+        enter_values = [None, 1.2, 1.4, None, 9.9, None, None, 3, None, None] + [1.0] + [None] * 9
+        exit_column = "exit"
+        exit_values = [0.3, None, None, 0.8, 1.1, None, 2, None, None, None] + [None] * 5 + [1.0] + [None] * 4
+
+        df = multi.with_columns(pl.Series(enter_column, enter_values), pl.Series(exit_column, exit_values))
+        ret = pi.create_trade_ids(df, enter_column, exit_column)
+
+        result = pi.trade_indices(ret.df, ret.column, exit_column)
+        expected = pl.DataFrame({
+            ret.column: pl.Series([1, 2, 3, 4], dtype=pl.Int32),
+            pi.SYMBOL_COLUMN: ['A', 'A', 'A', 'AA'],
+            'Entry_Index': pl.Series([1, 4, 7, 10], dtype=pl.UInt32),
+            'Exit_Index': pl.Series([3, 4, 9, 15], dtype=pl.UInt32),
+            'Closed': [True, True, False, True],
+        })
+        testing.assert_frame_equal(result, expected)
+
     def test_validate_targeted_value(self):
         args = {"targets": "High"}
         self.validate_indicator(pi.targeted_value, args)
@@ -280,10 +479,19 @@ class TestIndicators(unittest.TestCase):
         expected = df.clone().insert_at_idx(-1, pl.Series(enter_column, expected_values))
 
         df = df.clone().insert_at_idx(-1, pl.Series(enter_column, enter_values))
-        result = pi.limit_entries(df, bars).df
+        ret = pi.limit_entries(df, bars, enter_column)
+        result = ret.df.drop(enter_column).rename({ret.column: enter_column}).select(expected.columns)
 
         testing.assert_frame_equal(result, expected)
 
+        #entries at the end of one symbol shouldn't block entries at the start of the next
+        enter_values = [None] * 9 + [1.0] + [2.0, 3.0] + [None] * 8
+        expected_values = [None] * 9 + [1.0] + [2.0, None] + [None] * 8
+        df = multi.with_columns(pl.Series(enter_column, enter_values))
+
+        result = pi.limit_entries(df, bars, enter_column).df[ret.column].to_list()
+        self.assertEqual(result, expected_values)
+
 
 
     # #kept in case needed later. tests nested add_exit_ids used in create_trade_ids
@@ -315,6 +523,85 @@ class TestIndicators(unittest.TestCase):
 
     #     self.assertEqual(result, expected)
 
+    def test_compact(self):
+        """compact shrinks the dtypes and the indicators on compact data match to Float32 precision"""
+        df = get_multi_symbol_test_df().with_columns(pl.col('Date').cast(pl.Datetime))
+        compact = pi.compact(df, float32=True)
+        self.assertEqual(compact.schema['Symbol'], pl.Categorical)
+        self.assertEqual(compact.schema['Date'], pl.Date)
+        self.assertEqual(compact.schema['Close'], pl.Float32)
+        self.assertEqual(compact.schema['Adj Close'], pl.Float64)
+        self.assertEqual(compact.schema['Volume'], pl.Int8)
+        self.assertEqual(pi.compact(df.lazy()).collect().schema['Volume'], pl.Int64)
+
+        for function, args in [(pi.simple_moving_average, {'days': 3}), (pi.trailing_stop, {'bars': 2}),
+                               (pi.end_of_data_stop, {}), (pi.crossover_up, {'column1': 'Close', 'column2': 'Open'})]:
+            expected = function(df, **args)
+            result = function(compact, **args)
+            testing.assert_series_equal(result.df[result.column], expected.df[expected.column], check_dtype=False, rtol=1e-6)
+
+        ret = pi.simple_moving_average(compact, 3, float32=True)
+        self.assertEqual(ret.df.schema[ret.column], pl.Float32)
+
+        #trade ids fit the smallest type once they're computed
+        ret = pi.create_trade_ids(pi.end_of_data_stop(compact).df, 'Close', 'EOD_Stops')
+        self.assertEqual(pi.compact(ret.df).schema[ret.column], pl.Int8)
+
+        with self.assertRaises(ValueError):
+            pi.compact(df.with_columns(pl.col('Date') + timedelta(hours=1)))
+        self.assertEqual(pi.compact(df.with_columns(pl.col('Date') + timedelta(hours=1)), daily=False).schema['Date'], pl.Datetime)
+
+    def test_prepare(self):
+        """prepare sorts the rows and numbers the bars of each symbol from both ends"""
+        multi = get_multi_symbol_test_df()
+        shuffled = multi.sample(fraction=1.0, shuffle=True, seed=3)
+        prepared = pi.prepare(shuffled)
+        testing.assert_frame_equal(prepared.drop(['Bar', 'Bars_Left']), multi)
+        self.assertEqual(prepared['Bar'].to_list(), list(range(10)) * 2)
+        self.assertEqual(prepared['Bars_Left'].to_list(), list(range(9, -1, -1)) * 2)
+        testing.assert_frame_equal(pi.prepare(shuffled.lazy()).collect(), prepared)
+        testing.assert_frame_equal(pi.prepare(prepared), prepared)
+
+        with self.assertRaises(ValueError):
+            pi.prepare(shuffled, sort=False)
+
+        single = pi.prepare(get_single_symbol_test_df())
+        self.assertEqual(single['Bars_Left'].to_list(), list(range(9, -1, -1)))
+
+        #contiguous symbols out of alphabetical order are kept in order and not flagged as sorted
+        descending = pi.prepare(multi.sort(['Symbol', 'Date'], descending=[True, False]))
+        self.assertEqual(descending['Symbol'][0], 'AA')
+        self.assertEqual(descending['Symbol'].min(), 'A')
+        self.assertEqual(descending['Symbol'].max(), 'AA')
+
+        bounds = pi.symbol_bounds(prepared)
+        self.assertEqual(bounds.rows(), [('A', 0, 10), ('AA', 10, 20)])
+        testing.assert_frame_equal(pi.symbol_bounds(multi), bounds)
+
+    def test_prepared_indicators_match(self):
+        """indicators on prepared frames use the boundary index and match the windows over Symbol"""
+        rng = random.Random(4)
+        frames = []
+        for symbol, bars in [('A', 7), ('B', 1), ('C', 12), ('D', 3)]:
+            frame = get_single_symbol_df(bars).with_columns(
+                pl.lit(symbol).alias('Symbol'),
+                pl.Series('Low', [rng.uniform(1, 10) for _ in range(bars)]),
+                pl.Series('enter', [1.0 if rng.random() < 0.4 else None for _ in range(bars)], dtype=pl.Float64))
+            frames.append(frame)
+        df = pl.concat(frames)
+        prepared = pi.prepare(df)
+
+        for function, args in [(pi.simple_moving_average, {'days': 3}), (pi.trailing_stop, {'bars': 2}), (pi.end_of_data_stop, {}),
+                               (pi.crossover_up, {'column1': 'Low', 'column2': 'Close'}), (pi.crossover_down, {'column1': 'Low', 'column2': 'Close'}),
+                               (pi.crossover, {'column1': 'Low', 'column2': 'Close'})]:
+            expected = function(df, **args)
+            result = function(prepared, **args)
+            testing.assert_series_equal(result.df[result.column], expected.df[expected.column])
+
+        df = pi.trailing_stop(df, 2).df
+        expected = pi.create_trade_ids(df, 'enter', '2_bar_trailing_stop')
+        result = pi.create_trade_ids(pi.prepare(df), 'enter', '2_bar_trailing_stop')
+        testing.assert_series_equal(result.df[result.column], expected.df[expected.column])
 
 
 
@@ -334,6 +621,33 @@ def add_column_with_true_indicies(df, indicies: list[int], new_column: str):
                 pl.lit(False)) \
             .alias(new_column)).select(new_columns) 
 
+def create_trade_ids_reference(df: pl.DataFrame, enter_column: str, exit_column: str) -> pl.DataFrame:
+    """frozen copy of the window based create_trade_ids that the running maximum version replaced
+    kept to check the current version against on single symbol data"""
+    exit_ids = f"{exit_column}_exit_ids"
+    traded = f"{enter_column}/{exit_ids}_traded"
+    column_name = f"{enter_column}/{exit_column}"
+    new_columns = df.columns.copy()
+    new_columns.append(column_name)
+
+    lf = df.lazy().with_columns(pl.when(pl.col(exit_column).is_not_null()).then(1).otherwise(0).cumsum().shift(1).alias(exit_ids))
+    lf = lf.with_columns(
+        pl.when(pl.col(pi.DATE_COLUMN) >= pl.when(pl.col(enter_column).is_not_null()).then(pl.col(pi.DATE_COLUMN)).min().over(exit_ids)).then(True) \
+        .alias(traded))
+    lf = lf.with_columns(
+        pl.when(
+            pl.col(traded)
+            &
+            (pl.col(pi.DATE_COLUMN) == pl.col(pi.DATE_COLUMN).min().over(exit_ids, traded))
+        ).then(1).otherwise(0).alias(column_name))
+    lf = lf.with_columns(pl.when(pl.col(traded)).then(pl.col(column_name).cumsum()))
+    return lf.select(new_columns).collect()
+
+def get_single_symbol_df(bars: int) -> pl.DataFrame:
+    """single symbol test df with bars consecutive days"""
+    dates = [(date(2023, 1, 2) + timedelta(days=i)).isoformat() for i in range(bars)]
+    return get_symbol_dataframe('A', dates).select(COLUMNS[:-1])
+
 def get_columns():
     """get columns copy since testing appends"""
     return COLUMNS.copy()
@@ -370,6 +684,36 @@ def get_symbol_dataframe(symbol: str, dates: list[str]) -> pl.DataFrame:
     df = pl.DataFrame(data)
     df['Symbol'].cast(pl.Categorical)
     return df
+
+def get_random_walk_df(symbols: list[str], bars: int, seed: int=0) -> pl.DataFrame:
+    """symbols with bars of a seeded random walk and highs and lows around the closes"""
+    rng = random.Random(seed)
+    frames = []
+    for symbol in symbols:
+        closes = [100.0]
+        for _ in range(bars - 1):
+            closes.append(closes[-1] + rng.uniform(-3, 3))
+        frames.append(pl.DataFrame({
+            pi.SYMBOL_COLUMN: [symbol] * bars,
+            pi.DATE_COLUMN: [date(2023, 1, 2) + timedelta(days=i) for i in range(bars)],
+            pi.OPEN_COLUMN: [close + rng.uniform(-1, 1) for close in closes],
+            pi.HIGH_COLUMN: [close + rng.uniform(0, 2) for close in closes],
+            pi.LOW_COLUMN: [close - rng.uniform(0, 2) for close in closes],
+            pi.CLOSE_COLUMN: closes,
+        }))
+    return pl.concat(frames)
+
+def exponential_average(values: list[float], alpha: float, min_values: int) -> list[float | None]:
+    """exponential average started from the first value. None until min_values values are in it"""
+    averages = []
+    average = values[0]
+    for i, value in enumerate(values):
+        average = value if i == 0 else alpha * value + (1 - alpha) * average
+        averages.append(average if i + 1 >= min_values else None)
+    return averages
+
+def wilder_average(values: list[float], days: int) -> list[float | None]:
+    return exponential_average(values, 1 / days, days)
     
 
 if __name__ == '__main__':
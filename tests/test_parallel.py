@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Tests for partitioned parallel execution
+
+"""
+import math
+import unittest
+from datetime import datetime, timedelta
+from functools import partial
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import exits, parallel
+from polars_indicators.pipeline import Pipeline
+from polars_indicators.strategies import buy_x_week_low
+from test_indicators import get_multi_symbol_df
+
+
+def get_parallel_test_df() -> pl.DataFrame:
+    dates = ['2023-01-02', '2023-01-03', '2023-01-04', '2023-01-05', '2023-01-06', '2023-01-09', '2023-01-10', '2023-01-11', '2023-01-12', '2023-01-13']
+    return get_multi_symbol_df(['A', 'AA', 'B', 'C', 'D'], dates).with_columns(pl.col(pi.DATE_COLUMN).cast(pl.Datetime))
+
+
+def get_trading_test_df() -> pl.DataFrame:
+    """symbols with prices that swing up and down so the strategy makes trades in each of them"""
+    bars = 60
+    dates = [datetime(2023, 1, 2) + timedelta(days=i) for i in range(bars)]
+    frames = []
+    for i, symbol in enumerate(['A', 'AA', 'B', 'C', 'D', 'E']):
+        closes = [100 + 10 * math.sin((bar + 3 * i) / 4) - bar / 10 for bar in range(bars)]
+        frames.append(pl.DataFrame({
+            pi.SYMBOL_COLUMN: [symbol] * bars,
+            pi.DATE_COLUMN: dates,
+            pi.OPEN_COLUMN: closes,
+            pi.HIGH_COLUMN: [close + 1 for close in closes],
+            pi.LOW_COLUMN: [close - 1 for close in closes],
+            pi.CLOSE_COLUMN: closes,
+        }))
+    return pl.concat(frames)
+
+
+def add_indicators(df: pl.DataFrame) -> pl.DataFrame:
+    return Pipeline().add(pi.simple_moving_average, days=2).add(pi.end_of_data_stop).run(df).df
+
+
+class TestParallel(unittest.TestCase):
+
+    def test_symbol_batches(self):
+        df = get_parallel_test_df()
+
+        batches = parallel.symbol_batches(df, 3)
+        self.assertEqual(len(batches), 3)
+        for batch in batches:
+            symbols = batch[pi.SYMBOL_COLUMN]
+            self.assertEqual(len(batch), symbols.n_unique() * 10, "batches should hold whole symbols")
+        testing.assert_frame_equal(pl.concat(batches), df)
+
+        #more batches than symbols gives one batch per symbol
+        self.assertEqual(len(parallel.symbol_batches(df, 20)), 5)
+
+        shuffled = pl.concat([df.slice(0, 5), df.slice(10, 10), df.slice(5, 5), df.slice(20, 30)])
+        with self.assertRaises(ValueError):
+            parallel.symbol_batches(shuffled, 3)
+
+    def test_run_partitioned(self):
+        df = get_parallel_test_df()
+        expected = add_indicators(df)
+
+        for executor in ["thread", "process"]:
+            result = parallel.run_partitioned(df, add_indicators, workers=2, batches=3, executor=executor)
+            testing.assert_frame_equal(result, expected)
+
+    def test_run_partitioned_strategy(self):
+        df = get_trading_test_df()
+        strategy = partial(buy_x_week_low.strategy, lookback=timedelta(days=10))
+        ret = strategy(df)
+        expected = ret.df
+        self.assertGreater(expected.filter(pl.col(ret.column).is_not_null())[pi.SYMBOL_COLUMN].n_unique(), 1)
+
+        result = parallel.run_partitioned(df.lazy(), strategy, workers=3, executor="process", id_columns=[ret.column])
+        testing.assert_frame_equal(result, expected)
+
+    def test_trade_ids_offset(self):
+        df = get_trading_test_df().with_columns(
+            pl.when(pl.col(pi.CLOSE_COLUMN) < pl.col(pi.CLOSE_COLUMN).shift(1)).then(pl.col(pi.CLOSE_COLUMN)).alias('enter'))
+        trades = partial(exits.trade_exits, enter_column='enter', percentage=-1, trailing_bars=2)
+        ret = trades(df)
+        trade_id = ret.columns[2]
+
+        result = parallel.run_partitioned(df, trades, workers=3, id_columns=[trade_id])
+        testing.assert_frame_equal(result, ret.df)
+
+        #without the offset every batch numbers its trades from 1
+        result = parallel.run_partitioned(df, trades, workers=3)
+        self.assertLess(result[trade_id].n_unique(), ret.df[trade_id].n_unique())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Tests for pipeline
+
+"""
+import unittest
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators.pipeline import Pipeline
+from test_indicators import get_multi_symbol_test_df, get_random_walk_df, get_single_symbol_test_df
+
+
+def get_test_pipeline() -> Pipeline:
+    return Pipeline() \
+        .add(pi.simple_moving_average, days=2) \
+        .add(pi.simple_moving_average, days=3) \
+        .add(pi.trailing_stop, bars=2) \
+        .add(pi.crossover, column1='SMA2', column2='SMA3') \
+        .add(pi.targeted_value, targets='High') \
+        .add(pi.end_of_data_stop) \
+        .add(pi.create_trade_ids, enter_column='High_targets', exit_column='EOD_Stops')
+
+
+def run_sequentially(df):
+    df = pi.simple_moving_average(df, days=2).df
+    df = pi.simple_moving_average(df, days=3).df
+    df = pi.trailing_stop(df, bars=2).df
+    df = pi.crossover(df, column1='SMA2', column2='SMA3').df
+    df = pi.targeted_value(df, targets='High').df
+    df = pi.end_of_data_stop(df).df
+    return pi.create_trade_ids(df, enter_column='High_targets', exit_column='EOD_Stops').df
+
+
+class TestPipeline(unittest.TestCase):
+
+    def test_matches_sequential_calls(self):
+        for df in [get_single_symbol_test_df(), get_multi_symbol_test_df()]:
+            ret = get_test_pipeline().run(df)
+            testing.assert_frame_equal(ret.df, run_sequentially(df))
+
+            expected = ['SMA2', 'SMA3', '2_bar_trailing_stop', 'SMA2_cross_SMA3', 'High_targets', 'EOD_Stops', 'High_targets/EOD_Stops']
+            self.assertEqual(ret.columns, expected)
+
+    def test_prepared_frame(self):
+        """a prepared frame gives the same indicators through the boundary index"""
+        df = get_multi_symbol_test_df()
+        ret = get_test_pipeline().run(pi.prepare(df))
+        testing.assert_frame_equal(ret.df.drop([pi.BAR_COLUMN, pi.BARS_LEFT_COLUMN]), run_sequentially(df))
+
+    def test_returns_input_type(self):
+        df = get_multi_symbol_test_df()
+        self.assertIsInstance(get_test_pipeline().run(df).df, pl.DataFrame)
+        self.assertIsInstance(get_test_pipeline().run(df.lazy()).df, pl.LazyFrame)
+
+    def test_merges_independent_expressions(self):
+        df = get_multi_symbol_test_df().lazy()
+        pipeline = Pipeline() \
+            .add(pi.simple_moving_average, days=2) \
+            .add(pi.simple_moving_average, days=3) \
+            .add(pi.targeted_value, targets='High') \
+            .add(pi.crossover_up, column1='SMA2', column2='SMA3')
+
+        plan = pipeline.plan(df).df.explain(optimized=False)
+
+        #the crossover needs the SMAs so it goes in a second projection
+        self.assertEqual(plan.count("WITH_COLUMNS"), 2)
+
+    def test_multi_column_indicator(self):
+        df = get_multi_symbol_test_df()
+        ret = Pipeline() \
+            .add(pi.moving_average_sweep, windows=[2, 3]) \
+            .add(pi.crossover, column1='SMA2', column2='SMA3') \
+            .run(df)
+
+        expected = pi.crossover(pi.moving_average_sweep(df, [2, 3]).df, 'SMA2', 'SMA3').df
+        testing.assert_frame_equal(ret.df, expected)
+        self.assertEqual(ret.columns, ['SMA2', 'SMA3', 'SMA2_cross_SMA3'])
+
+    def test_shared_intermediates(self):
+        """the volatility indicators share their intermediate columns in a pipeline like they do called one after another"""
+        df = get_random_walk_df(['A', 'AA'], 30)
+        ret = Pipeline() \
+            .add(pi.simple_moving_average, days=5) \
+            .add(pi.true_range) \
+            .add(pi.bollinger_bands, days=5) \
+            .add(pi.keltner_channels, days=5) \
+            .add(pi.average_true_range, days=14) \
+            .add(pi.relative_strength_index, days=14) \
+            .run(df)
+        expected = pi.simple_moving_average(df, 5).df
+        expected = pi.true_range(expected).df
+        expected = pi.bollinger_bands(expected, 5).df
+        expected = pi.keltner_channels(expected, 5).df
+        expected = pi.average_true_range(expected, 14).df
+        expected = pi.relative_strength_index(expected, 14).df
+        testing.assert_frame_equal(ret.df, expected)
+        self.assertEqual(ret.df.columns.count('True_Range'), 1)
+
+    def test_skips_existing_columns(self):
+        df = pi.simple_moving_average(get_multi_symbol_test_df(), days=2).df
+        ret = Pipeline().add(pi.simple_moving_average, days=2).run(df)
+        testing.assert_frame_equal(ret.df, df)
+        self.assertEqual(ret.columns, ['SMA2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Tests for the portfolio simulator
+
+"""
+import unittest
+from datetime import date, timedelta
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import portfolio
+from polars_indicators.strategies import buy_x_week_low
+from test_parallel import get_trading_test_df
+
+
+def day(n: int) -> date:
+    return date(2023, 1, 1) + timedelta(days=n)
+
+
+def get_trades_df() -> pl.DataFrame:
+    """five trades over five days. With 1000 capital in half positions
+    A and B take all the cash on day 1 so C is left out, D gets the cash A frees and E is short of the cash B frees"""
+    return pl.DataFrame({
+        "Symbol": ["A", "B", "C", "D", "E"],
+        "Start": [day(1), day(1), day(1), day(3), day(4)],
+        "End": [day(2), day(3), day(1), day(4), day(5)],
+        "Entry_Price": [10.0, 20.0, 30.0, 5.0, 10.0],
+        "Exit_Price": [11.0, 18.0, 33.0, 6.0, 10.0],
+    })
+
+
+class TestPortfolio(unittest.TestCase):
+
+    def test_simulate(self):
+        result = portfolio.simulate(get_trades_df(), capital=1000, position_size=0.5)
+        testing.assert_series_equal(result.trades["Symbol"], pl.Series("Symbol", ["A", "B", "D"]))
+        testing.assert_series_equal(result.trades["Shares"], pl.Series("Shares", [50.0, 25.0, 105.0]))
+        testing.assert_series_equal(result.trades["Profit"], pl.Series("Profit", [50.0, -50.0, 105.0]))
+
+        expected = pl.DataFrame({
+            "Date": [day(n) for n in range(1, 6)],
+            "Equity": [1000.0, 1050.0, 1000.0, 1105.0, 1105.0],
+            "Positions": [2, 2, 2, 1, 0],
+            "Cash": [0.0, 0.0, 25.0, 475.0, 1105.0],
+            "Exposure": [1.0, 1.0, 0.975, 630 / 1105, 0.0],
+            "Drawdown%": [0.0, 0.0, (1000 / 1050 - 1) * 100, 0.0, 0.0],
+        })
+        testing.assert_frame_equal(result.equity, expected)
+
+    def test_max_positions(self):
+        result = portfolio.simulate(get_trades_df(), capital=1000, position_size=0.5, max_positions=1)
+        testing.assert_series_equal(result.trades["Symbol"], pl.Series("Symbol", ["A", "D"]))
+        testing.assert_series_equal(result.equity["Positions"], pl.Series("Positions", [1, 1, 1, 1, 0]))
+
+    def test_unconstrained(self):
+        trades = get_trades_df()
+        result = portfolio.simulate(trades, capital=1000, position_size=0.01)
+        testing.assert_series_equal(result.trades["Symbol"], trades["Symbol"])
+        self.assertEqual(result.equity["Positions"].max(), 3)
+
+    def test_stats(self):
+        result = portfolio.simulate(get_trades_df(), capital=1000, position_size=0.5)
+        expected = pl.DataFrame({
+            "Symbol": ["A", "B", "D"],
+            "Trades": pl.Series([1, 1, 1], dtype=pl.UInt32),
+            "Win_Rate": [1.0, 0.0, 1.0],
+            "Profit": [50.0, -50.0, 105.0],
+            "Mean_Return%": [10.0, -10.0, 20.0],
+        })
+        testing.assert_frame_equal(result.symbol_stats(), expected)
+
+        years = result.year_stats()
+        self.assertEqual(years["Year"].to_list(), [2023])
+        self.assertAlmostEqual(years["Return%"][0], 10.5)
+        self.assertAlmostEqual(years["Max_Drawdown%"][0], (1000 / 1050 - 1) * 100)
+        self.assertEqual(years["Trades"][0], 3)
+
+    def test_missing_exit_price(self):
+        trades = get_trades_df().with_columns(pl.when(pl.col("Symbol") == "E").then(None).otherwise(pl.col("Exit_Price")).alias("Exit_Price"))
+        with self.assertRaises(ValueError):
+            portfolio.simulate(trades)
+
+    def test_backtest(self):
+        """X is exited at 9.5 and Y is still open at the end so it's closed at its last Close"""
+        df = pl.DataFrame({
+            "Symbol": ["X"] * 4 + ["Y"] * 4,
+            "Date": [day(n) for n in range(1, 5)] * 2,
+            "High": [0.0] * 8,
+            "Low": [0.0] * 8,
+            "Close": [10.0, 12.0, 9.0, 11.0, 20.0, 21.0, 22.0, 23.0],
+            "Trade": [1, 1, 1, None, None, 2, 2, 2],
+            "Enter": [10.0, None, None, None, None, 20.0, None, None],
+            "Exit": [None, None, 9.5, None, None, None, None, None],
+        })
+        result = portfolio.backtest(df, "Trade", "Enter", "Exit", capital=1000, position_size=0.5)
+        testing.assert_series_equal(result.trades["Profit"], pl.Series("Profit", [-25.0, 75.0]))
+
+        expected = pl.DataFrame({
+            "Date": [day(n) for n in range(1, 5)],
+            "Equity": [1000.0, 1125.0, 1025.0, 1050.0],
+            "Positions": [1, 2, 2, 1],
+            "Cash": [500.0, 0.0, 0.0, 475.0],
+            "Exposure": [0.5, 1.0, 1.0, 575 / 1050],
+            "Drawdown%": [0.0, 0.0, (1025 / 1125 - 1) * 100, (1050 / 1125 - 1) * 100],
+        })
+        testing.assert_frame_equal(result.equity, expected)
+
+    def test_backtest_matches_simulate(self):
+        ret = buy_x_week_low.strategy(get_trading_test_df(), timedelta(days=7))
+        enter_column = "7 days, 0:00:00_week_min_targets"
+        trades = pi.summarize_trades(ret.df, ret.column, enter_column, "exit_column")
+        simulated = portfolio.simulate(trades, capital=10_000, position_size=0.25, max_positions=3)
+        backtested = portfolio.backtest(ret.df, ret.column, enter_column, "exit_column", capital=10_000, position_size=0.25, max_positions=3)
+
+        testing.assert_frame_equal(backtested.trades.select(simulated.trades.columns), simulated.trades)
+        self.assertAlmostEqual(backtested.equity["Equity"][-1], simulated.equity["Equity"][-1])
+        self.assertLessEqual(simulated.equity["Positions"].max(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Tests for the indicator instrumentation
+
+"""
+import unittest
+from datetime import timedelta
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import profiling
+from polars_indicators.exits import trade_exits
+from polars_indicators.incremental import Incremental
+from polars_indicators.pipeline import Pipeline
+from polars_indicators.strategies import buy_x_week_low
+from test_parallel import get_trading_test_df
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_strategy_calls(self):
+        """the indicators the strategy calls are recorded and the result doesn't change"""
+        df = get_trading_test_df()
+        expected = buy_x_week_low.strategy(df, timedelta(days=14))
+        with profiling.instrument() as recorder:
+            ret = buy_x_week_low.strategy(df, timedelta(days=14))
+        testing.assert_frame_equal(ret.df, expected.df)
+
+        report = recorder.report()
+        self.assertEqual(report["indicator"].to_list(), ["targeted_value", "trade_exits"])
+        self.assertEqual(report.columns, ["call", "indicator", "seconds", "lazy", "rows_in", "rows_out", "columns_added", "profiled_seconds"])
+        targets = report.row(0, named=True)
+        self.assertEqual(targets["columns_added"], ["14 days, 0:00:00_week_min_targets"])
+        self.assertEqual(targets["rows_in"], targets["rows_out"])
+        self.assertEqual(len(report["columns_added"][1]), 3)
+        self.assertGreater(recorder.seconds, 0)
+
+        #the indicators are put back after the block
+        self.assertIs(buy_x_week_low.trade_exits, trade_exits)
+        self.assertIs(buy_x_week_low.pi.targeted_value, pi.targeted_value)
+
+    def test_lazy_profile(self):
+        """nodes of a profiled lazy chain are attributed to the calls that added their columns"""
+        df = get_trading_test_df()
+        with profiling.instrument(explain=True) as recorder:
+            lf = pi.simple_moving_average(df.lazy(), 3).df
+            lf = pi.trailing_stop(lf, 2).df
+            result = recorder.profile(lf)
+        testing.assert_frame_equal(result, pi.trailing_stop(pi.simple_moving_average(df, 3).df, 2).df)
+
+        report = recorder.report()
+        self.assertEqual(report["rows_in"].to_list(), [None, None])
+        self.assertEqual(report["columns_added"].to_list(), [["SMA3"], ["2_bar_trailing_stop"]])
+        self.assertTrue(all(call.plan is not None for call in recorder.calls))
+        nodes = recorder.node_timings()
+        self.assertEqual(nodes.filter(pl.col("call").is_not_null())["indicator"].unique().sort().to_list(), ["simple_moving_average", "trailing_stop"])
+        self.assertEqual(report["profiled_seconds"].null_count(), 0)
+
+    def test_multi_column_nodes(self):
+        """nodes that add several columns are attributed to their calls and merged Pipeline nodes are split between them"""
+        df = get_trading_test_df()
+        with profiling.instrument() as recorder:
+            lf = pi.bollinger_bands(df.lazy(), 5).df
+            lf = pi.crossovers(lf, [('Close', 'SMA5')]).df
+            lf = pi.targeted_value(lf.with_columns(pl.col('Low').alias('7 days, 0:00:00_week_min')), '7 days, 0:00:00_week_min').df
+            lf = Pipeline().add(pi.simple_moving_average, days=3).add(pi.simple_moving_average, days=4).run(lf).df
+            recorder.profile(lf)
+
+        report = recorder.report()
+        self.assertEqual(report["indicator"].to_list(), ["bollinger_bands", "crossovers", "targeted_value", "simple_moving_average", "simple_moving_average"])
+        self.assertEqual(report["profiled_seconds"].null_count(), 0)
+        nodes = recorder.node_timings()
+        merged = nodes.filter(pl.col("node") == "with_column(SMA3, SMA4)")
+        self.assertEqual(merged["call"].to_list(), [3, 4])
+        self.assertAlmostEqual(merged["seconds"].sum(), (merged["end"][0] - merged["start"][0]) / 1e6)
+
+    def test_pipelines_run_unchanged(self):
+        """Pipelines merge their expressions and Incremental finds its indicators inside the block"""
+        df = get_trading_test_df()
+        pipeline = Pipeline().add(pi.simple_moving_average, days=3).add(pi.simple_moving_average, days=4).add(pi.crossover_up, column1='SMA3', column2='SMA4')
+        plan = pipeline.plan(df.lazy()).df.explain()
+        with profiling.instrument() as recorder:
+            inside = Pipeline().add(pi.simple_moving_average, days=3).add(pi.simple_moving_average, days=4).add(pi.crossover_up, column1='SMA3', column2='SMA4')
+            self.assertEqual(inside.plan(df.lazy()).df.explain(), plan)
+            incremental = Incremental(Pipeline().add(pi.simple_moving_average, days=3).add(pi.end_of_data_stop))
+            incremental.start(df)
+        self.assertEqual(incremental.lookback, 2)
+        self.assertEqual(recorder.report()["columns_added"].to_list()[:3], [["SMA3"], ["SMA4"], ["SMA3_cross_up_SMA4"]])
+
+    def test_profile_calls(self):
+        """profile mode times the nodes of each eager call and still returns DataFrames"""
+        df = get_trading_test_df()
+        with profiling.instrument(profile=True) as recorder:
+            ret = pi.simple_moving_average(df, 3)
+        self.assertIsInstance(ret.df, pl.DataFrame)
+        testing.assert_frame_equal(ret.df, pi.simple_moving_average(df, 3).df)
+        self.assertEqual(recorder.report()["rows_out"].to_list(), [len(df)])
+        self.assertTrue((recorder.node_timings()["call"] == 0).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
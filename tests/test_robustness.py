@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Tests for the bootstrap and shuffle resamples of trade results
+
+"""
+import unittest
+from datetime import date, timedelta
+from polars import testing
+import polars as pl
+from polars_indicators import robustness
+
+
+def get_trades_df() -> pl.DataFrame:
+    """returns of 10%, -20%, 5% and 10% ending on consecutive days"""
+    return pl.DataFrame({
+        "End": [date(2023, 1, 1) + timedelta(days=n) for n in range(4)],
+        "Entry_Price": [10.0, 10.0, 20.0, 5.0],
+        "Exit_Price": [11.0, 8.0, 21.0, 5.5],
+    })
+
+
+class TestRobustness(unittest.TestCase):
+
+    def test_actual(self):
+        result = robustness.resample(get_trades_df(), resamples=10, seed=0, capital=1000)
+        equity = [1100.0, 880.0, 924.0, 1016.4]
+        self.assertAlmostEqual(result.actual["Win_Rate"], 0.75)
+        self.assertAlmostEqual(result.actual["Mean_Gain%"], 1.25)
+        self.assertAlmostEqual(result.actual["Max_Drawdown%"], (880 / 1100 - 1) * 100)
+        self.assertAlmostEqual(result.actual["End_Equity"], equity[-1])
+
+    def test_drawdown_from_capital(self):
+        """a first losing trade is a drawdown from the capital"""
+        trades = get_trades_df().sort("End", descending=True)
+        result = robustness.resample(trades.drop("End"), resamples=10, seed=0, position_size=0.5)
+        self.assertAlmostEqual(result.actual["Max_Drawdown%"], (1.05 * 1.025 * 0.9 / (1.05 * 1.025) - 1) * 100)
+
+    def test_seed(self):
+        first = robustness.resample(get_trades_df(), resamples=1000, seed=1, chunk_size=300)
+        second = robustness.resample(get_trades_df(), resamples=1000, seed=1, chunk_size=300)
+        testing.assert_frame_equal(first.samples, second.samples)
+        self.assertEqual(len(first.samples), 1000)
+        other = robustness.resample(get_trades_df(), resamples=1000, seed=2, chunk_size=300)
+        self.assertFalse(first.samples.frame_equal(other.samples))
+
+    def test_shuffle(self):
+        result = robustness.resample(get_trades_df(), resamples=500, method="shuffle", seed=0, chunk_size=64)
+        for statistic in ["Win_Rate", "Mean_Gain%", "End_Equity"]:
+            self.assertAlmostEqual(result.samples[statistic].min(), result.actual[statistic])
+            self.assertAlmostEqual(result.samples[statistic].max(), result.actual[statistic])
+        #with a single losing trade every order falls by the same 20% from its highest
+        self.assertAlmostEqual(result.samples["Max_Drawdown%"].min(), (0.8 - 1) * 100)
+        self.assertAlmostEqual(result.samples["Max_Drawdown%"].max(), (0.8 - 1) * 100)
+
+    def test_intervals(self):
+        result = robustness.resample(get_trades_df(), resamples=2000, seed=0)
+        intervals = result.intervals(0.9)
+        self.assertEqual(intervals["Statistic"].to_list(), robustness.STATISTICS)
+        for lower, median, upper in intervals.select("Lower", "Median", "Upper").rows():
+            self.assertLessEqual(lower, median)
+            self.assertLessEqual(median, upper)
+        win_rate = intervals.row(0, named=True)
+        self.assertEqual((win_rate["Lower"], win_rate["Upper"]), (0.5, 1.0))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            robustness.resample(get_trades_df(), method="jackknife")
+        with self.assertRaises(ValueError):
+            robustness.resample(get_trades_df().with_columns(pl.lit(None, pl.Float64).alias("Exit_Price")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Tests for the cross-sectional screener
+
+"""
+import tempfile
+import unittest
+from pathlib import Path
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import screener
+from test_parallel import get_trading_test_df
+
+
+def sorted_screen(df: pl.DataFrame, column: str, n: int, largest: bool) -> pl.DataFrame:
+    """the screen worked out with a sort of the whole frame"""
+    return df.filter(pl.col(column).is_not_null()).with_row_count("__row").sort(
+        ["Date", column, "__row"], descending=[False, largest, False]
+    ).groupby("Date", maintain_order=True).head(n).select(df.columns).with_columns(
+        (pl.col("Date").cumcount().over("Date") + 1).cast(pl.UInt32).alias("Rank"))
+
+
+class TestScreener(unittest.TestCase):
+
+    def test_top_and_bottom(self):
+        df = pi.simple_moving_average(get_trading_test_df(), 5).df.with_columns((pl.col("Close") / pl.col("SMA5")).alias("Spread"))
+        for n in [1, 3, 10]:
+            testing.assert_frame_equal(screener.top(df, "Spread", n), sorted_screen(df, "Spread", n, True))
+            testing.assert_frame_equal(screener.bottom(df, "Spread", n), sorted_screen(df, "Spread", n, False))
+        self.assertEqual(screener.top(df, "Spread", 3).groupby("Date").count()["count"].max(), 3)
+
+    def test_ties_and_nulls(self):
+        df = pl.DataFrame({
+            "Symbol": ["A", "B", "C", "A", "B", "C"],
+            "Date": [1, 1, 1, 2, 2, 2],
+            "Value": [3.0, None, 3.0, 5.0, 4.0, None],
+        })
+        expected = pl.DataFrame({
+            "Symbol": ["A", "A"],
+            "Date": [1, 2],
+            "Value": [3.0, 5.0],
+            "Rank": pl.Series([1, 1], dtype=pl.UInt32),
+        })
+        testing.assert_frame_equal(screener.top(df, "Value", 1), expected)
+        self.assertEqual(screener.bottom(df, "Value", 5)["Symbol"].to_list(), ["A", "C", "B", "A"])
+
+    def test_latest(self):
+        df = get_trading_test_df()
+        latest = screener.top(df.lazy(), "Close", 2, latest=True)
+        self.assertIsInstance(latest, pl.LazyFrame)
+        last = df.filter(pl.col("Date") == df["Date"].max())
+        testing.assert_frame_equal(latest.collect(), sorted_screen(last, "Close", 2, True))
+
+    def test_latest_symbol_tails(self):
+        """a symbol without a bar on the last date is ranked by its own last bar"""
+        df = get_trading_test_df()
+        df = df.filter((pl.col("Symbol") != "A") | (pl.col("Date") < df["Date"].max()))
+        tails = df.groupby("Symbol", maintain_order=True).tail(1).sort("Close", descending=True)
+        expected = tails.with_columns(pl.arange(1, len(tails) + 1).cast(pl.UInt32).alias("Rank"))
+        testing.assert_frame_equal(screener.top(df, "Close", 10, latest=True), expected)
+        testing.assert_frame_equal(screener.top(pi.prepare(df), "Close", 10, latest=True).select(expected.columns), expected)
+        self.assertEqual(screener.bottom(df, "Close", 1, latest=True)["Symbol"].to_list(), tails["Symbol"].tail(1).to_list())
+
+    def test_latest_pushdown(self):
+        """on a prepared parquet the last bars are selected in the scan"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "prices.parquet"
+            pi.prepare(get_trading_test_df()).write_parquet(path)
+            plan = screener.top(pl.scan_parquet(path), "Close", 2, latest=True).explain()
+        scan = plan[plan.index("PARQUET SCAN"):]
+        self.assertIn('col("Bars_Left")) == (0)', scan)
+
+
+if __name__ == '__main__':
+    unittest.main()
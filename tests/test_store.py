@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Tests for the partitioned Parquet store
+
+"""
+import tempfile
+import unittest
+from datetime import date, timedelta
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import store
+
+
+def get_store_test_df() -> pl.DataFrame:
+    """three symbols with daily bars across the end of 2022 and start of 2023. One symbol needs quoting"""
+    dates = [date(2022, 12, 25) + timedelta(days=i) for i in range(14)]
+    frames = []
+    for i, symbol in enumerate(['A', 'BRK/B', 'C']):
+        frames.append(pl.DataFrame({
+            pi.SYMBOL_COLUMN: [symbol] * len(dates),
+            pi.DATE_COLUMN: dates,
+            pi.OPEN_COLUMN: [float(i * 100 + bar) for bar in range(len(dates))],
+            pi.HIGH_COLUMN: [float(i * 100 + bar + 1) for bar in range(len(dates))],
+            pi.LOW_COLUMN: [float(i * 100 + bar - 1) for bar in range(len(dates))],
+            pi.CLOSE_COLUMN: [float(i * 100 + bar) for bar in range(len(dates))],
+        }))
+    return pl.concat(frames)
+
+
+class TestStore(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.df = get_store_test_df()
+        self.paths = store.write_prices(self.df, self.root.name)
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def test_round_trip(self):
+        """a file per symbol and year and reading everything back gives the input in symbol then date order"""
+        self.assertEqual(len(self.paths), 6)
+        self.assertEqual(store.list_symbols(self.root.name), ['A', 'BRK/B', 'C'])
+        testing.assert_frame_equal(store.scan_prices(self.root.name).collect(), self.df)
+
+    def test_filters(self):
+        """symbols, dates and columns are all applied"""
+        lf = store.scan_prices(self.root.name, symbols=['C', 'BRK/B'], start=date(2023, 1, 2), end=date(2023, 1, 4), columns=[pi.CLOSE_COLUMN])
+        expected = self.df.filter(pl.col(pi.SYMBOL_COLUMN).is_in(['BRK/B', 'C']) & pl.col(pi.DATE_COLUMN).is_between(date(2023, 1, 2), date(2023, 1, 4))) \
+            .select(pi.SYMBOL_COLUMN, pi.DATE_COLUMN, pi.CLOSE_COLUMN)
+        testing.assert_frame_equal(lf.collect(), expected)
+
+        #only the 2023 files are read for a range inside 2023
+        self.assertEqual(len(store._paths(self.root.name, ['C', 'BRK/B'], 2023, 2023)), 2)
+
+        with self.assertRaises(FileNotFoundError):
+            store.scan_prices(self.root.name, symbols=['missing'])
+
+    def test_overwrite_partition(self):
+        """writing a symbol and year again replaces only that file"""
+        update = self.df.filter((pl.col(pi.SYMBOL_COLUMN) == 'A') & (pl.col(pi.DATE_COLUMN).dt.year() == 2023)).with_columns(pl.col(pi.CLOSE_COLUMN) * 2)
+        self.assertEqual(len(store.write_prices(update, self.root.name)), 1)
+
+        result = store.scan_prices(self.root.name).collect()
+        self.assertEqual(result.shape, self.df.shape)
+        testing.assert_frame_equal(result.filter(pl.col(pi.SYMBOL_COLUMN) != 'A'), self.df.filter(pl.col(pi.SYMBOL_COLUMN) != 'A'))
+        self.assertEqual(result.filter(pl.col(pi.SYMBOL_COLUMN) == 'A')[pi.CLOSE_COLUMN].sum(), self.df.filter(pl.col(pi.SYMBOL_COLUMN) == 'A')[pi.CLOSE_COLUMN].sum() + update[pi.CLOSE_COLUMN].sum() / 2)
+
+    def test_indicator_on_scan(self):
+        """indicators take the scan like any other LazyFrame"""
+        result = pi.simple_moving_average(store.scan_prices(self.root.name, symbols=['A']), 3).df
+        self.assertIsInstance(result, pl.LazyFrame)
+        expected = pi.simple_moving_average(self.df.filter(pl.col(pi.SYMBOL_COLUMN) == 'A'), 3).df
+        testing.assert_frame_equal(result.collect(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Tests for running indicators out of memory
+
+"""
+import os
+import tempfile
+import unittest
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import exits, store, streaming
+from test_parallel import get_trading_test_df
+
+
+def add_indicators(df: pl.DataFrame | pl.LazyFrame) -> pi.IndicatorsResult:
+    df = pi.simple_moving_average(df, 3).df
+    df = pi.targeted_value(df, 'SMA3').df
+    return exits.trade_exits(df, 'SMA3_targets', percentage=-5, trailing_bars=2)
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'prices.parquet')
+        get_trading_test_df().write_parquet(self.path, row_group_size=20)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_streamable_indicators(self):
+        """which indicators the polars streaming engine runs on a Parquet scan
+        a change here means polars started or stopped streaming one of them"""
+        lf = pl.scan_parquet(self.path)
+        trades = add_indicators(get_trading_test_df())
+        price, _, trade_id = trades.columns
+        trade_path = os.path.join(self.directory.name, 'trades.parquet')
+        trades.df.write_parquet(trade_path)
+
+        expected = {
+            'summarize_trades': (lambda: pi.summarize_trades(pl.scan_parquet(trade_path), trade_id, 'SMA3_targets', price), True),
+            'compact': (lambda: pi.compact(lf, float32=True), True),
+            #when/then, shifts and windows aren't supported by the streaming engine
+            'targeted_value': (lambda: pi.targeted_value(lf, 'Close').df, False),
+            'entry_percentage_stop': (lambda: pi.entry_percentage_stop(lf, -5, 'Close').df, False),
+            'simple_moving_average': (lambda: pi.simple_moving_average(lf, 3).df, False),
+            'crossover': (lambda: pi.crossover(lf, 'Open', 'Close').df, False),
+            'trailing_stop': (lambda: pi.trailing_stop(lf, 2).df, False),
+            'end_of_data_stop': (lambda: pi.end_of_data_stop(lf).df, False),
+            'prepare': (lambda: pi.prepare(lf, sort=False), False),
+        }
+        for name, (plan, streams) in expected.items():
+            with self.subTest(name):
+                self.assertEqual(streaming.streamable(plan()), streams)
+
+    def test_sink_falls_back_to_symbol_batches(self):
+        """indicators that can't stream run on batches of symbols and match running on the whole frame"""
+        df = get_trading_test_df()
+        expected = add_indicators(df)
+        trade_id = expected.columns[2]
+        out = os.path.join(self.directory.name, 'out')
+
+        result = streaming.sink(pl.scan_parquet(self.path), add_indicators, out, symbols_per_batch=4, id_columns=[trade_id])
+        self.assertEqual(len(os.listdir(out)), 2)
+        testing.assert_frame_equal(result.collect(), expected.df)
+
+    def test_sink_from_store(self):
+        """a price store source reads each batch from its own files"""
+        df = get_trading_test_df()
+        root = os.path.join(self.directory.name, 'store')
+        store.write_prices(df, root)
+        expected = add_indicators(df)
+        trade_id = expected.columns[2]
+
+        result = streaming.sink(root, add_indicators, os.path.join(self.directory.name, 'out'), symbols_per_batch=2, id_columns=[trade_id])
+        testing.assert_frame_equal(result.collect(), expected.df)
+
+    def test_sink_streams(self):
+        """a streamable plan is written by the streaming engine in one file"""
+        df = get_trading_test_df()
+        out = os.path.join(self.directory.name, 'out')
+        result = streaming.sink(pl.scan_parquet(self.path), lambda lf: lf.filter(pl.col('Close') > 100), out)
+        self.assertEqual(os.listdir(out), ['part-00000.parquet'])
+        testing.assert_frame_equal(result.collect(), df.filter(pl.col('Close') > 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
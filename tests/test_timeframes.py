@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Tests for resampling to higher timeframes and joining their indicators back
+
+"""
+import unittest
+from polars import testing
+import polars as pl
+import polars_indicators as pi
+from polars_indicators import timeframes
+from test_parallel import get_trading_test_df
+
+
+class TestTimeframes(unittest.TestCase):
+
+    def test_resample(self):
+        df = get_trading_test_df().with_columns(pl.lit(10, pl.Int64).alias("Volume"))
+        for every in ["1w", "1mo"]:
+            expected = df.groupby(["Symbol", pl.col("Date").dt.truncate(every).alias("Week")], maintain_order=True).agg(
+                pl.col("Date").last(),
+                pl.col("Open").first(),
+                pl.col("High").max(),
+                pl.col("Low").min(),
+                pl.col("Close").last(),
+                pl.col("Volume").sum(),
+            ).drop("Week")
+            testing.assert_frame_equal(timeframes.resample(df, every), expected)
+        self.assertEqual(timeframes.resample(df.lazy(), "1w").collect()["Volume"].max(), 70)
+
+    def test_higher_timeframe(self):
+        """every bar gets the weekly average of the last week that ended on or before it"""
+        df = get_trading_test_df()
+        ret = timeframes.higher_timeframe(df, lambda bars: pi.simple_moving_average(bars, 2), "1w")
+        self.assertEqual(ret.columns, ["SMA2_1w"])
+        testing.assert_frame_equal(ret.df.drop("SMA2_1w"), df)
+
+        weekly = pi.simple_moving_average(timeframes.resample(df, "1w"), 2).df
+        for symbol, date, value in ret.df.select("Symbol", "Date", "SMA2_1w").rows():
+            ended = weekly.filter((pl.col("Symbol") == symbol) & (pl.col("Date") <= date))
+            expected = ended["SMA2"][-1] if len(ended) else None
+            self.assertEqual(value, expected)
+
+        #returning the existing columns
+        self.assertIs(timeframes.higher_timeframe(ret.df, lambda bars: pi.simple_moving_average(bars, 2), "1w").df, ret.df)
+
+    def test_no_lookahead(self):
+        """changing the bars after a date doesn't change the values joined onto the bars up to it"""
+        df = get_trading_test_df()
+        cutoff = df["Date"].max() - (df["Date"].max() - df["Date"].min()) / 2
+        changed = df.with_columns(pl.when(pl.col("Date") > cutoff).then(pl.col("Close") * 2).otherwise(pl.col("Close")).alias("Close"))
+        columns = []
+        for frame in [df, changed]:
+            ret = timeframes.higher_timeframe(frame, lambda bars: pi.crossovers(bars, [("Close", "Open")]), "1mo")
+            columns.append(ret.df.filter(pl.col("Date") <= cutoff).select(ret.columns))
+        testing.assert_frame_equal(columns[0], columns[1])
+
+
+if __name__ == '__main__':
+    unittest.main()